@@ -0,0 +1,158 @@
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from astral import LocationInfo
+from astral.sun import sun, dawn, dusk
+
+import storage
+
+# Bump when the persisted table layout changes
+ASTRO_SCHEMA = 1
+
+# Every event the table holds. dawn/dusk are civil twilight (sun 6 degrees
+# below the horizon), nautical_dawn/nautical_dusk are 12 degrees below.
+EVENTS = ('nautical_dawn', 'dawn', 'sunrise', 'sunset', 'dusk', 'nautical_dusk')
+
+
+class AstroTable:
+    """Precomputed sunrise, sunset and twilight times for one location
+
+    The table covers `days` days from the date it was built and is kept as
+    one sorted list per event, so lookups are a bisect. It is rebuilt (and
+    persisted, if a path is given) when less than `min_horizon` days remain.
+    """
+
+    def __init__(self, name='San Diego', region='California', timezone='America/Los_Angeles',
+                 latitude=32.7157, longitude=-117.1611, days=366, min_horizon=30, path=None):
+        self.location = LocationInfo(name, region, timezone, latitude, longitude)
+        self.days = days
+        self.min_horizon = min_horizon
+        self.path = path
+        self.start = None
+        self.end = None
+        self.times = {event: [] for event in EVENTS}
+        self.lock = threading.Lock()
+
+    def _location_key(self):
+        return [self.location.latitude, self.location.longitude, self.location.timezone]
+
+    def covers(self, date, days=0):
+        """Return True if the table has events from date through date + days"""
+        return self.start is not None and self.start <= date and date + timedelta(days=days) < self.end
+
+    def build(self, start_date):
+        """Compute every event for `days` days starting at start_date"""
+        observer = self.location.observer
+        tz = self.location.timezone
+        times = {event: [] for event in EVENTS}
+        for i in range(self.days):
+            date = start_date + timedelta(days=i)
+            try:
+                s = sun(observer, date=date, tzinfo=tz)
+                day = {
+                    'nautical_dawn': dawn(observer, date=date, depression=12, tzinfo=tz),
+                    'dawn': s['dawn'],
+                    'sunrise': s['sunrise'],
+                    'sunset': s['sunset'],
+                    'dusk': s['dusk'],
+                    'nautical_dusk': dusk(observer, date=date, depression=12, tzinfo=tz),
+                }
+            except ValueError as e:
+                # The sun doesn't reach the required elevation on this date
+                logging.warning(f"Skipping astro events for {date}: {e}")
+                continue
+            for event, when in day.items():
+                times[event].append(when)
+        for event in EVENTS:
+            times[event].sort()
+        with self.lock:
+            self.times = times
+            self.start = start_date
+            self.end = start_date + timedelta(days=self.days)
+        logging.info(f"Built astro table for {self.location.name} from {start_date} for {self.days} days")
+
+    def load(self):
+        """Load a persisted table; returns False if missing, stale or for another location"""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = storage.loads(f.read())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable astro table {self.path}: {e}")
+            return False
+        if data.get('schema') != ASTRO_SCHEMA or data.get('location') != self._location_key():
+            return False
+        tzinfo = self.location.tzinfo
+        with self.lock:
+            self.times = {event: [t.astimezone(tzinfo) for t in data['times'].get(event, [])] for event in EVENTS}
+            self.start = data['start'].date()
+            self.end = data['end'].date()
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            'schema': ASTRO_SCHEMA,
+            'location': self._location_key(),
+            'start': datetime.combine(self.start, datetime.min.time()),
+            'end': datetime.combine(self.end, datetime.min.time()),
+            'times': self.times,
+        }
+        try:
+            storage.atomic_write(self.path, storage.dumps(data))
+        except OSError as e:
+            logging.warning(f"Error saving astro table {self.path}: {e}")
+
+    def ensure(self, now):
+        """Make sure the table covers at least min_horizon days past now"""
+        today = now.date()
+        if self.covers(today, self.min_horizon):
+            return
+        if self.start is None and self.load() and self.covers(today, self.min_horizon):
+            return
+        self.build(today)
+        self.save()
+
+    def next_event(self, now, events=('sunrise', 'sunset')):
+        """Return (time, event) of the first of `events` after now, or None"""
+        best = None
+        with self.lock:
+            for event in events:
+                times = self.times[event]
+                i = bisect_right(times, now)
+                if i < len(times) and (best is None or times[i] < best[0]):
+                    best = (times[i], event)
+        return best
+
+    def nearest(self, when, events=('sunrise', 'sunset')):
+        """Return (time, event) of the one of `events` closest to when, or None"""
+        best = None
+        with self.lock:
+            for event in events:
+                times = self.times[event]
+                i = bisect_left(times, when)
+                for j in (i - 1, i):
+                    if 0 <= j < len(times):
+                        distance = abs((times[j] - when).total_seconds())
+                        if best is None or distance < best[0]:
+                            best = (distance, times[j], event)
+        return (best[1], best[2]) if best else None
+
+    def day(self, date):
+        """Return a dictionary of every event on date (events missing that day are omitted)"""
+        tzinfo = self.location.tzinfo
+        midnight = datetime.combine(date, datetime.min.time(), tzinfo=tzinfo)
+        result = {}
+        with self.lock:
+            for event in EVENTS:
+                times = self.times[event]
+                i = bisect_left(times, midnight)
+                if i < len(times) and times[i].astimezone(tzinfo).date() == date:
+                    result[event] = times[i]
+        return result
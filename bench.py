@@ -0,0 +1,260 @@
+"""Micro-benchmarks for the fetch_* parsers and render_*_cell functions
+
+Every fetcher runs against recorded responses in fixtures/ with
+transport.get replaced, so only the parse and transform work is timed.
+The HTTP cache, content fingerprints and lookup caches are cleared before
+each call so a cached result never hides the parse. datetime.now() is
+pinned to when the fixtures were captured, so every run times the same
+code paths (upcoming tides and launches, today's forecast) whatever the
+date.
+
+    python bench.py --output before.json
+    python bench.py --compare before.json --threshold 0.25
+
+--compare exits with status 1 if any benchmark's median got slower than
+the baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Local time the fixtures were recorded, and the modules whose datetime.now() is pinned to it
+CAPTURED_AT = '2024-11-07 06:05'
+TIMEZONE = 'America/Los_Angeles'
+CLOCK_MODULES = ('main', 'fetchers', 'fetch_nws')
+
+# URL substring -> fixture file served for it
+ROUTES = (
+    ('nextspaceflight.com', 'launches.json'),
+    ('surfcaptain.com', 'surf.html'),
+    ('api.weather.com/v2/pws', 'wind.json'),
+    ('product=water_level', 'tide_water_level.json'),
+    ('product=predictions', 'tide_predictions.json'),
+    ('api.weather.gov/points', 'nws_points.json'),
+    ('api.weather.gov/gridpoints', 'nws_forecast.json'),
+)
+
+
+class FixtureResponse:
+    """Just enough of requests.Response for the fetchers"""
+
+    def __init__(self, content):
+        self.status_code = 200
+        self.headers = {}
+        self.history = []
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+def load_fixtures():
+    fixtures = {}
+    for _, name in ROUTES:
+        with open(os.path.join(FIXTURES, name), 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def fixture_get(fixtures):
+    """Return a transport.get replacement answering from fixtures"""
+    def get(url, **kwargs):
+        for fragment, name in ROUTES:
+            if fragment in url:
+                return FixtureResponse(fixtures[name])
+        raise ValueError(f"No fixture for {url}")
+    return get
+
+
+def captured_at():
+    """Return CAPTURED_AT as an aware datetime"""
+    import pytz
+    return pytz.timezone(TIMEZONE).localize(datetime.strptime(CAPTURED_AT, '%Y-%m-%d %H:%M'))
+
+
+class FixtureDatetime(datetime):
+    """datetime whose now() is the fixture capture time"""
+
+    @classmethod
+    def now(cls, tz=None):
+        captured = captured_at()
+        return captured.astimezone(tz) if tz else captured.replace(tzinfo=None)
+
+
+@contextlib.contextmanager
+def fixtures_installed():
+    """Answer transport.get from the fixtures and pin datetime.now() to CAPTURED_AT"""
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(patch('transport.get', fixture_get(load_fixtures())))
+        for module in CLOCK_MODULES:
+            stack.enter_context(patch(f'{module}.datetime', FixtureDatetime))
+        yield
+
+
+def time_call(func, rounds, min_time=0.005):
+    """Time func, batching calls so each round lasts at least min_time
+
+    Returns:
+        Dictionary with median_us, min_us, rounds and number (calls per round)
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {'median_us': statistics.median(samples), 'min_us': min(samples), 'rounds': rounds, 'number': number}
+
+
+def build_benchmarks(window):
+    """Return (name, callable) pairs for every fetch_* parser and render_*_cell"""
+    import fetch_nws
+    import transport
+    from launch_time import parse_net
+    from tides import TidePredictionStore
+
+    def uncached(func):
+        def call():
+            transport.clear_cache()
+            parse_net.cache_clear()
+            return func()
+        return call
+
+    def fetch_tidetimes():
+        window.tide_store = TidePredictionStore()
+        return window.fetch_tidetimes()
+
+    def nws():
+        fetch_nws.configure_cache(None)
+        return fetch_nws.fetch_nws('92109')
+
+    # Table built once up front; fetch_sunriseset then only looks events up
+    window.astro.ensure(captured_at())
+
+    benchmarks = [
+        ('fetch_launches', uncached(window.fetch_launches)),
+        ('fetch_surf', uncached(window.fetch_surf)),
+        ('fetch_wind', uncached(window.fetch_wind)),
+        ('fetch_tide', uncached(window.fetch_tide)),
+        ('fetch_tidetimes', uncached(fetch_tidetimes)),
+        ('fetch_sunriseset', window.fetch_sunriseset),
+        ('fetch_current_time', window.fetch_current_time),
+        ('fetch_nws', uncached(nws)),
+    ]
+
+    data_store = dict(window.data_store)
+    for name, func in benchmarks:
+        if name.startswith('fetch_') and name not in ('fetch_current_time', 'fetch_nws'):
+            data_store[name[len('fetch_'):]] = func()
+    data_store['tide_times'] = data_store.pop('tidetimes')
+    data_store['nws'] = nws()
+    for _, _, render_name, _ in window.cell_specs:
+        render = getattr(window, render_name)
+        benchmarks.append((render_name, lambda render=render: render(data_store)))
+    return benchmarks
+
+
+_app = None
+
+
+def create_window():
+    """Return a MainWindow to run the fetchers and renderers on, creating the QApplication if needed"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from main import MainWindow
+
+    global _app
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = MainWindow()
+    window.time_timer.stop()
+    return window
+
+
+def run(rounds=15, only=None):
+    """Run the benchmarks and return the JSON-serializable report"""
+    window = create_window()
+    results = {}
+    logging.disable(logging.CRITICAL)
+    try:
+        with fixtures_installed():
+            for name, func in build_benchmarks(window):
+                if only and only not in name:
+                    continue
+                results[name] = time_call(func, rounds)
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Return (lines, regressions) comparing report's medians against baseline's"""
+    lines = []
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            lines.append(f"{name:24s} {result['median_us']:10.1f} us   (new)")
+            continue
+        ratio = result['median_us'] / base['median_us'] if base['median_us'] else 1.0
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        lines.append(f"{name:24s} {result['median_us']:10.1f} us  {base['median_us']:10.1f} us  {ratio:6.2f}x{flag}")
+    return lines, regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pbclock parser and render benchmarks')
+    parser.add_argument('--rounds', type=int, default=15, help='timed rounds per benchmark')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='fraction slower than the baseline that counts as a regression')
+    args = parser.parse_args()
+
+    report = run(args.rounds, args.filter)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report, baseline, args.threshold)
+        print('\n'.join(lines))
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        for name, result in report['results'].items():
+            print(f"{name:24s} {result['median_us']:10.1f} us  (min {result['min_us']:.1f}, x{result['number']})")
@@ -0,0 +1,135 @@
+import time
+
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QColor, QFont, QPainter, QPixmap, QPen
+from PyQt5.QtWidgets import QLabel, QWidget
+
+
+class FrameStats:
+    """Accumulate paint times and process CPU use for comparing renderers"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.paint_time = 0.0
+        self.max_paint_time = 0.0
+        self.started_wall = time.monotonic()
+        self.started_cpu = time.process_time()
+
+    def record(self, seconds):
+        self.frames += 1
+        self.paint_time += seconds
+        self.max_paint_time = max(self.max_paint_time, seconds)
+
+    def summary(self):
+        """Return frames, average/max paint ms and process CPU percent since reset()"""
+        wall = time.monotonic() - self.started_wall
+        cpu = time.process_time() - self.started_cpu
+        return {
+            'frames': self.frames,
+            'avg_paint_ms': (self.paint_time / self.frames * 1000) if self.frames else 0.0,
+            'max_paint_ms': self.max_paint_time * 1000,
+            'cpu_percent': (cpu / wall * 100) if wall > 0 else 0.0,
+        }
+
+
+class TimedLabel(QLabel):
+    """QLabel that records how long each paint takes"""
+
+    def __init__(self, parent, frame_stats):
+        super().__init__(parent)
+        self.frame_stats = frame_stats
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        self.frame_stats.record(time.perf_counter() - start)
+
+
+class DashboardWidget(QWidget):
+    """All grid cells drawn by one widget from cached pixmaps
+
+    Each cell is rendered to a QPixmap only when its title, text or color
+    changes, and only that cell's rectangle is scheduled for repaint.
+    paintEvent just blits the cached pixmaps that intersect the dirty region.
+    """
+
+    def __init__(self, parent, width, height, rows=2, cols=3, fudge=12, font=None, background=None, frame_stats=None):
+        super().__init__(parent)
+        self.rows = rows
+        self.cols = cols
+        self.fudge = fudge
+        self.slot_width = width // cols
+        self.slot_height = height // rows
+        self.cell_font = QFont(font) if font is not None else QFont(self.font())
+        self.background = background if background is not None else QColor(211, 211, 211)
+        self.frame_stats = frame_stats
+        self.cells = {}
+        self.pixmaps = {}
+        self.click_callbacks = {}
+        self.setFixedSize(self.slot_width * cols, self.slot_height * rows)
+        # Every pixel is covered by a cell pixmap, so Qt needn't clear first
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def slot_rect(self, position):
+        row, col = position
+        return QRect(col * self.slot_width, row * self.slot_height, self.slot_width, self.slot_height)
+
+    def set_cell(self, position, title, text, color=None, click_callback=None):
+        """Update one cell; returns True if it changed and was scheduled for repaint"""
+        self.click_callbacks[position] = click_callback
+        color_name = color.name() if color else None
+        state = (title, text, color_name)
+        if self.cells.get(position) == state:
+            return False
+        self.cells[position] = state
+        self.pixmaps[position] = self.render_cell(title, text, color)
+        self.update(self.slot_rect(position))
+        return True
+
+    def render_cell(self, title, text, color):
+        """Draw one cell (including the gap around it) into a pixmap"""
+        pixmap = QPixmap(self.slot_width, self.slot_height)
+        pixmap.fill(self.background)
+        painter = QPainter(pixmap)
+        inner = QRect(self.fudge // 2, self.fudge // 2,
+                      self.slot_width - self.fudge, self.slot_height - self.fudge)
+        if color:
+            painter.fillRect(inner, color)
+        painter.setPen(QPen(Qt.black, 1))
+        painter.drawRect(inner.adjusted(0, 0, -1, -1))
+        painter.setFont(self.cell_font)
+        painter.drawText(inner, Qt.AlignCenter, f"{title}\n{text}")
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        painter = QPainter(self)
+        self.paint_region(painter, event.region())
+        painter.end()
+        if self.frame_stats is not None:
+            self.frame_stats.record(time.perf_counter() - start)
+
+    def paint_region(self, painter, region):
+        """Blit the cached pixmaps of every cell intersecting region"""
+        for row in range(self.rows):
+            for col in range(self.cols):
+                rect = self.slot_rect((row, col))
+                if not region.intersects(rect):
+                    continue
+                pixmap = self.pixmaps.get((row, col))
+                if pixmap is None:
+                    painter.fillRect(rect, self.background)
+                else:
+                    painter.drawPixmap(rect.topLeft(), pixmap)
+
+    def mousePressEvent(self, event):
+        position = (event.pos().y() // self.slot_height, event.pos().x() // self.slot_width)
+        callback = self.click_callbacks.get(position)
+        if callback:
+            callback()
+        else:
+            super().mousePressEvent(event)
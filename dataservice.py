@@ -0,0 +1,359 @@
+"""Share one instance's fetched data with other clocks on the LAN
+
+The serving instance (--serve-data PORT) publishes its data_store after
+every refresh. Other instances (--data-from URL) read it from
+GET /data instead of fetching from the internet.
+
+The response is the snapshot layout storage uses (sources with their
+fetched_at times) plus a version. Its ETag changes only when a source's
+value or fetch time changes. A request with a matching If-None-Match and
+?wait=SECONDS is held open until the next change or the timeout (then
+304), so each client's refresh is one long-poll request that returns as
+soon as the server has new data.
+
+    python dataservice.py --benchmark --clients 50,100,200,400
+
+runs a server and that many long-polling clients in one process and
+reports how many published updates reached them and how quickly.
+
+UnixDataService serves the same API on a Unix socket; that is how the
+headless fetcher daemon (fetchd.py) feeds a display on the same machine.
+"""
+import argparse
+import http.client
+import logging
+import os
+import secrets
+import socket
+import socketserver
+import statistics
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import storage
+
+DEFAULT_PORT = 8088
+# Longest a long-poll is held open; clients ask for less
+MAX_WAIT = 120
+CLIENT_WAIT = 60
+CONTENT_TYPE = 'application/json'
+
+
+class DataHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't hold the body back for an ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logging.debug(f"dataservice: {format % args}")
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        if parts.path != '/data':
+            self.send_body(404, 'text/plain', b'Not found')
+            return
+        try:
+            wait = min(float(urllib.parse.parse_qs(parts.query).get('wait', ['0'])[0]), MAX_WAIT)
+        except ValueError:
+            self.send_body(400, 'text/plain', b'Bad wait')
+            return
+        if self.server.closing:
+            # Kept-alive connections outlive shutdown(); make the client reconnect
+            self.close_connection = True
+            self.send_body(503, 'text/plain', b'Shutting down')
+            return
+        etag, body = self.server.wait_for_change(self.headers.get('If-None-Match'), wait)
+        if body is None:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_body(200, CONTENT_TYPE, body, etag)
+
+    def send_body(self, status, content_type, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UnixDataHandler(DataHandler):
+    # TCP_NODELAY doesn't exist on Unix sockets
+    disable_nagle_algorithm = False
+
+
+class DataPublisher:
+    """The latest published data_store and the clients waiting for the next one
+
+    Mixed into a threading socket server whose handler is DataHandler.
+    """
+
+    daemon_threads = True
+    # Many clients reconnect at once when an update is published
+    request_queue_size = 128
+
+    def init_publisher(self):
+        # Distinguishes this run's versions from a restarted server's
+        self.instance = secrets.token_hex(4)
+        self.version = 0
+        self.sources = None
+        self.body = storage.dumps({'schema': storage.SNAPSHOT_SCHEMA, 'version': 0, 'sources': {}}).encode('utf-8')
+        self.changed = threading.Condition()
+        self.closing = False
+
+    @property
+    def etag(self):
+        return f'"{self.instance}-{self.version}"'
+
+    def publish(self, data_store, fetched_at):
+        """Make the fetched sources of data_store the current version
+
+        Serializes once per change, so serving any number of clients costs
+        no more than copying bytes. Publishing unchanged data is a no-op and
+        wakes nobody.
+        """
+        snapshot = storage.build_snapshot(data_store, fetched_at)
+        with self.changed:
+            if snapshot['sources'] == self.sources:
+                return False
+            self.sources = snapshot['sources']
+            self.version += 1
+            snapshot['version'] = self.version
+            self.body = storage.dumps(snapshot).encode('utf-8')
+            self.changed.notify_all()
+        logging.debug(f"Published data version {self.version} ({len(self.body)} bytes)")
+        return True
+
+    def wait_for_change(self, etag, wait):
+        """Return (etag, body), or (etag, None) if the client's etag is still current after wait seconds"""
+        deadline = time.monotonic() + wait
+        with self.changed:
+            while etag == self.etag and not self.closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            return self.etag, None if etag == self.etag else self.body
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='dataservice', daemon=True).start()
+        logging.info(f"Serving data at {self.base_url}/data")
+        return self
+
+    def stop(self):
+        with self.changed:
+            self.closing = True
+            self.changed.notify_all()
+        self.shutdown()
+        self.server_close()
+
+
+class DataService(DataPublisher, ThreadingHTTPServer):
+    """HTTP server for the latest published data_store"""
+
+    def __init__(self, address=('0.0.0.0', DEFAULT_PORT)):
+        super().__init__(address, DataHandler)
+        self.init_publisher()
+
+    @property
+    def base_url(self):
+        host = self.server_address[0]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{self.server_address[1]}"
+
+
+class UnixDataService(DataPublisher, socketserver.ThreadingUnixStreamServer):
+    """The same API on a Unix socket, for a display client on the same machine"""
+
+    def __init__(self, path):
+        # A socket left behind by a daemon that didn't shut down cleanly
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, UnixDataHandler)
+        self.init_publisher()
+
+    @property
+    def base_url(self):
+        return f"unix:{self.server_address}"
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def start_server(port=DEFAULT_PORT, host='0.0.0.0'):
+    """Serve published data at http://host:port/data on a daemon thread; returns the server"""
+    return DataService((host, port)).start()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DataServiceClient:
+    """Long-polls a DataService, remembering the version it last saw
+
+    base_url is http://host:port or unix:/path/to/socket. The connection is
+    kept open between polls and reopened after an error.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.connection = None
+        self.etag = None
+
+    def connect(self, timeout):
+        if self.base_url.startswith('unix:'):
+            return UnixHTTPConnection(self.base_url[len('unix:'):], timeout=timeout)
+        parts = urllib.parse.urlsplit(self.base_url)
+        return http.client.HTTPConnection(parts.hostname, parts.port or DEFAULT_PORT, timeout=timeout)
+
+    def poll(self, wait=CLIENT_WAIT):
+        """Return (values, fetched_at) once the server's data differs from the last poll, or None after wait seconds
+
+        Raises:
+            OSError: If the server can't be reached
+            http.client.HTTPException: If the server closes the connection or answers with an error
+            ValueError: If the response isn't a snapshot of the current schema
+        """
+        timeout = wait + 10
+        if self.connection is None:
+            self.connection = self.connect(timeout)
+        self.connection.timeout = timeout
+        if self.connection.sock is not None:
+            self.connection.sock.settimeout(timeout)
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        path = f"/data?wait={wait}" if self.etag else '/data'
+        try:
+            self.connection.request('GET', path, headers=headers)
+            response = self.connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        if response.status == 304:
+            return None
+        if response.status != 200:
+            self.connection.close()
+            self.connection = None
+            raise http.client.HTTPException(f"{response.status} {response.reason} from {self.base_url}")
+        values, fetched_at = storage.parse_snapshot(storage.loads(body.decode('utf-8')))
+        self.etag = response.getheader('ETag')
+        return values, fetched_at
+
+
+def benchmark(clients, duration=10.0, interval=1.0, wait=30):
+    """Measure how many long-polling clients one server keeps up to date
+
+    Publishes a new version every interval seconds for duration seconds
+    while clients threads long-poll, each with its own connection.
+
+    Returns:
+        Dictionary with published and delivered update counts, errors and
+        p50/p95/max latency (ms) from publish to a client having the data
+    """
+    server = DataService(('127.0.0.1', 0)).start()
+    published_at = {}
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+    ready = threading.Semaphore(0)
+    data_store = {'wind': {'speed': 0}}
+    server.publish(data_store, {'wind': datetime.now()})
+
+    def client():
+        poller = DataServiceClient(server.base_url)
+        first = True
+        while not stop.is_set():
+            try:
+                result = poller.poll(wait)
+            except Exception:
+                if stop.is_set():
+                    break
+                with lock:
+                    errors[0] += 1
+                time.sleep(0.1)
+                continue
+            received = time.perf_counter()
+            if result is None:
+                continue
+            if first:
+                first = False
+                ready.release()
+                continue
+            speed = result[0]['wind']['speed']
+            with lock:
+                if speed in published_at:
+                    latencies.append(received - published_at[speed])
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    # Every client has the initial version and is waiting before anything is timed
+    for _ in range(clients):
+        ready.acquire(timeout=10)
+    publishes = int(duration / interval)
+    try:
+        for speed in range(1, publishes + 1):
+            with lock:
+                published_at[speed] = time.perf_counter()
+            data_store['wind'] = {'speed': speed}
+            server.publish(data_store, {'wind': datetime.now()})
+            time.sleep(interval)
+    finally:
+        stop.set()
+        server.stop()
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies] or [0.0]
+    return {
+        'clients': clients,
+        'published': publishes,
+        'delivered': len(latencies),
+        'expected': publishes * clients,
+        'errors': errors[0],
+        'p50_ms': statistics.median(ms),
+        'p95_ms': ms[int(len(ms) * 0.95) - 1] if len(ms) > 1 else ms[0],
+        'max_ms': ms[-1],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pbclock data service tools')
+    parser.add_argument('--benchmark', action='store_true', help='measure how many long-polling clients one server sustains')
+    parser.add_argument('--clients', default='10,50,100,200', help='comma-separated client counts to try')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of publishing per client count')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between published updates')
+    parser.add_argument('--poll', metavar='URL', help='print what a client gets from this server, then exit')
+    args = parser.parse_args()
+
+    if args.poll:
+        values, fetched_at = DataServiceClient(args.poll).poll()
+        for name, value in values.items():
+            print(f"{name:12s} {fetched_at.get(name)}  {value}")
+    elif args.benchmark:
+        print(f"{'clients':>8s} {'delivered':>14s} {'errors':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s}")
+        for count in (int(c) for c in args.clients.split(',')):
+            result = benchmark(count, args.duration, args.interval)
+            delivered = f"{result['delivered']}/{result['expected']}"
+            print(f"{result['clients']:8d} {delivered:>14s} {result['errors']:7d} "
+                  f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['max_ms']:8.1f}")
+    else:
+        parser.print_help()
@@ -1,7 +1,88 @@
 import requests
+import transport
+import storage
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
+# How long geocode and points lookups are trusted before asking again
+GEOCODE_TTL = 30 * 24 * 3600
+POINTS_TTL = 7 * 24 * 3600
+
+HEADERS = {
+    'User-Agent': 'pbclock/1.0 (weather app)',
+    'Accept': 'application/json'
+}
+
+
+class LookupCache:
+    """TTL-bounded key/value cache for lookups that almost never change
+
+    Entries are kept in memory and, when a path is given, persisted so they
+    survive restarts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.entries = storage.loads(f.read())
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable NWS lookup cache {self.path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            storage.atomic_write(self.path, storage.dumps(self.entries))
+        except OSError as e:
+            logging.warning(f"Error saving NWS lookup cache {self.path}: {e}")
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() >= entry['expires']:
+                del self.entries[key]
+                return None
+            return entry['value']
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = {'value': value, 'expires': time.time() + ttl}
+            self.save()
+
+    def invalidate(self, key):
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+
+_lookup_cache = LookupCache()
+
+
+def configure_cache(path=None):
+    """Use a fresh lookup cache, persisted at path if given"""
+    global _lookup_cache
+    _lookup_cache = LookupCache(path)
+
+
+def _parse_json(response):
+    """Raise for HTTP errors, then decode the JSON body"""
+    response.raise_for_status()
+    return response.json()
+
 
 def get_lat_lon_from_zip(zip_code):
     """Convert ZIP code to latitude and longitude using geocoding API with fallback"""
@@ -15,10 +96,17 @@ def get_lat_lon_from_zip(zip_code):
         logging.info(f"Using known coordinates for ZIP {zip_code}: lat={lat}, lon={lon}")
         return lat, lon
 
+    cache_key = f"zip:{zip_code}"
+    cached = _lookup_cache.get(cache_key)
+    if cached:
+        lat, lon = cached
+        logging.info(f"Using cached coordinates for ZIP {zip_code}: lat={lat}, lon={lon}")
+        return lat, lon
+
     # Try US Census geocoding API
     try:
         geocode_url = f"https://geocoding.geo.census.gov/geocoder/locations/address?zip={zip_code}&benchmark=Public_AR_Census2020&format=json"
-        response = requests.get(geocode_url, timeout=10)
+        response = transport.get(geocode_url, timeout=10, source='nws_geocode')
         response.raise_for_status()
         data = response.json()
 
@@ -27,6 +115,7 @@ def get_lat_lon_from_zip(zip_code):
             lat = coordinates['y']
             lon = coordinates['x']
             logging.info(f"Geocoded ZIP {zip_code} to lat={lat}, lon={lon}")
+            _lookup_cache.set(cache_key, [lat, lon], GEOCODE_TTL)
             return lat, lon
         else:
             logging.warning(f"No coordinates found for ZIP {zip_code}")
@@ -38,7 +127,7 @@ def get_lat_lon_from_zip(zip_code):
         try:
             geocode_url = f"https://nominatim.openstreetmap.org/search?postalcode={zip_code}&country=US&format=json&limit=1"
             headers = {'User-Agent': 'pbclock/1.0 (weather app)'}
-            response = requests.get(geocode_url, headers=headers, timeout=10)
+            response = transport.get(geocode_url, headers=headers, timeout=10, source='nws_geocode')
             response.raise_for_status()
             data = response.json()
 
@@ -46,6 +135,7 @@ def get_lat_lon_from_zip(zip_code):
                 lat = float(data[0]['lat'])
                 lon = float(data[0]['lon'])
                 logging.info(f"Geocoded ZIP {zip_code} via Nominatim to lat={lat}, lon={lon}")
+                _lookup_cache.set(cache_key, [lat, lon], GEOCODE_TTL)
                 return lat, lon
             else:
                 logging.warning(f"No coordinates found for ZIP {zip_code}")
@@ -55,6 +145,81 @@ def get_lat_lon_from_zip(zip_code):
             return None, None
 
 
+def get_point_urls(lat, lon):
+    """Look up the NWS forecast and gridpoint URLs for a location
+
+    Results are cached for POINTS_TTL, so in steady state this makes no request.
+
+    Returns:
+        Dictionary with forecast and forecastGridData URLs, or None
+    """
+    cache_key = f"points:{lat},{lon}"
+    cached = _lookup_cache.get(cache_key)
+    if cached:
+        return cached
+
+    # Not through the HTTP cache: the lookup cache already holds the result,
+    # and a lookup redone after a 404 must not be answered from a cached copy
+    point_url = f"https://api.weather.gov/points/{lat},{lon}"
+    point_data = _parse_json(transport.get(point_url, source='nws_points', headers=HEADERS, timeout=10))
+
+    if 'properties' not in point_data or 'forecast' not in point_data['properties']:
+        logging.warning("No forecast URL in point data")
+        return None
+
+    urls = {
+        'forecast': point_data['properties']['forecast'],
+        'forecastGridData': point_data['properties'].get('forecastGridData'),
+    }
+    _lookup_cache.set(cache_key, urls, POINTS_TTL)
+    return urls
+
+
+def invalidate_point_urls(lat, lon):
+    """Forget the cached points lookup for a location"""
+    _lookup_cache.invalidate(f"points:{lat},{lon}")
+
+
+def _was_moved(response):
+    """Return True if the response was reached through a permanent redirect"""
+    history = getattr(response, 'history', None)
+    return isinstance(history, list) and any(r.status_code == 301 for r in history)
+
+
+def fetch_forecast(lat, lon):
+    """Fetch the NWS forecast for a location using the cached points lookup
+
+    If the forecast URL returns 404 the points lookup is redone once. A 301
+    redirect is followed, and the points lookup is refreshed next time.
+    """
+    for attempt in range(2):
+        urls = get_point_urls(lat, lon)
+        if not urls:
+            return None
+        # parse only runs for a response actually received, so a cached
+        # forecast doesn't report the redirect again
+        moved = []
+
+        def parse(response):
+            moved.append(_was_moved(response))
+            return _parse_json(response)
+
+        try:
+            forecast = transport.get_parsed(urls['forecast'], parse, source='nws_forecast', headers=HEADERS, timeout=10)
+        except requests.exceptions.HTTPError as e:
+            status = getattr(e.response, 'status_code', None)
+            if status == 404 and attempt == 0:
+                logging.warning(f"Forecast URL {urls['forecast']} returned 404, refreshing points lookup")
+                invalidate_point_urls(lat, lon)
+                continue
+            raise
+        if any(moved):
+            logging.info(f"Forecast URL {urls['forecast']} moved, refreshing points lookup next time")
+            invalidate_point_urls(lat, lon)
+        return forecast
+    return None
+
+
 def fetch_nws(zip_code='92109'):
     """Fetch National Weather Service data and return raw data structure
 
@@ -79,26 +244,11 @@ def fetch_nws(zip_code='92109'):
         return None
 
     try:
-        # Get point information from NWS
-        point_url = f"https://api.weather.gov/points/{lat},{lon}"
-        headers = {
-            'User-Agent': 'pbclock/1.0 (weather app)',
-            'Accept': 'application/json'
-        }
-        point_response = requests.get(point_url, headers=headers, timeout=10)
-        point_response.raise_for_status()
-        point_data = point_response.json()
-
-        if 'properties' not in point_data or 'forecast' not in point_data['properties']:
-            logging.warning("No forecast URL in point data")
+        # Get forecast via the cached points lookup
+        forecast_data = fetch_forecast(lat, lon)
+        if forecast_data is None:
             return None
 
-        # Get forecast
-        forecast_url = point_data['properties']['forecast']
-        forecast_response = requests.get(forecast_url, headers=headers, timeout=10)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
-
         if 'properties' not in forecast_data or 'periods' not in forecast_data['properties']:
             logging.warning("No periods in forecast data")
             return None
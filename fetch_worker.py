@@ -0,0 +1,35 @@
+import logging
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class FetchWorkerSignals(QObject):
+    """Signals emitted by FetchWorker back to the GUI thread"""
+    # object rather than dict so PyQt hands the Python dict over untouched
+    # instead of converting it to a QVariantMap
+    finished = pyqtSignal(object)
+    # The exception the fetch function raised; finished isn't emitted then
+    failed = pyqtSignal(object)
+
+
+class FetchWorker(QRunnable):
+    """Run a data fetch function on a QThreadPool thread
+
+    The fetch function must not touch any widgets. Its return value is
+    delivered to the GUI thread through signals.finished, or the exception
+    it raised through signals.failed.
+    """
+
+    def __init__(self, fetch_func):
+        super().__init__()
+        self.fetch_func = fetch_func
+        self.signals = FetchWorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fetch_func()
+        except Exception as e:
+            logging.error(f"Error in background fetch: {e}", exc_info=True)
+            self.signals.failed.emit(e)
+            return
+        self.signals.finished.emit(result)
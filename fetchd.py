@@ -0,0 +1,104 @@
+"""Headless fetcher daemon: runs the fetchers and publishes data_store on a Unix socket
+
+Scraping and parsing then run in their own process, with their own GIL,
+CPU accounting and crash domain, and the display only renders:
+
+    python fetchd.py &
+    python main.py --data-from unix:$HOME/.cache/pbclock/fetchd.sock
+
+Either side can be restarted on its own. The daemon restores its last
+snapshot at startup and publishes it right away, and the display keeps
+showing what it has and reconnects until the daemon is back.
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+
+import dataservice
+import metrics
+import storage
+from astro import AstroTable
+from fetchers import Fetchers, fetch_nws
+from refresh import RefreshScheduler
+from tides import TidePredictionStore
+
+
+def default_socket():
+    return os.path.join(storage.cache_dir(), 'fetchd.sock')
+
+
+class FetcherDaemon(Fetchers):
+    """Refreshes each source when it falls due and publishes the result"""
+
+    def __init__(self, data_service, snapshot_path=None, astro_path=None):
+        self.data_service = data_service
+        self.data_store = {}
+        self.data_versions = {}
+        self.fetched_at = {}
+        self.tide_store = TidePredictionStore()
+        self.astro = AstroTable(path=astro_path)
+        self.scheduler = RefreshScheduler(self.build_sources())
+        self.snapshot_path = snapshot_path
+        self.stopping = threading.Event()
+        if self.snapshot_path:
+            self.load_snapshot()
+
+    def load_snapshot(self):
+        """Restore (and publish) the last snapshot so a restart doesn't blank the display"""
+        self.restore_snapshot()
+        self.publish()
+
+    def refresh(self):
+        """Fetch whatever is due; returns seconds until the next source is due"""
+        due = self.scheduler.due()
+        if due:
+            cpu = time.process_time()
+            logging.info(f"Refreshing {', '.join(due)}")
+            data = self.collect_all_data(due)
+            self.apply_results(data)
+            logging.info(f"Refreshed {len(due)} sources in {data['cycle_time']:.2f}s "
+                         f"({time.process_time() - cpu:.2f}s CPU, {time.process_time():.1f}s total)")
+        seconds = self.scheduler.seconds_until_due()
+        return 60 if seconds is None else seconds
+
+    def run(self):
+        while not self.stopping.is_set():
+            # One second of slack so the source is due by the time we wake
+            self.stopping.wait(self.refresh() + 1)
+
+    def stop(self, *args):
+        self.stopping.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fetch pbclock data headless and serve it to display clients')
+    parser.add_argument('--socket', default=None, help='Unix socket to serve on (default: fetchd.sock in the cache dir)')
+    parser.add_argument('--serve-data', type=int, metavar='PORT',
+                        help='serve on this TCP port instead, for clocks elsewhere on the LAN')
+    parser.add_argument('--serve-data-host', default='0.0.0.0')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve fetch metrics in Prometheus format on this port')
+    parser.add_argument('--metrics-host', default='127.0.0.1')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.serve_data is not None:
+        server = dataservice.DataService((args.serve_data_host, args.serve_data))
+    else:
+        server = dataservice.UnixDataService(args.socket or default_socket())
+    daemon = FetcherDaemon(server, snapshot_path=storage.snapshot_path(),
+                           astro_path=os.path.join(storage.cache_dir(), 'astro.json'))
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    fetch_nws.configure_cache(os.path.join(storage.cache_dir(), 'nws_lookups.json'))
+    if args.metrics_port is not None:
+        metrics.start_server(args.metrics_port, args.metrics_host)
+    server.start()
+    try:
+        daemon.run()
+    finally:
+        server.stop()
+        logging.info("Fetcher daemon stopped")
@@ -0,0 +1,286 @@
+"""The data-source fetchers, shared by the Qt display and the headless fetcher daemon
+
+Nothing here touches Qt, so fetchd can run the same fetchers without a
+display and MainWindow can inherit them, along with how their results are
+merged into data_store, persisted and published.
+"""
+import logging
+from datetime import datetime
+
+import pytz
+
+from lazy import lazy_import, resolve
+from refresh import Source, refresh_sources
+from launch_time import parse_net
+import storage
+import surf_page
+
+transport = lazy_import('transport')
+fetch_nws = lazy_import('fetch_nws')
+
+
+class Fetchers:
+    """fetch_* methods, the refresh cycle that runs them and where their results go
+
+    Expects the class it's mixed into to set self.tide_store (a
+    TidePredictionStore), self.astro (an AstroTable), self.scheduler (a
+    RefreshScheduler over build_sources()), self.data_store,
+    self.data_versions and self.fetched_at (dicts), self.snapshot_path
+    and self.data_service (a DataService, or None).
+    """
+
+    # Seconds a refresh cycle may take before unfinished sources are marked late
+    refresh_deadline = 30
+    # Sources answered from local tables, which succeed every cycle even
+    # with every upstream down, so they don't count towards "Upd"
+    local_sources = ('tide_times', 'sunriseset')
+    # What the last written snapshot held (see pending_snapshot)
+    snapshot_key = None
+
+    def fetch_launches(self):
+        """Fetch launch data and return raw data structure"""
+        logging.info(f"Fetching launches at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        url = 'https://nextspaceflight.com/launches/nsf_launches/10/'
+        data = transport.get_parsed(url, lambda response: response.json(), source='launches')
+        filtered_data = []
+        # The countdown is computed from net when the cell is rendered
+        for item in data:
+            if any(loc in item['location'].lower() for loc in ['vandenberg', 'chica']):
+                filtered_data.append({
+                    'name': item['name'],
+                    'net': parse_net(item['net']),
+                })
+        logging.info(f"Fetched {len(filtered_data)} launches")
+        return filtered_data
+
+
+    def fetch_surf(self):
+        """Fetch surf data and return raw data structure"""
+        url = 'https://surfcaptain.com/forecast/pacific-beach-california'
+        return transport.get_scraped(url, lambda response: self.parse_surf(response.content), source='surf',
+                                     volatile=transport.VOLATILE_PATTERNS + surf_page.VOLATILE_PATTERNS)
+
+    def parse_surf(self, content):
+        """Extract the surf forecast and water temperature from the surfcaptain page"""
+        return surf_page.parse_surf(content)
+
+    def fetch_wind(self):
+        """Fetch wind data and return raw data structure"""
+        logging.info(f"Fetching wind data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        url = "https://api.weather.com/v2/pws/observations/current?apiKey=e1f10a1e78da46f5b10a1e78da96f525&stationId=KCASANDI141&numericPrecision=decimal&format=json&units=e"
+        data = transport.get_parsed(url, lambda response: response.json(), source='wind')
+
+        if 'observations' in data and data['observations']:
+            observation = data['observations'][0]
+            wind_speed = int(observation['imperial']['windSpeed'])
+            wind_gust = int(observation['imperial']['windGust'])
+            wind_dir = observation['winddir']
+
+            # Convert wind direction to cardinal direction
+            dirs = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+            ix = round(wind_dir / 22.5) % 16
+            cardinal_dir = dirs[ix]
+
+            logging.info(f"Wind data fetched: {wind_speed}g{wind_gust} {cardinal_dir}")
+            return {
+                'speed': wind_speed,
+                'gust': wind_gust,
+                'direction': cardinal_dir
+            }
+        else:
+            logging.warning("Failed to fetch wind data")
+            return None
+
+    def fetch_tidetimes(self):
+        """Fetch tide times data and return raw data structure"""
+        tz = pytz.timezone('America/Los_Angeles')
+        current_time = datetime.now(tz)
+        # Predictions are prefetched in bulk; only go to NOAA when they run short
+        if self.tide_store.needs_refill(current_time):
+            try:
+                self.tide_store.refill(current_time)
+            except Exception as e:
+                if not self.tide_store.next_event(current_time):
+                    raise
+                logging.warning(f"Tide predictions refill failed, serving stored ones: {e}")
+
+        next_event = self.tide_store.next_event(current_time)
+        if not next_event:
+            logging.warning("No upcoming tide events")
+            return None
+
+        next_time, next_type, height = next_event
+        return {
+            'time': next_time,
+            'time_str': next_time.strftime('%H:%M'),
+            'type': next_type,
+            'height': height
+        }
+
+    def fetch_tide(self):
+        """Fetch tide data and return raw data structure"""
+        logging.info(f"Fetching tide data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        url = "https://api.tidesandcurrents.noaa.gov/api/prod//datagetter?&station=9410230&range=1&units=english&datum=MLLW&product=water_level&time_zone=LST_LDT&format=json&application=NOS.COOPS.TAC.COOPSMAP"
+        data = transport.get_parsed(url, lambda response: response.json(), source='tide')
+
+        if 'data' in data and len(data['data']) >= 2:
+            last_two_values = data['data'][-2:]
+            last_value = float(last_two_values[-1]['v'])
+            second_last_value = float(last_two_values[-2]['v'])
+
+            trend = "rising" if last_value > second_last_value else "falling"
+            logging.info(f"Tide data: Value: {last_value:.1f}Ft, Trend: {trend}")
+            return {
+                'value': last_value,
+                'trend': trend
+            }
+        else:
+            return {
+                'value': 'N/A',
+                'trend': 'N/A'
+            }
+
+    def fetch_sunriseset(self):
+        """Fetch sunrise/sunset data and return raw data structure"""
+        current_time = datetime.now(tz=pytz.timezone('America/Los_Angeles'))
+        logging.info(f"Current time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        self.astro.ensure(current_time)
+
+        next_event_time, next_event = self.astro.next_event(current_time, ('sunrise', 'sunset'))
+        today = self.astro.day(current_time.date())
+
+        logging.info(f"Next event: {next_event}, Time: {next_event_time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+        return {
+            'event': next_event,
+            'time': next_event_time,
+            'sunrise': today.get('sunrise'),
+            'sunset': today.get('sunset')
+        }
+
+    def build_sources(self):
+        """Return the list of data sources, how often each one is refreshed and how long a value stays usable"""
+        # The old single 10-minute timer made ~45 requests/hour. These
+        # intervals make ~17: wind and tide are the bulk of it, so they are
+        # polled every 8-9 minutes, still fresher than before, rather than at
+        # the upstreams' own ~5-6 minute update rate.
+        return [
+            # Launch schedules move by the hour at most; the countdown is computed when rendering
+            Source('launches', self.fetch_launches, interval=3600, jitter=300, max_age=6 * 3600),
+            # Surfcaptain updates its forecast a few times a day
+            Source('surf', self.fetch_surf, interval=3600, jitter=300, max_age=12 * 3600),
+            # PWS observations update every ~5 minutes
+            Source('wind', self.fetch_wind, interval=480, jitter=30, max_age=3600),
+            # NOAA water level readings are 6 minutes apart
+            Source('tide', self.fetch_tide, interval=540, jitter=30, max_age=3600),
+            # Answered from prefetched predictions; NOAA is only hit every few days.
+            # The next event may have passed an hour on
+            Source('tide_times', self.fetch_tidetimes, interval=300, max_age=3600),
+            # Looked up in the precomputed astro table; refreshed so the next event rolls over
+            Source('sunriseset', self.fetch_sunriseset, interval=300, max_age=3600),
+            # NWS forecasts are issued roughly hourly
+            Source('nws', lambda: fetch_nws.fetch_nws('92109'), interval=3600, jitter=300, max_age=12 * 3600),
+        ]
+
+    def collect_all_data(self, names=None):
+        """Fetch data sources concurrently and return them as a dict of DataStore entries
+
+        Safe to call from a worker thread: only fetches, never touches widgets
+        or self.data_store. Sources that miss the refresh deadline are left out
+        so they keep their previous value, and are listed under 'late'.
+
+        Args:
+            names: Source names to fetch (default: all sources)
+        """
+        sources = [s for s in self.build_sources() if names is None or s.name in names]
+        resolve(transport, fetch_nws)
+        result = refresh_sources(sources, deadline=self.refresh_deadline)
+        data = dict(result.data)
+        data['late'] = result.late
+        data['errors'] = result.errors
+        data['cycle_time'] = result.elapsed
+        transport.log_stats()
+        return data
+
+    def set_data(self, key, value):
+        """Store a DataStore entry, bumping its version if the value changed"""
+        if key in self.data_store and self.data_store[key] == value:
+            return
+        self.data_store[key] = value
+        self.data_versions[key] = self.data_versions.get(key, 0) + 1
+
+    def restore_snapshot(self):
+        """Load the unexpired values of the last snapshot; returns True if any were restored
+
+        Restored sources count as fetched when they were, so the ones well
+        within their interval aren't refetched right away.
+        """
+        values, fetched_at = storage.load_snapshot(self.snapshot_path)
+        now = datetime.now()
+        restored = False
+        for name, value in values.items():
+            if name not in self.scheduler.intervals or fetched_at.get(name) is None:
+                continue
+            age = (now - fetched_at[name]).total_seconds()
+            if self.scheduler.freshness(name, age) == 'expired':
+                continue
+            self.set_data(name, value)
+            self.fetched_at[name] = fetched_at[name]
+            self.scheduler.mark_fetched(name, now=self.scheduler.clock() - max(0, age))
+            restored = True
+        return restored
+
+    def apply_results(self, data):
+        """Merge one collect_all_data() result into data_store, then persist and publish it
+
+        Sources in data count as fetched now. Failed and late sources aren't
+        in data, so they keep their last good value and count towards their
+        circuit breaker.
+
+        Returns:
+            The fetch time recorded for the sources in data
+        """
+        for key, value in data.items():
+            self.set_data(key, value)
+        now = datetime.now()
+        for name in data:
+            if name not in self.scheduler.intervals:
+                continue
+            self.scheduler.mark_fetched(name)
+            self.fetched_at[name] = now
+        for name in data.get('errors', []) + data.get('late', []):
+            self.scheduler.mark_failed(name)
+        self.save_snapshot()
+        self.publish()
+        return now
+
+    def last_network_update(self):
+        """Return when a network-backed source last fetched successfully, or None"""
+        times = [fetched for name, fetched in self.fetched_at.items() if name not in self.local_sources]
+        return max(times) if times else None
+
+    def pending_snapshot(self):
+        """Return the snapshot to persist, or None if nothing in it changed since the last one
+
+        Local sources are recomputed every few minutes, so only a change of
+        their value counts, not their fetch time.
+        """
+        if not self.snapshot_path:
+            return None
+        key = tuple(sorted((name, self.data_versions.get(name, 0),
+                            None if name in self.local_sources else fetched)
+                           for name, fetched in self.fetched_at.items()))
+        if key == self.snapshot_key:
+            return None
+        self.snapshot_key = key
+        return storage.build_snapshot(self.data_store, self.fetched_at)
+
+    def save_snapshot(self):
+        snapshot = self.pending_snapshot()
+        if snapshot:
+            storage.write_snapshot(self.snapshot_path, snapshot)
+
+    def publish(self):
+        """Hand the current data to the DataService, if this instance serves one"""
+        if self.data_service:
+            self.data_service.publish(self.data_store, self.fetched_at)
@@ -0,0 +1,174 @@
+"""Draw the dashboard straight into a Linux framebuffer, without an X server
+
+FramebufferDashboard is the 'painted' renderer's DashboardWidget, never
+shown on screen. Changed cells are painted into a QImage with the same
+paint_region() the widget uses, so frames are byte-identical to the
+windowed 'painted' renderer. Only the rows that changed are then written
+to /dev/fbN, or to a plain file for testing (raw pixels, or a PNG if
+the name ends in .png). Qt runs on the offscreen platform:
+
+    python main.py --renderer framebuffer --framebuffer /dev/fb1
+
+    python framebuffer.py --benchmark
+
+compares peak memory and time to first frame of the windowed and
+framebuffer renderers. The X server and window manager aren't counted
+in the windowed numbers.
+"""
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QImage, QPainter, QRegion
+
+from dashboard import DashboardWidget
+
+DEFAULT_DEVICE = '/dev/fb0'
+
+# Framebuffer bits per pixel -> QImage format with the same memory layout
+# (little-endian XRGB8888 and RGB565)
+FORMATS = {32: QImage.Format_RGB32, 16: QImage.Format_RGB16}
+
+
+def device_info(path):
+    """Return (bits_per_pixel, stride) of a framebuffer device from sysfs, or None for a plain file"""
+    name = os.path.basename(os.path.realpath(path))
+    sysfs = os.path.join('/sys/class/graphics', name)
+    if not name.startswith('fb') or not os.path.isdir(sysfs):
+        return None
+    with open(os.path.join(sysfs, 'bits_per_pixel')) as f:
+        bits_per_pixel = int(f.read())
+    with open(os.path.join(sysfs, 'stride')) as f:
+        stride = int(f.read())
+    return bits_per_pixel, stride
+
+
+class FramebufferDashboard(DashboardWidget):
+    """DashboardWidget that writes its frames to a framebuffer instead of painting a window
+
+    update() collects dirty rectangles the way QWidget.update() would and
+    schedules flush(), so several cells changing in one refresh become one
+    frame.
+    """
+
+    def __init__(self, parent, width, height, path, bits_per_pixel=32, on_first_frame=None, **kwargs):
+        super().__init__(parent, width, height, **kwargs)
+        self.path = path
+        info = device_info(path)
+        if info:
+            bits_per_pixel, self.stride = info
+        if bits_per_pixel not in FORMATS:
+            raise ValueError(f"Unsupported framebuffer depth {bits_per_pixel} bpp for {path}")
+        self.image = QImage(self.width(), self.height(), FORMATS[bits_per_pixel])
+        self.image.fill(self.background)
+        if not info:
+            self.stride = self.image.bytesPerLine()
+        self.device = None if path.endswith('.png') else open(path, 'r+b' if info else 'wb')
+        self.on_first_frame = on_first_frame
+        self.frames = 0
+        self.dirty = QRegion(self.rect())
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush)
+        self.flush_timer.start(0)
+
+    def update(self, *args):
+        self.dirty += args[0] if args else self.rect()
+        if not self.flush_timer.isActive():
+            self.flush_timer.start(0)
+
+    def frame(self):
+        """Return the current frame's raw pixel bytes"""
+        return self.image.constBits().asstring(self.image.sizeInBytes())
+
+    def flush(self):
+        """Paint the dirty cells into the image and write the rows they cover"""
+        if self.dirty.isEmpty():
+            return
+        start = time.perf_counter()
+        painter = QPainter(self.image)
+        self.paint_region(painter, self.dirty)
+        painter.end()
+        bounds = self.dirty.boundingRect().intersected(self.rect())
+        self.dirty = QRegion()
+        self.write_rows(bounds.top(), bounds.bottom() + 1)
+        if self.frame_stats is not None:
+            self.frame_stats.record(time.perf_counter() - start)
+        self.frames += 1
+        if self.frames == 1 and self.on_first_frame:
+            self.on_first_frame()
+
+    def write_rows(self, top, bottom):
+        if self.device is None:
+            self.image.save(self.path)
+            return
+        line = self.image.bytesPerLine()
+        pixels = self.frame()
+        if self.stride == line:
+            self.device.seek(top * line)
+            self.device.write(pixels[top * line:bottom * line])
+        else:
+            # The screen is wider than the dashboard; write each row at its offset
+            for y in range(top, bottom):
+                self.device.seek(y * self.stride)
+                self.device.write(pixels[y * line:(y + 1) * line])
+        self.device.flush()
+
+    def close(self):
+        if self.device is not None:
+            self.device.close()
+            self.device = None
+        return super().close()
+
+
+def _run_startup(renderer, extra_args, env):
+    """Run main.py --profile-startup once; returns (first paint ms, peak RSS KB)"""
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    process = subprocess.Popen([sys.executable, main, '--profile-startup', '--renderer', renderer] + extra_args,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    match = re.search(r'^first_paint: (\d+) ms', output, re.M)
+    if process.returncode != 0 or not match:
+        raise RuntimeError(f"{renderer} startup failed ({process.returncode}):\n{output}")
+    return int(match.group(1)), usage.ru_maxrss
+
+
+def benchmark(runs=5):
+    """Compare median time to first frame and peak RSS of the windowed and framebuffer renderers"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, PBCLOCK_CACHE_DIR=tmpdir)
+        modes = [
+            ('windowed', 'painted', [], env),
+            ('framebuffer', 'framebuffer', ['--framebuffer', os.path.join(tmpdir, 'frame.raw')], env),
+        ]
+        for name, renderer, extra_args, mode_env in modes:
+            samples = [_run_startup(renderer, extra_args, mode_env) for _ in range(runs)]
+            results[name] = {
+                'first_frame_ms': sorted(ms for ms, _ in samples)[len(samples) // 2],
+                'peak_rss_kb': sorted(kb for _, kb in samples)[len(samples) // 2],
+            }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pbclock framebuffer renderer tools')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare time to first frame and memory of the windowed and framebuffer renderers')
+    parser.add_argument('--runs', type=int, default=5, help='startups per renderer')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.benchmark:
+        for name, result in benchmark(args.runs).items():
+            print(f"{name:12s} first frame {result['first_frame_ms']:6d} ms   peak RSS {result['peak_rss_kb'] / 1024:7.1f} MB")
+    else:
+        parser.print_help()
@@ -0,0 +1,90 @@
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from lazy import lazy_import
+
+dateparser = lazy_import('dateparser')
+
+# US zone abbreviations the launch feed uses, in hours from UTC
+TZ_OFFSETS = {
+    'UTC': 0, 'GMT': 0, 'Z': 0,
+    'EST': -5, 'EDT': -4,
+    'CST': -6, 'CDT': -5,
+    'MST': -7, 'MDT': -6,
+    'PST': -8, 'PDT': -7,
+    'AKST': -9, 'AKDT': -8,
+    'HST': -10,
+}
+
+# "Wed, Sep 4, 2024, 05:59 AM PDT"
+_DISPLAY_RE = re.compile(r'^\s*(\w{3}, \w{3} \d{1,2}, \d{4}, \d{1,2}:\d{2} [AP]M) ([A-Z]{1,4})\s*$')
+_DISPLAY_FORMAT = '%a, %b %d, %Y, %I:%M %p'
+
+
+def _parse_known(raw):
+    """Parse the formats the feed is known to use; returns None for anything else"""
+    try:
+        return datetime.fromisoformat(raw.strip().replace('Z', '+00:00'))
+    except ValueError:
+        pass
+    match = _DISPLAY_RE.match(raw)
+    if match and match.group(2) in TZ_OFFSETS:
+        try:
+            naive = datetime.strptime(match.group(1), _DISPLAY_FORMAT)
+        except ValueError:
+            return None
+        tz = timezone(timedelta(hours=TZ_OFFSETS[match.group(2)]), match.group(2))
+        return naive.replace(tzinfo=tz)
+    return None
+
+
+@lru_cache(maxsize=256)
+def parse_net(raw):
+    """Parse a launch NET (no earlier than) string into a datetime
+
+    ISO-8601 and "Wed, Sep 4, 2024, 05:59 AM PDT" are parsed directly;
+    anything else falls back to dateparser. Results are cached by raw
+    string, since the feed repeats the same values every refresh.
+    """
+    parsed = _parse_known(raw)
+    if parsed is None:
+        logging.info(f"Falling back to dateparser for launch time {raw!r}")
+        parsed = dateparser.parse(raw)
+    return parsed
+
+
+def benchmark(samples, rounds=200):
+    """Time dateparser.parse against parse_net (cold and cached) over samples
+
+    Returns:
+        Dictionary of path name -> microseconds per parse
+    """
+    def per_parse(func, clear=None):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            if clear:
+                clear()
+            for raw in samples:
+                func(raw)
+        return (time.perf_counter() - start) / (rounds * len(samples)) * 1e6
+
+    dateparser.parse(samples[0])  # Keep dateparser's import and first-use setup out of the timing
+    return {
+        'dateparser': per_parse(dateparser.parse),
+        'parse_net_cold': per_parse(parse_net, clear=parse_net.cache_clear),
+        'parse_net_cached': per_parse(parse_net),
+    }
+
+
+if __name__ == '__main__':
+    samples = [
+        '2024-12-20T10:00:00Z',
+        '2025-01-03T18:30:00-08:00',
+        'Wed, Sep 4, 2024, 05:59 AM PDT',
+        'Sat, Nov 16, 2024, 10:15 PM PST',
+    ]
+    for name, micros in benchmark(samples).items():
+        print(f"{name:18s} {micros:10.1f} us/parse")
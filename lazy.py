@@ -0,0 +1,38 @@
+import importlib.util
+import sys
+import types
+
+
+def lazy_import(name):
+    """Return module `name`, deferring its execution until an attribute is first used
+
+    If the module is already imported (or already lazily registered) the
+    existing sys.modules entry is returned.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(module):
+    """Return True if module has actually executed (type() doesn't trigger a lazy load)"""
+    return type(module) is types.ModuleType
+
+
+def resolve(*modules):
+    """Force lazy modules to load now
+
+    LazyLoader before Python 3.12 can race when two threads trigger the
+    same load, so resolve modules on one thread before fanning out.
+    """
+    for module in modules:
+        if not is_loaded(module):
+            getattr(module, '__dict__')
@@ -1,7 +1,7 @@
+import startup
 import os
 import sys
-import requests
-from bs4 import BeautifulSoup
+import argparse
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
@@ -12,20 +12,31 @@ import subprocess
 import platform
 import socket
 
-from astral import LocationInfo
-from astral.sun import sun
 import pytz
 from datetime import datetime
 
-import dateparser
-
-from datetime import datetime, timedelta
-
-from functools import wraps
-
-import psutil
-
-class MainWindow(QWidget):
+from functools import partial, wraps
+
+from lazy import lazy_import
+from fetch_worker import FetchWorker
+from refresh import RefreshScheduler
+from fetchers import Fetchers
+import storage
+import metrics
+import dataservice
+from tides import TidePredictionStore
+from astro import AstroTable
+from dashboard import DashboardWidget, FrameStats, TimedLabel
+from framebuffer import FramebufferDashboard
+
+# Heavy modules only the fetchers (or the overlay) need. They load on first
+# use so the window and any cached data appear before they are imported.
+LAZY_MODULES = ('bs4', 'dateparser', 'psutil', 'transport', 'fetch_nws')
+psutil = lazy_import('psutil')
+transport = lazy_import('transport')
+fetch_nws = lazy_import('fetch_nws')
+
+class MainWindow(Fetchers, QWidget):
 
     _ui_width = 480
     _ui_height = 320
@@ -38,60 +49,170 @@ class MainWindow(QWidget):
 
     _fudge = 12
 
-    def __init__(self):
+    # Seconds between attempts to reach an unreachable DataService (a
+    # restarting fetchd is usually back within a few seconds)
+    remote_retry = 5
+
+    def __init__(self, snapshot_path=None, astro_path=None, renderer='labels', render_stats=False,
+                 clock_mode='seconds', data_service=None, data_client=None, framebuffer=None):
         self.last_update_time = None
         super().__init__()
         # Initialize DataStore to hold all fetched data
         self.data_store = {
-            'launches': [],
+            'launches': None,
             'surf': None,
             'wind': None,
             'tide': None,
             'tide_times': None,
             'sunriseset': None,
             'nws': None,
-            'last_update': None
+            'last_update': None,
+            'late': [],
+            'errors': [],
+            'cycle_time': None
         }
+        # What each entry goes back to when its value passes its source's max_age
+        self.empty_values = dict(self.data_store)
+        # Version counter per DataStore key, bumped whenever its value changes,
+        # and the input versions each cell was last rendered from
+        self.data_versions = {}
+        self.rendered_versions = {}
+        self.render_counts = {'executed': 0, 'skipped': 0}
         self.overlay = None
         self.overlay_visible = False
+        # Retained cell widgets, keyed by grid position
+        self.cells = {}
+        self.cell_state = {}
+        self._font = None
+        self._palettes = {}
+        # 'labels' uses one QLabel per cell, 'painted' a single DashboardWidget,
+        # 'framebuffer' the same DashboardWidget writing frames to the framebuffer path
+        self.renderer = renderer
+        self.framebuffer = framebuffer
+        self.dashboard = None
+        self.frame_stats = FrameStats()
+        # Fetching runs on a single worker thread so slow upstreams never
+        # block the clock or touch handling
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+        self.fetch_worker = None
+        self.tide_store = TidePredictionStore()
+        self.astro = AstroTable(path=astro_path)
         self.initUI()
+        # Each source is refreshed on its own interval; the refresh timer is a
+        # single shot armed for whenever the next source falls due
+        self.scheduler = RefreshScheduler(self.build_sources())
         self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(600000)  # 10 minutes in milliseconds
-
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.request_update)
+
+        # Last successful fetch per source, persisted with the snapshot
+        self.fetched_at = {}
+        # A DataService publishes every refresh to other clocks; with a
+        # DataServiceClient this clock long-polls one instead of fetching
+        self.data_service = data_service
+        self.data_client = data_client
+        self.snapshot_path = snapshot_path
+        if self.snapshot_path:
+            self.load_snapshot()
+
+        # 'seconds' redraws HH:MM:SS every second; 'tickless' shows HH:MM and
+        # only wakes when the clock text or the "Upd" age actually changes
+        self.clock_mode = clock_mode
+        self.wakeups = 0
+        self.wakeups_started = time.monotonic()
         self.time_timer = QTimer(self)
-        self.time_timer.timeout.connect(self.update_time_cell)
-        self.time_timer.start(1000)  # 1 second in milliseconds
+        self.time_timer.timeout.connect(self.on_clock_timer)
+        if self.clock_mode == 'tickless':
+            self.time_timer.setSingleShot(True)
+            self.time_timer.setTimerType(Qt.PreciseTimer)
+            self.schedule_clock_tick()
+        else:
+            self.time_timer.start(1000)  # 1 second in milliseconds
+
+        self.wakeup_timer = QTimer(self)
+        self.wakeup_timer.timeout.connect(self.log_wakeups)
+        self.wakeup_timer.start(3600000)  # 1 hour in milliseconds
+
+        if render_stats:
+            self.render_stats_timer = QTimer(self)
+            self.render_stats_timer.timeout.connect(self.log_render_stats)
+            self.render_stats_timer.start(60000)
 
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
     def update_cell(self, grid_layout, position, title, text, background_color=None, clickable=False, click_callback=None):
-        # Remove existing widget at the position if any
-        if grid_layout.itemAtPosition(*position):
-            existing_widget = grid_layout.itemAtPosition(*position).widget()
-            existing_widget.setParent(None)
-        label = QLabel(title+"\n"+text, self)
-        label.setAlignment(Qt.AlignCenter)
-        font = label.font()
-        font.setBold(True)
-        font.setPointSize(int(font.pointSize() * 1.5))  # Double the font size
-        label.setFont(font)
         if isinstance(background_color, str):
             background_color = QColor(background_color)
+        if self.dashboard is not None:
+            self.dashboard.set_cell(position, title, text, background_color, click_callback if clickable else None)
+            return
 
-        if background_color:
-            label.setStyleSheet(f"background-color: {background_color.name()}; border: 1px solid black;")
-        else:
-            label.setStyleSheet("border: 1px solid black;")
-        label.setFixedWidth(int(self._ui_width / 3) - self._fudge)
-        label.setFixedHeight(int(self._ui_height / 2) - self._fudge)
-
-        if clickable and click_callback:
-            label.mousePressEvent = lambda e: click_callback()
-            label.setCursor(Qt.PointingHandCursor)
-
-        grid_layout.addWidget(label, *position)
+        # Each grid position keeps one label for the life of the window; only
+        # the text, color and click handler are updated, and only on change
+        label = self.cells.get(position)
+        if label is None:
+            label = TimedLabel(self, self.frame_stats)
+            label.setAlignment(Qt.AlignCenter)
+            label.setFont(self._cell_font())
+            label.setFrameStyle(QFrame.Box | QFrame.Plain)
+            label.setLineWidth(1)
+            label.setFixedWidth(int(self._ui_width / 3) - self._fudge)
+            label.setFixedHeight(int(self._ui_height / 2) - self._fudge)
+            grid_layout.addWidget(label, *position)
+            self.cells[position] = label
+            self.cell_state[position] = {'text': None, 'color': None, 'click': None}
+        state = self.cell_state[position]
+
+        cell_text = title+"\n"+text
+        if cell_text != state['text']:
+            label.setText(cell_text)
+            state['text'] = cell_text
+
+        color_name = background_color.name() if background_color else None
+        if color_name != state['color']:
+            if color_name:
+                label.setAutoFillBackground(True)
+                label.setPalette(self._cell_palette(background_color))
+            else:
+                label.setAutoFillBackground(False)
+                label.setPalette(self.palette())
+            state['color'] = color_name
+
+        click = click_callback if clickable else None
+        if click != state['click']:
+            if click:
+                label.mousePressEvent = lambda e: click()
+                label.setCursor(Qt.PointingHandCursor)
+            else:
+                label.mousePressEvent = lambda e: QLabel.mousePressEvent(label, e)
+                label.unsetCursor()
+            state['click'] = click
+
+    def log_render_stats(self):
+        """Log paint time and CPU use of the active renderer, then start a new sample"""
+        s = self.frame_stats.summary()
+        logging.info(f"Renderer {self.renderer}: {s['frames']} paints, avg {s['avg_paint_ms']:.2f}ms, "
+                     f"max {s['max_paint_ms']:.2f}ms, CPU {s['cpu_percent']:.1f}%")
+        self.frame_stats.reset()
+
+    def _cell_font(self):
+        """Bold cell font at 1.5x the default size, created once"""
+        if self._font is None:
+            self._font = QFont(self.font())
+            self._font.setBold(True)
+            self._font.setPointSize(int(self._font.pointSize() * 1.5))  # Double the font size
+        return self._font
+
+    def _cell_palette(self, color):
+        """Palette with the given background color, created once per color"""
+        palette = self._palettes.get(color.name())
+        if palette is None:
+            palette = QPalette(self.palette())
+            palette.setColor(QPalette.Window, color)
+            self._palettes[color.name()] = palette
+        return palette
 
 
     def datacell(self, position, title):
@@ -130,6 +251,18 @@ class MainWindow(QWidget):
         #grid_layout.setSpacing(0)
         self.setLayout(grid_layout)
 
+        if self.renderer in ('painted', 'framebuffer'):
+            # One widget paints every cell; update_cell hands cells to it
+            grid_layout.setContentsMargins(0, 0, 0, 0)
+            options = dict(fudge=self._fudge, font=self._cell_font(), background=QColor(211, 211, 211),
+                           frame_stats=self.frame_stats)
+            if self.renderer == 'framebuffer':
+                self.dashboard = FramebufferDashboard(self, self._ui_width, self._ui_height, self.framebuffer,
+                                                      **options)
+            else:
+                self.dashboard = DashboardWidget(self, self._ui_width, self._ui_height, **options)
+            grid_layout.addWidget(self.dashboard, 0, 0)
+
         titles = [
             "Launches", "Surf", "Sunrise/set"
         ]
@@ -147,242 +280,9 @@ class MainWindow(QWidget):
         for position, text in zip(positions, cell_texts):
             self.update_cell(grid_layout, position,"", text)
 
-    def fetch_launches(self):
-        """Fetch launch data and return raw data structure"""
-        logging.info(f"Fetching launches at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        url = 'https://nextspaceflight.com/launches/nsf_launches/10/'
-        response = requests.get(url)
-        data = response.json()
-        filtered_data = []
-        tz = pytz.timezone('America/Los_Angeles')
-        current_time = datetime.now(tz)
-        for item in data:
-            if any(loc in item['location'].lower() for loc in ['vandenberg', 'chica']):
-                net_time = dateparser.parse(item['net'])
-                time_diff = net_time - current_time
-                days = time_diff.days
-                hours = time_diff.seconds // 3600
-                time_diff_str = f"{days}D {hours}H"
-                filtered_data.append({
-                    'name': item['name'],
-                    'net': net_time,
-                    'time_diff': time_diff_str,
-                    'time_diff_days': days,
-                    'time_diff_hours': hours
-                })
-        logging.info(f"Fetched {len(filtered_data)} launches")
-        return filtered_data
-
-
-    def fetch_surf(self):
-        """Fetch surf data and return raw data structure"""
-        url = 'https://surfcaptain.com/forecast/pacific-beach-california'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        surf_forecast = soup.select_one('#fcst-current-title')
-        import re
-        surf_forecast_text = surf_forecast.text if surf_forecast else 'N/A'
-        logging.info(f"Surf forecast text: {surf_forecast_text}")
-        match = re.search(r'([\d\-\+]+)', surf_forecast_text)
-        surf_forecast_formatted = f"{match.group(1)}FT" if match else 'N/A'
-        logging.info(f"Formatted surf forecast: {surf_forecast_formatted}")
-
-        surf_text = surf_forecast_formatted
-        match = re.search(r'(\d+)(?:\+\d*)?FT$', surf_text)
-        surf_height = int(match.group(1)) if match else 0
-
-        # Extract water temperature - specifically target the WATER TEMP section
-        # The page has multiple temperature readings (air temp and water temp)
-        # We need to find the one in the WATER TEMP section, not the WEATHERFORECAST section
-        water_temp = 'N/A'
-
-        # Strategy 1: Find element containing "WATER TEMP" text, then find temperature nearby
-        water_temp_labels = soup.find_all(text=re.compile(r'WATER TEMP', re.I))
-        for label in water_temp_labels:
-            # Find the parent element containing this text
-            parent = label.find_parent()
-            if parent:
-                # Look for .current-data-desc within this section or nearby siblings
-                water_temp_elem = parent.find(class_='current-data-desc')
-                if not water_temp_elem:
-                    # Try finding in parent's parent
-                    grandparent = parent.find_parent()
-                    if grandparent:
-                        water_temp_elem = grandparent.find(class_='current-data-desc')
-                if water_temp_elem:
-                    temp_text = water_temp_elem.get_text(strip=True)
-                    temp_match = re.search(r'(\d+)°', temp_text)
-                    if temp_match:
-                        water_temp = f"{temp_match.group(1)}°"
-                        logging.info(f"Water temperature (method 1): {water_temp}")
-                        break
-
-        # Strategy 2: If not found, look for elements with "Wetsuit" (water temp indicator)
-        if water_temp == 'N/A':
-            all_data_desc = soup.find_all(class_='current-data-desc')
-            for elem in all_data_desc:
-                temp_text = elem.get_text(strip=True)
-                # Skip air temperature elements (they contain "mph" for wind speed)
-                if 'mph' in temp_text.lower():
-                    continue
-                # Water temp typically contains "Wetsuit" or has format like "63°3/2"
-                if 'wetsuit' in temp_text.lower():
-                    temp_match = re.search(r'(\d+)°', temp_text)
-                    if temp_match:
-                        water_temp = f"{temp_match.group(1)}°"
-                        logging.info(f"Water temperature (method 2): {water_temp}")
-                        break
-
-        return {
-            'text': surf_text,
-            'height': surf_height,
-            'water_temp': water_temp
-        }
-
-    def fetch_wind(self):
-        """Fetch wind data and return raw data structure"""
-        logging.info(f"Fetching wind data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        url = "https://api.weather.com/v2/pws/observations/current?apiKey=e1f10a1e78da46f5b10a1e78da96f525&stationId=KCASANDI141&numericPrecision=decimal&format=json&units=e"
-        response = requests.get(url)
-        data = response.json()
-
-        if 'observations' in data and data['observations']:
-            observation = data['observations'][0]
-            wind_speed = int(observation['imperial']['windSpeed'])
-            wind_gust = int(observation['imperial']['windGust'])
-            wind_dir = observation['winddir']
-
-            # Convert wind direction to cardinal direction
-            dirs = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE", "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-            ix = round(wind_dir / 22.5) % 16
-            cardinal_dir = dirs[ix]
-
-            logging.info(f"Wind data fetched: {wind_speed}g{wind_gust} {cardinal_dir}")
-            return {
-                'speed': wind_speed,
-                'gust': wind_gust,
-                'direction': cardinal_dir
-            }
-        else:
-            logging.warning("Failed to fetch wind data")
-            return None
-
-    def fetch_tidetimes(self):
-        """Fetch tide times data and return raw data structure"""
-        logging.info("Fetching tide times data")
-        today_date = datetime.now().strftime('%Y%m%d')
-        url = f"https://tidesandcurrents.noaa.gov/cgi-bin/stationtideinfo.cgi?Stationid=9410230&datum=MLLW&timezone=LST_LDT&units=english&clock=12hour&decimalPlaces=2&date={today_date}"
-        response = requests.get(url)
-        if response.status_code != 200:
-            logging.warning("Failed to fetch tide times data")
-            return None
-
-        tide_data = response.text.splitlines()
-        tide_events = []
-        for line in tide_data:
-            parts = line.split('|')
-            if len(parts) == 3:
-                time_str, height, event_type = parts
-                tide_events.append((time_str, event_type))
-
-        current_time = datetime.now()
-        next_event = None
-        for time_str, event_type in tide_events:
-            time_str_dt = datetime.strptime(time_str, '%I:%M %p')
-            current_time_str = current_time.strftime('%I:%M %p')
-            current_time_dt = datetime.strptime(current_time_str, '%I:%M %p')
-            logging.info(f"Comparing time_str: {time_str_dt} with current_time: {current_time_dt}")
-            if time_str_dt > current_time_dt:
-                next_event = (time_str, event_type)
-                break
-
-        if not next_event:
-            # Fetch tomorrow's tide times if no upcoming tide events today
-            tomorrow_date = (current_time + timedelta(days=1)).strftime('%Y%m%d')
-            url = f"https://tidesandcurrents.noaa.gov/cgi-bin/stationtideinfo.cgi?Stationid=9410230&datum=MLLW&timezone=LST_LDT&units=english&clock=12hour&decimalPlaces=2&date={tomorrow_date}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                tide_data = response.text.splitlines()
-                tide_events = []
-                for line in tide_data:
-                    parts = line.split('|')
-                    if len(parts) == 3:
-                        time_str, height, event_type = parts
-                        tide_events.append((time_str, event_type))
-                if tide_events:
-                    next_time, next_type = tide_events[0]
-                    next_event = (next_time, next_type)
-
-        if next_event:
-            next_time, next_type = next_event
-            next_time_dt = datetime.strptime(next_time, '%I:%M %p')
-            next_type = next_type.strip()
-            return {
-                'time': next_time_dt,
-                'time_str': next_time_dt.strftime('%H:%M'),
-                'type': next_type
-            }
-        else:
-            return None
-
-    def fetch_tide(self):
-        """Fetch tide data and return raw data structure"""
-        logging.info(f"Fetching tide data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        url = "https://api.tidesandcurrents.noaa.gov/api/prod//datagetter?&station=9410230&range=1&units=english&datum=MLLW&product=water_level&time_zone=LST_LDT&format=json&application=NOS.COOPS.TAC.COOPSMAP"
-        response = requests.get(url)
-        data = response.json()
-
-        if 'data' in data and len(data['data']) >= 2:
-            last_two_values = data['data'][-2:]
-            last_value = float(last_two_values[-1]['v'])
-            second_last_value = float(last_two_values[-2]['v'])
-
-            trend = "rising" if last_value > second_last_value else "falling"
-            logging.info(f"Tide data: Value: {last_value:.1f}Ft, Trend: {trend}")
-            return {
-                'value': last_value,
-                'trend': trend
-            }
-        else:
-            return {
-                'value': 'N/A',
-                'trend': 'N/A'
-            }
-
-    def fetch_sunriseset(self):
-        """Fetch sunrise/sunset data and return raw data structure"""
-        city = LocationInfo("San Diego", "California", "America/Los_Angeles", 32.7157, -117.1611)
-        s = sun(city.observer, date=datetime.now().date(), tzinfo=city.timezone)
-
-        current_time = datetime.now(tz=pytz.timezone(city.timezone))
-        logging.info(f"Current time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        next_sunrise = s['sunrise']
-        next_sunset = s['sunset']
-
-        if current_time > next_sunset:
-            # If current time is after sunset, calculate sunrise for the next day
-            next_day = datetime.now().date() + timedelta(days=1)
-            s_next_day = sun(city.observer, date=next_day, tzinfo=city.timezone)
-            next_event = 'sunrise'
-            next_event_time = s_next_day['sunrise']
-        elif next_sunrise > current_time and (next_sunset < current_time or next_sunrise < next_sunset):
-            next_event = 'sunrise'
-            next_event_time = next_sunrise
-        else:
-            next_event = 'sunset'
-            next_event_time = next_sunset
-
-        logging.info(f"Next event: {next_event}, Time: {next_event_time.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        return {
-            'event': next_event,
-            'time': next_event_time,
-            'sunrise': next_sunrise,
-            'sunset': next_sunset
-        }
-
     def fetch_current_time(self):
+        if self.clock_mode == 'tickless':
+            return datetime.now().strftime('%H:%M')
         return datetime.now().strftime('%H:%M:%S')
 
     def get_wireless_ssid(self):
@@ -459,68 +359,67 @@ class MainWindow(QWidget):
             logging.warning(f"Error getting IP address: {e}")
         return "N/A"
 
+    def apply_data(self, data):
+        """Merge freshly fetched data into the DataStore (GUI thread only)"""
+        self.apply_results(data)
+        self.update_last_update()
+
+    def update_last_update(self):
+        """Point "Upd" at the last successful network fetch; unchanged if there was none"""
+        last_update = self.last_network_update()
+        if last_update:
+            self.last_update_time = last_update
+            self.data_store['last_update'] = last_update
+
+    def apply_remote_data(self, values, fetched_at):
+        """Merge data received from another clock's DataService (GUI thread only)
+
+        Keeps the server's fetch times, so "Upd" shows the age of the data
+        rather than of the poll. Not persisted: the server keeps the snapshot.
+        """
+        for name, value in values.items():
+            if name not in self.scheduler.intervals or fetched_at.get(name) is None:
+                continue
+            self.set_data(name, value)
+            self.fetched_at[name] = fetched_at[name]
+        self.update_last_update()
+
+    def save_snapshot(self):
+        """Write the snapshot on the worker thread, so the fsync never stalls the display"""
+        snapshot = self.pending_snapshot()
+        if snapshot:
+            self.thread_pool.start(QRunnable.create(partial(storage.write_snapshot, self.snapshot_path, snapshot)))
+
+    def load_snapshot(self):
+        """Restore the last persisted DataStore so the first paint shows last-known values"""
+        if self.restore_snapshot():
+            self.update_last_update()
+            self.update_all_cells()
+            self.publish()
+
     def update_all_data(self):
         """Fetch all data sources and store in DataStore"""
-        try:
-            self.data_store['launches'] = self.fetch_launches()
-        except Exception as e:
-            logging.error(f"Error fetching launches: {e}", exc_info=True)
-            self.data_store['launches'] = []
-
-        try:
-            self.data_store['surf'] = self.fetch_surf()
-        except Exception as e:
-            logging.error(f"Error fetching surf: {e}", exc_info=True)
-            self.data_store['surf'] = None
-
-        try:
-            self.data_store['wind'] = self.fetch_wind()
-        except Exception as e:
-            logging.error(f"Error fetching wind: {e}", exc_info=True)
-            self.data_store['wind'] = None
-
-        try:
-            self.data_store['tide'] = self.fetch_tide()
-        except Exception as e:
-            logging.error(f"Error fetching tide: {e}", exc_info=True)
-            self.data_store['tide'] = None
-
-        try:
-            self.data_store['tide_times'] = self.fetch_tidetimes()
-        except Exception as e:
-            logging.error(f"Error fetching tide times: {e}", exc_info=True)
-            self.data_store['tide_times'] = None
-
-        try:
-            self.data_store['sunriseset'] = self.fetch_sunriseset()
-        except Exception as e:
-            logging.error(f"Error fetching sunrise/sunset: {e}", exc_info=True)
-            self.data_store['sunriseset'] = None
-
-        try:
-            import fetch_nws
-            self.data_store['nws'] = fetch_nws.fetch_nws('92109')
-        except Exception as e:
-            logging.error(f"Error fetching NWS data: {e}", exc_info=True)
-            self.data_store['nws'] = None
-
-        self.data_store['last_update'] = datetime.now()
-        self.last_update_time = datetime.now()
+        self.apply_data(self.collect_all_data())
 
     def render_launch_cell(self, data_store):
         """Render launch cell using data from DataStore"""
-        launches = data_store.get('launches', [])
         sunriseset = data_store.get('sunriseset')
+        tz = pytz.timezone('America/Los_Angeles')
+        current_time = datetime.now(tz)
+        if data_store.get('launches') is None:  # Not fetched yet, or expired
+            return "N/A", None
+        # Launches are fetched hourly; skip any whose NET has passed since
+        launches = [launch for launch in data_store['launches'] if launch['net'] > current_time]
 
         if not launches:
             return "None", None
 
         next_launch = launches[0]
-        tz = pytz.timezone('America/Los_Angeles')
-        days = next_launch['time_diff_days']
-        hours = next_launch['time_diff_hours']
+        time_diff = next_launch['net'] - current_time
+        days = time_diff.days
+        hours = time_diff.seconds // 3600
 
-        launch_text = f"{next_launch['name']}\n{next_launch['time_diff']}"
+        launch_text = f"{next_launch['name']}\n{days}D {hours}H"
 
         # Check if launch is within N minutes of sunrise or sunset
         sunrise_sunset_margin = 60
@@ -531,14 +430,18 @@ class MainWindow(QWidget):
 
             if sunriseset:
                 launch_time = next_launch['net']
-                sunrise_time = sunriseset['sunrise']
-                sunset_time = sunriseset['sunset']
-
-                # Check if within 2 hours of sunrise or sunset
-                time_diff_sunrise = abs((launch_time - sunrise_time).total_seconds())
-                time_diff_sunset = abs((launch_time - sunset_time).total_seconds())
+                nearest = None
+                if self.astro.covers(launch_time.astimezone(tz).date()):
+                    nearest = self.astro.nearest(launch_time, ('sunrise', 'sunset'))
+                if nearest:
+                    # Closest sunrise/sunset to the launch, whichever day it's on
+                    time_diffs = [abs((launch_time - nearest[0]).total_seconds())]
+                else:
+                    # No table yet (e.g. restored from a snapshot), use today's times
+                    time_diffs = [abs((launch_time - sunriseset['sunrise']).total_seconds()),
+                                  abs((launch_time - sunriseset['sunset']).total_seconds())]
 
-                if time_diff_sunrise <= (sunrise_sunset_margin * 60) or time_diff_sunset <= (sunrise_sunset_margin * 60):
+                if min(time_diffs) <= (sunrise_sunset_margin * 60):
                     color = self._color_orange
                 else:
                     color = self._color_green
@@ -626,54 +529,162 @@ class MainWindow(QWidget):
 
         return sun_text, None
 
+    # Cells whose text also depends on the current time, re-rendered every minute
+    clock_cells = {'render_launch_cell'}
+
+    # Grid cells: position, title, render function and the DataStore keys it reads
+    cell_specs = [
+        ((0, 0), "Launches", 'render_launch_cell', ('launches', 'sunriseset')),
+        ((0, 2), "Surf", 'render_surf_cell', ('surf',)),
+        ((1, 1), "Wind", 'render_wind_cell', ('wind', 'nws')),
+        ((1, 0), "Tides", 'render_tide_cell', ('tide', 'tide_times')),
+        ((0, 1), "Sunrise/Set", 'render_sunriseset_cell', ('sunriseset',)),
+    ]
+
+    @staticmethod
+    def format_age(seconds):
+        """Short age for a cell's staleness badge, e.g. 12m, 3h, 2d"""
+        if seconds < 3600:
+            return f"{int(seconds // 60)}m"
+        if seconds < 86400:
+            return f"{int(seconds // 3600)}h"
+        return f"{int(seconds // 86400)}d"
+
+    def expire_data(self, now):
+        """Drop values older than their source's max_age"""
+        for name, fetched in list(self.fetched_at.items()):
+            if self.scheduler.freshness(name, (now - fetched).total_seconds()) == 'expired':
+                logging.warning(f"{name} is older than its max age, no longer showing it")
+                self.set_data(name, self.empty_values.get(name))
+                del self.fetched_at[name]
+
+    def age_badge(self, inputs, now):
+        """Return the age of the oldest stale DataStore key among inputs, or '' if all are fresh"""
+        ages = []
+        for name in inputs:
+            if name not in self.fetched_at:
+                continue
+            age = (now - self.fetched_at[name]).total_seconds()
+            if self.scheduler.freshness(name, age) == 'stale':
+                ages.append(age)
+        return self.format_age(max(ages)) if ages else ''
+
     def update_all_cells(self):
-        """Update all cells using render functions"""
+        """Update all cells using render functions
+
+        A cell is only re-rendered when the version of one of the DataStore
+        keys it reads, or its staleness badge, has changed since it was last
+        rendered (or, for clock_cells, the minute has). Stale values stay on screen with their age next to the
+        title until they are refreshed or expire. Cells none of whose keys
+        have been set yet keep showing "Loading".
+        """
         # Don't update cells if overlay is visible
         if self.overlay_visible:
             return
 
         grid_layout = self.layout()
-
-        try:
-            text, color = self.render_launch_cell(self.data_store)
-            self.update_cell(grid_layout, (0, 0), "Launches", text, color)
-        except Exception as e:
-            logging.error(f"Error rendering launch cell: {e}", exc_info=True)
-            self.update_cell(grid_layout, (0, 0), "Launches", "Error", None)
-
-        try:
-            text, color = self.render_surf_cell(self.data_store)
-            self.update_cell(grid_layout, (0, 2), "Surf", text, color)
-        except Exception as e:
-            logging.error(f"Error rendering surf cell: {e}", exc_info=True)
-            self.update_cell(grid_layout, (0, 2), "Surf", "Error", None)
-
-        try:
-            text, color = self.render_wind_cell(self.data_store)
-            self.update_cell(grid_layout, (1, 1), "Wind", text, color)
-        except Exception as e:
-            logging.error(f"Error rendering wind cell: {e}", exc_info=True)
-            self.update_cell(grid_layout, (1, 1), "Wind", "Error", None)
-
-        try:
-            text, color = self.render_tide_cell(self.data_store)
-            self.update_cell(grid_layout, (1, 0), "Tides", text, color)
-        except Exception as e:
-            logging.error(f"Error rendering tide cell: {e}", exc_info=True)
-            self.update_cell(grid_layout, (1, 0), "Tides", "Error", None)
-
-        try:
-            text, color = self.render_sunriseset_cell(self.data_store)
-            self.update_cell(grid_layout, (0, 1), "Sunrise/Set", text, color)
-        except Exception as e:
-            logging.error(f"Error rendering sunrise/set cell: {e}", exc_info=True)
-            self.update_cell(grid_layout, (0, 1), "Sunrise/Set", "Error", None)
+        now = datetime.now()
+        self.expire_data(now)
+
+        for position, title, render_name, inputs in self.cell_specs:
+            # Nothing fetched or restored for this cell yet: keep "Loading"
+            if not any(key in self.data_versions or key in self.fetched_at for key in inputs):
+                continue
+            badge = self.age_badge(inputs, now)
+            if badge:
+                title = f"{title} ({badge})"
+            versions = tuple(self.data_versions.get(key, 0) for key in inputs) + (badge,)
+            if render_name in self.clock_cells:
+                versions += (now.replace(second=0, microsecond=0),)
+            if self.rendered_versions.get(position) == versions:
+                self.render_counts['skipped'] += 1
+                metrics.REGISTRY.count_render(render_name, 'skipped')
+                continue
+            self.render_counts['executed'] += 1
+            metrics.REGISTRY.count_render(render_name, 'executed')
+            self.rendered_versions[position] = versions
+            try:
+                start = time.perf_counter()
+                text, color = getattr(self, render_name)(self.data_store)
+                metrics.REGISTRY.observe_render(render_name, time.perf_counter() - start)
+                self.update_cell(grid_layout, position, title, text, color)
+            except Exception as e:
+                logging.error(f"Error rendering {title} cell: {e}", exc_info=True)
+                self.update_cell(grid_layout, position, title, "Error", None)
 
     def update_data(self):
         """Fetch all data and update all cells"""
         self.update_all_data()  # Fetch all data into DataStore
         self.update_all_cells()  # Update all cells using DataStore
 
+    def request_update(self):
+        """Fetch the due data sources on a worker thread, then update all cells on the GUI thread"""
+        self.wakeups += 1
+        if self.fetch_worker is not None:
+            logging.info("Background fetch still running, skipping this refresh")
+            return
+        if self.data_client:
+            self.fetch_worker = FetchWorker(self.data_client.poll)
+            self.fetch_worker.signals.finished.connect(self.on_remote_data)
+            self.fetch_worker.signals.failed.connect(self.on_remote_failed)
+            self.thread_pool.start(self.fetch_worker)
+            return
+        due = self.scheduler.due()
+        if not due:
+            self.schedule_next_refresh()
+            return
+        logging.info(f"Refreshing {', '.join(due)}")
+        self.fetch_worker = FetchWorker(lambda: self.collect_all_data(due))
+        self.fetch_worker.signals.finished.connect(self.on_fetch_finished)
+        self.fetch_worker.signals.failed.connect(partial(self.on_fetch_failed, due))
+        self.thread_pool.start(self.fetch_worker)
+
+    def on_fetch_finished(self, data):
+        """Receive data from the background fetch worker"""
+        self.fetch_worker = None
+        self.apply_data(data)
+        self.update_all_cells()
+        # The "Upd" age may have reset, so redraw it and realign the clock timer
+        self.update_time_cell()
+        if self.clock_mode == 'tickless':
+            self.schedule_clock_tick()
+        self.schedule_next_refresh()
+
+    def on_fetch_failed(self, due, error):
+        """The refresh cycle itself raised; count it against the sources it was fetching
+
+        Nothing was fetched, so last_update is left alone, and the failures
+        push the retry out to the sources' intervals (or breaker backoff).
+        """
+        self.fetch_worker = None
+        for name in due:
+            self.scheduler.mark_failed(name)
+        self.schedule_next_refresh()
+
+    def on_remote_data(self, update):
+        """Receive one long-poll result ((values, fetched_at), or None if unchanged) and poll again"""
+        self.fetch_worker = None
+        if update is not None:
+            self.apply_remote_data(*update)
+            self.update_all_cells()
+            self.update_time_cell()
+            if self.clock_mode == 'tickless':
+                self.schedule_clock_tick()
+        self.timer.start(0)
+
+    def on_remote_failed(self, error):
+        """Server unreachable; the worker already logged why. Keep the data and retry shortly"""
+        self.fetch_worker = None
+        self.timer.start(self.remote_retry * 1000)
+
+    def schedule_next_refresh(self):
+        """Arm the refresh timer for when the next source is due"""
+        seconds = self.scheduler.seconds_until_due()
+        if seconds is None:
+            return
+        # One second of slack so the source is due by the time the timer fires
+        self.timer.start(int(seconds * 1000) + 1000)
+
     def show_overlay(self):
         """Show the overlay dialog with additional details"""
         if self.overlay is None:
@@ -688,15 +699,20 @@ class MainWindow(QWidget):
                     widget.setText(f"SSID: {ssid}")
                 elif widget.text().startswith("IP Address:"):
                     widget.setText(f"IP Address: {ip_address}")
+            self.show_overlay_page(self.overlay_page)
         self.overlay_visible = True
         self.overlay.raise_()
         self.overlay.show()
 
     def hide_overlay(self):
-        """Hide the overlay dialog"""
+        """Hide the overlay dialog and catch up on the updates skipped while it was open"""
         if self.overlay:
             self.overlay_visible = False
             self.overlay.hide()
+            self.update_time_cell()
+            self.update_all_cells()
+            if self.clock_mode == 'tickless':
+                self.schedule_clock_tick()
 
     def create_overlay(self):
         """Create the overlay widget"""
@@ -753,6 +769,21 @@ class MainWindow(QWidget):
         ip_label.setStyleSheet("background-color: transparent; border: none;")
         ip_label.setGeometry(20, 100, content_box_width - 40, 30)
 
+        # Second page: per-source fetch metrics, shown with the ">" button
+        metrics_label = QLabel("", content_box)
+        metrics_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        metrics_label.setStyleSheet("background-color: transparent; border: none;")
+        metrics_label.setGeometry(10, 50, content_box_width - 20, content_box_height - 60)
+        self.overlay_title = details_label
+        self.overlay_metrics = metrics_label
+        self.overlay_pages = [("Additional Details", [ssid_label, ip_label]), ("Fetch Metrics", [metrics_label])]
+        self.show_overlay_page(0)
+
+        page_button = QPushButton(">", content_box)
+        page_button.setStyleSheet("background-color: #dddddd; border: 1px solid black; font-size: 20px; font-weight: bold;")
+        page_button.setGeometry(content_box_width - 80, 5, 35, 35)
+        page_button.clicked.connect(lambda: self.show_overlay_page((self.overlay_page + 1) % len(self.overlay_pages)))
+
         # Create close button (X) in upper right corner of content box
         close_button = QPushButton("×", content_box)
         close_button.setStyleSheet("background-color: #ff4444; color: white; border: 1px solid black; font-size: 20px; font-weight: bold;")
@@ -761,6 +792,46 @@ class MainWindow(QWidget):
 
         self.overlay.hide()
 
+    def show_overlay_page(self, page):
+        """Show one page of the overlay's details panel"""
+        self.overlay_page = page
+        self.overlay_metrics.setText('\n'.join(metrics.REGISTRY.summary()) or "No fetches yet")
+        for index, (title, widgets) in enumerate(self.overlay_pages):
+            if index == page:
+                self.overlay_title.setText(title)
+            for widget in widgets:
+                widget.setVisible(index == page)
+
+    def on_clock_timer(self):
+        self.wakeups += 1
+        self.update_time_cell()
+        # Age badges and expiry; cells whose badge didn't change are skipped
+        self.update_all_cells()
+        if self.clock_mode == 'tickless':
+            self.schedule_clock_tick()
+
+    def seconds_until_clock_change(self, now=None):
+        """Seconds until the HH:MM text or the "Upd -NM" age next changes"""
+        now = now or datetime.now()
+        seconds = 60 - now.second - now.microsecond / 1e6
+        if self.last_update_time:
+            elapsed = (now - self.last_update_time).total_seconds()
+            seconds = min(seconds, 60 - elapsed % 60)
+        return seconds
+
+    def schedule_clock_tick(self):
+        """Arm the tickless clock timer for the next change, a few ms past it"""
+        self.time_timer.start(int(self.seconds_until_clock_change() * 1000) + 20)
+
+    def wakeups_per_hour(self):
+        """Timer wakeups per hour since the window was created"""
+        hours = (time.monotonic() - self.wakeups_started) / 3600
+        return self.wakeups / hours if hours > 0 else 0.0
+
+    def log_wakeups(self):
+        self.wakeups += 1
+        logging.info(f"Clock mode {self.clock_mode}: {self.wakeups_per_hour():.0f} wakeups/hour")
+
     def update_time_cell(self):
         # Don't update clock cell if overlay is visible
         if self.overlay_visible:
@@ -787,16 +858,84 @@ class MainWindow(QWidget):
 
 if __name__ == '__main__':
 
+    parser = argparse.ArgumentParser(description='Pacific Beach clock')
+    parser.add_argument('--renderer', choices=['labels', 'painted', 'framebuffer'], default='labels',
+                        help='labels: one QLabel per cell; painted: one widget drawing cached pixmaps; '
+                             'framebuffer: the painted cells written to --framebuffer, no X server or touch')
+    parser.add_argument('--framebuffer', default='/dev/fb0', metavar='PATH',
+                        help='framebuffer device (or a raw/.png file) for --renderer framebuffer')
+    parser.add_argument('--render-stats', action='store_true',
+                        help='log paint time and CPU use every minute to compare renderers')
+    parser.add_argument('--clock-mode', choices=['seconds', 'tickless'], default='seconds',
+                        help='tickless: show HH:MM and only wake when the display changes (low power)')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve fetch and render metrics in Prometheus format on this port')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help='address the metrics endpoint listens on (0.0.0.0 to scrape from the LAN)')
+    parser.add_argument('--serve-data', type=int, metavar='PORT',
+                        help='share fetched data with other clocks over HTTP on this port')
+    parser.add_argument('--serve-data-host', default='0.0.0.0',
+                        help='address the data service listens on')
+    parser.add_argument('--data-from', metavar='URL',
+                        help="show data from another clock's --serve-data (http://pbclock.local:8088) "
+                             "or a local fetchd (unix:PATH) instead of fetching")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print import and first-paint times, then exit')
+    parser.add_argument('--startup-budget', type=float, metavar='SECONDS',
+                        help='with --profile-startup, exit with status 1 if first paint takes longer')
+    args, qt_args = parser.parse_known_args()
+
+    profiler = startup.StartupProfiler()
+    profiler.mark('imports')
+
     print(os.getpid())
     print(os.getppid())
-    app = QApplication(sys.argv)
-    main_window = MainWindow()
+    if args.renderer == 'framebuffer':
+        # Nothing is shown, so no display server is needed
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QApplication(sys.argv[:1] + qt_args)
+    profiler.mark('qapplication')
+    # A display fed by --data-from only renders; the server persists the data
+    main_window = MainWindow(snapshot_path=None if args.data_from else storage.snapshot_path(),
+                             astro_path=os.path.join(storage.cache_dir(), 'astro.json'),
+                             renderer=args.renderer,
+                             render_stats=args.render_stats,
+                             clock_mode=args.clock_mode,
+                             framebuffer=args.framebuffer,
+                             data_service=dataservice.DataService((args.serve_data_host, args.serve_data))
+                             if args.serve_data is not None else None,
+                             data_client=dataservice.DataServiceClient(args.data_from) if args.data_from else None)
+    profiler.mark('window')
     #print(main_window.fetch_tidetimes())
     #sys.exit(0)
     #print(main_window.fetch_launches())
     #print(main_window.fetch_surf())
-    print('showing main window')
-    main_window.show()
-    QTimer.singleShot(1000, main_window.update_data)  # No longer needed as the timer will handle updates
-    sys.exit(app.exec_())
 
+    def on_first_paint():
+        profiler.mark('first_paint')
+        if args.profile_startup:
+            print(profiler.report(LAZY_MODULES))
+            if args.startup_budget is not None and not profiler.within_budget(args.startup_budget):
+                print(f"First paint took {profiler.marks['first_paint']:.3f}s, over the {args.startup_budget:.3f}s budget")
+                app.exit(1)
+            else:
+                app.exit(0)
+            return
+        logging.info(f"Startup profile:\n{profiler.report(LAZY_MODULES)}")
+        # Only now pay for the heavy imports the fetchers need, if this clock fetches at all
+        if not main_window.data_client:
+            fetch_nws.configure_cache(os.path.join(storage.cache_dir(), 'nws_lookups.json'))
+        if args.metrics_port is not None:
+            metrics.start_server(args.metrics_port, args.metrics_host)
+        if main_window.data_service:
+            main_window.data_service.start()
+        QTimer.singleShot(1000, main_window.request_update)  # First fetch; each fetch re-arms the refresh timer
+
+    if args.renderer == 'framebuffer':
+        main_window.dashboard.on_first_frame = on_first_paint
+    else:
+        # The painted dashboard covers the whole window, which then gets no paint events of its own
+        startup.FirstPaintFilter(main_window.dashboard or main_window, on_first_paint)
+        print('showing main window')
+        main_window.show()
+    sys.exit(app.exec_())
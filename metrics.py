@@ -0,0 +1,224 @@
+"""Per-source fetch and render metrics in Prometheus text format
+
+The refresh engine records how long each source's fetch takes and whether
+it succeeded, the refresh scheduler records each source's circuit breaker
+state, transport records the bytes each source downloads, and
+MainWindow records how long each render_*_cell call takes. Other modules
+(e.g. transport's cache counters) add collectors that are read at scrape
+time. start_server() serves everything at /metrics.
+"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds; fetches are 10 ms - 30 s, renders microseconds - milliseconds
+FETCH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RENDER_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# States of refresh.CircuitBreaker
+BREAKER_STATES = ('closed', 'open', 'half_open')
+
+
+class Histogram:
+    """Bucketed observations with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield (le, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _sample(name, labels, value):
+    value = str(value) if isinstance(value, int) else repr(float(value))
+    return f"{name}{{{_labels(labels)}}} {value}" if labels else f"{name} {value}"
+
+
+class Metrics:
+    """Thread-safe registry of fetch and render measurements"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.collectors = []
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.fetch_latency = {}
+            self.fetch_outcomes = {}
+            self.last_success = {}
+            self.response_bytes = {}
+            self.render_latency = {}
+            self.render_results = {}  # cell -> {'executed': n, 'skipped': n}
+            self.breakers = {}  # source -> (state, consecutive failures)
+            self.breaker_opens = {}
+
+    def observe_fetch(self, source, seconds, outcome):
+        """Record one fetch of source; outcome is 'ok', 'error' or 'late'
+
+        None records only the latency, of a late fetch that finished after
+        its outcome was recorded.
+        """
+        with self.lock:
+            if outcome != 'late':
+                self.fetch_latency.setdefault(source, Histogram(FETCH_BUCKETS)).observe(seconds)
+            if outcome is None:
+                return
+            outcomes = self.fetch_outcomes.setdefault(source, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            if outcome == 'ok':
+                self.last_success[source] = self.clock()
+
+    def add_bytes(self, source, count):
+        with self.lock:
+            self.response_bytes[source] = self.response_bytes.get(source, 0) + count
+
+    def observe_render(self, cell, seconds):
+        with self.lock:
+            self.render_latency.setdefault(cell, Histogram(RENDER_BUCKETS)).observe(seconds)
+
+    def count_render(self, cell, result):
+        """Count one update of cell; result is 'executed' or 'skipped' (inputs unchanged)"""
+        with self.lock:
+            results = self.render_results.setdefault(cell, {})
+            results[result] = results.get(result, 0) + 1
+
+    def set_breaker(self, source, state, failures, opened=False):
+        """Record a source's circuit breaker state; opened counts a transition to open"""
+        with self.lock:
+            self.breakers[source] = (state, failures)
+            if opened:
+                self.breaker_opens[source] = self.breaker_opens.get(source, 0) + 1
+
+    def add_collector(self, collector):
+        """Add a callable returning [(name, type, help, [(labels, value), ...]), ...] at scrape time"""
+        self.collectors.append(collector)
+
+    def _families(self):
+        with self.lock:
+            families = [
+                ('pbclock_fetches_total', 'counter', 'Fetches per source by outcome (ok, error, late)',
+                 [({'source': s, 'outcome': o}, n) for s, outcomes in sorted(self.fetch_outcomes.items())
+                  for o, n in sorted(outcomes.items())]),
+                ('pbclock_fetch_last_success_timestamp_seconds', 'gauge', 'Unix time of the last successful fetch',
+                 [({'source': s}, t) for s, t in sorted(self.last_success.items())]),
+                ('pbclock_response_bytes_total', 'counter', 'Response body bytes downloaded per source',
+                 [({'source': s}, n) for s, n in sorted(self.response_bytes.items())]),
+                ('pbclock_breaker_state', 'gauge', 'Circuit breaker state per source (1 for the current state)',
+                 [({'source': s, 'state': state}, int(state == current))
+                  for s, (current, _) in sorted(self.breakers.items()) for state in BREAKER_STATES]),
+                ('pbclock_breaker_consecutive_failures', 'gauge', 'Consecutive failed or late fetches per source',
+                 [({'source': s}, failures) for s, (_, failures) in sorted(self.breakers.items())]),
+                ('pbclock_breaker_opens_total', 'counter', 'Times each source\'s circuit breaker opened',
+                 [({'source': s}, n) for s, n in sorted(self.breaker_opens.items())]),
+                ('pbclock_renders_total', 'counter', 'Cell updates by result (executed, or skipped as unchanged)',
+                 [({'cell': c, 'result': r}, n) for c, results in sorted(self.render_results.items())
+                  for r, n in sorted(results.items())]),
+            ]
+            histograms = [
+                ('pbclock_fetch_duration_seconds', 'Time spent in each source\'s fetch', 'source',
+                 {k: (list(h.cumulative()), h.sum, h.count) for k, h in self.fetch_latency.items()}),
+                ('pbclock_render_duration_seconds', 'Time spent in each render_*_cell call', 'cell',
+                 {k: (list(h.cumulative()), h.sum, h.count) for k, h in self.render_latency.items()}),
+            ]
+        for collector in self.collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logging.warning(f"Metrics collector {collector} failed: {e}")
+        return families, histograms
+
+    def render(self):
+        """Return every metric in Prometheus text exposition format"""
+        families, histograms = self._families()
+        lines = []
+        for name, kind, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample(name, labels, value) for labels, value in samples)
+        for name, help_text, label, series in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (buckets, total, count) in sorted(series.items()):
+                for bound, cumulative in buckets:
+                    lines.append(_sample(f"{name}_bucket", {label: key, 'le': bound}, cumulative))
+                lines.append(_sample(f"{name}_sum", {label: key}, total))
+                lines.append(_sample(f"{name}_count", {label: key}, count))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Return one short line per fetched source for the overlay"""
+        now = self.clock()
+        lines = []
+        with self.lock:
+            for source in sorted(self.fetch_outcomes):
+                outcomes = self.fetch_outcomes[source]
+                histogram = self.fetch_latency.get(source)
+                average = histogram.sum / histogram.count * 1000 if histogram and histogram.count else 0
+                failed = outcomes.get('error', 0) + outcomes.get('late', 0)
+                kb = self.response_bytes.get(source, 0) / 1024
+                if source in self.last_success:
+                    age = f"{(now - self.last_success[source]) / 60:.0f}m ago"
+                else:
+                    age = 'never'
+                state = self.breakers.get(source, ('closed', 0))[0]
+                breaker = '' if state == 'closed' else f", breaker {state.replace('_', '-')}"
+                lines.append(f"{source}: {outcomes.get('ok', 0)} ok, {failed} failed, "
+                             f"{average:.0f}ms, {kb:.0f}KB, {age}{breaker}")
+        return lines
+
+
+REGISTRY = Metrics()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logging.debug(f"metrics: {format % args}")
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve registry at http://host:port/metrics on a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logging.info(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,281 @@
+import functools
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import metrics
+
+
+@dataclass
+class Source:
+    """A single DataStore entry and the function that fetches it
+
+    Args:
+        name: DataStore key the result is stored under
+        fetch: Callable taking no arguments that returns the fetched value.
+            Returning None (nothing usable upstream) counts as a failure.
+        timeout: Seconds to wait for this source before marking it late
+        interval: Seconds between refreshes of this source
+        jitter: Random +/- seconds added to each interval so sources (and
+            clocks) don't all hit their upstreams at the same moment
+        max_age: Seconds after its last successful fetch that a value is
+            dropped rather than shown stale (None: kept until replaced)
+        failure_threshold: Consecutive failures that open the source's circuit breaker
+        max_backoff: Longest an open breaker waits before probing again
+    """
+    name: str
+    fetch: Callable[[], Any]
+    timeout: float = 20.0
+    interval: float = 600.0
+    jitter: float = 0.0
+    max_age: Optional[float] = None
+    failure_threshold: int = 3
+    max_backoff: float = 6 * 3600.0
+
+
+@dataclass
+class RefreshResult:
+    """Outcome of one refresh cycle
+
+    data only contains sources that fetched successfully; failed (errors)
+    and late sources are left out so the caller keeps their last good value.
+    """
+    data: dict = field(default_factory=dict)
+    late: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def _timed_fetch(source):
+    """Run source.fetch; returns (value, error, seconds) and never raises
+
+    A None value (the fetcher logged an upstream failure) is an error.
+    refresh_sources records the outcome, since only it knows whether the
+    value was used or the source was already marked late.
+    """
+    start = time.perf_counter()
+    try:
+        value = source.fetch()
+        if value is None:
+            # Fetchers log and return None instead of raising; don't store that as a value
+            raise ValueError("upstream returned no data")
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+    return value, None, time.perf_counter() - start
+
+
+def _observe_late(name, future):
+    """Record the latency of a late source's abandoned fetch once it finishes, so slow upstreams show up in the histogram"""
+    if not future.cancelled():
+        metrics.REGISTRY.observe_fetch(name, future.result()[2], None)
+
+
+def refresh_sources(sources, deadline=30.0):
+    """Fetch all sources concurrently
+
+    Every source is started at once. A source that has not finished within
+    min(source.timeout, deadline) seconds of the cycle start is marked late
+    and its thread is abandoned; the cycle never takes longer than deadline.
+
+    Args:
+        sources: Iterable of Source
+        deadline: Overall cycle deadline in seconds
+
+    Returns:
+        RefreshResult
+    """
+    sources = list(sources)
+    result = RefreshResult()
+    if not sources:
+        return result
+
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='refresh')
+    pending = {executor.submit(_timed_fetch, source): source for source in sources}
+
+    try:
+        while pending:
+            now = time.monotonic() - start
+            # Mark anything past its own limit as late
+            for future, source in list(pending.items()):
+                if not future.done() and now >= min(source.timeout, deadline):
+                    logging.warning(f"Source {source.name} missed its {min(source.timeout, deadline):.0f}s deadline, keeping previous value")
+                    result.late.append(source.name)
+                    metrics.REGISTRY.observe_fetch(source.name, now, 'late')
+                    future.add_done_callback(functools.partial(_observe_late, source.name))
+                    del pending[future]
+            if not pending:
+                break
+
+            next_limit = min(min(s.timeout, deadline) for s in pending.values())
+            done, _ = wait(list(pending), timeout=max(0, next_limit - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                value, error, seconds = future.result()
+                if error is None:
+                    result.data[source.name] = value
+                    metrics.REGISTRY.observe_fetch(source.name, seconds, 'ok')
+                else:
+                    # The circuit breaker handles repeats; keep the log to one line
+                    logging.error(f"Error fetching {source.name}, keeping previous value: {error}")
+                    logging.debug(f"Traceback for {source.name}", exc_info=error)
+                    result.errors.append(source.name)
+                    metrics.REGISTRY.observe_fetch(source.name, seconds, 'error')
+    finally:
+        # Don't wait for late sources; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    result.elapsed = time.monotonic() - start
+    logging.info(f"Refresh cycle took {result.elapsed:.2f}s "
+                 f"({len(result.data)} fetched, {len(result.late)} late, {len(result.errors)} errors)")
+    return result
+
+
+class CircuitBreaker:
+    """Consecutive-failure tracking for one source
+
+    closed: fetched normally. After threshold consecutive failures it opens
+    and the source isn't fetched at all for a backoff that starts at base
+    seconds and doubles each time it reopens, up to cap, scaled by a random
+    0.5-1.0 so clocks sharing an upstream don't probe it in lockstep. When
+    the backoff ends it is half_open: one probe fetch closes it on success
+    or reopens it on failure.
+    """
+
+    STATES = metrics.BREAKER_STATES
+
+    def __init__(self, threshold=3, base=600.0, cap=6 * 3600.0, rng=random.uniform):
+        self.threshold = threshold
+        self.base = base
+        self.cap = cap
+        self.rng = rng
+        self.state = 'closed'
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = None
+
+    def record_success(self):
+        """Close the breaker; returns True if it wasn't closed"""
+        was_closed = self.state == 'closed'
+        self.state = 'closed'
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = None
+        return not was_closed
+
+    def record_failure(self, now):
+        """Count a failure; returns the backoff in seconds if the breaker (re)opened, else None"""
+        self.failures += 1
+        if self.state != 'half_open' and self.failures < self.threshold:
+            return None
+        backoff = min(self.cap, self.base * 2 ** self.opens) * self.rng(0.5, 1.0)
+        self.opens += 1
+        self.state = 'open'
+        self.retry_at = now + backoff
+        return backoff
+
+    def probe(self):
+        """The open breaker's backoff has ended and its source is being fetched once"""
+        if self.state == 'open':
+            self.state = 'half_open'
+
+
+class RefreshScheduler:
+    """Track when each source is next due for a refresh
+
+    Every source starts out due. After a source is fetched it becomes due
+    again interval (+/- jitter) seconds later. A failed or late source is
+    retried after its interval too (a late fetch may still be running), until its
+    CircuitBreaker opens; it is then not due until the breaker's backoff
+    (starting at twice its interval) ends.
+
+    freshness() classifies a value by its age: fresh until its refresh is
+    overdue, then stale (still shown, with its age) until max_age.
+    """
+
+    # Seconds past interval + jitter before a value counts as stale, for the
+    # refresh timer's slack and the fetch itself
+    stale_grace = 60
+
+
+    def __init__(self, sources, clock=time.monotonic, rng=random.uniform):
+        self.clock = clock
+        self.rng = rng
+        sources = list(sources)
+        self.intervals = {source.name: (source.interval, source.jitter) for source in sources}
+        self.max_ages = {source.name: source.max_age for source in sources}
+        self.breakers = {
+            source.name: CircuitBreaker(source.failure_threshold, base=2 * source.interval,
+                                        cap=source.max_backoff, rng=rng)
+            for source in sources
+        }
+        now = self.clock()
+        self.next_due = {name: now for name in self.intervals}
+
+    def due(self, now=None):
+        """Return the names of all sources due at now
+
+        An open breaker whose backoff has ended goes half-open here, so the
+        caller's fetch of that source is the probe.
+        """
+        now = self.clock() if now is None else now
+        names = [name for name, when in self.next_due.items() if when <= now]
+        for name in names:
+            breaker = self.breakers[name]
+            if breaker.state == 'open':
+                breaker.probe()
+                logging.info(f"Probing {name} after its circuit breaker backoff")
+                metrics.REGISTRY.set_breaker(name, breaker.state, breaker.failures)
+        return names
+
+    def mark_fetched(self, name, now=None):
+        """Schedule the next refresh of a source that was just fetched"""
+        if name not in self.intervals:
+            return
+        now = self.clock() if now is None else now
+        breaker = self.breakers[name]
+        if breaker.record_success():
+            logging.info(f"Circuit breaker for {name} closed")
+        metrics.REGISTRY.set_breaker(name, breaker.state, breaker.failures)
+        self._schedule(name, now)
+
+    def mark_failed(self, name, now=None):
+        """Count a failed or timed out fetch and schedule the retry"""
+        if name not in self.intervals:
+            return
+        now = self.clock() if now is None else now
+        breaker = self.breakers[name]
+        backoff = breaker.record_failure(now)
+        metrics.REGISTRY.set_breaker(name, breaker.state, breaker.failures, opened=backoff is not None)
+        if backoff is not None:
+            logging.warning(f"Circuit breaker for {name} open after {breaker.failures} consecutive failures, "
+                            f"next probe in {backoff:.0f}s")
+            self.next_due[name] = now + backoff
+        else:
+            self._schedule(name, now)
+
+    def freshness(self, name, age):
+        """Return 'fresh', 'stale' or 'expired' for a value of source name fetched age seconds ago"""
+        max_age = self.max_ages.get(name)
+        if max_age is not None and age > max_age:
+            return 'expired'
+        interval, jitter = self.intervals[name]
+        if age > interval + jitter + self.stale_grace:
+            return 'stale'
+        return 'fresh'
+
+    def _schedule(self, name, now):
+        interval, jitter = self.intervals[name]
+        delay = interval + (self.rng(-jitter, jitter) if jitter else 0)
+        self.next_due[name] = now + max(1.0, delay)
+
+    def seconds_until_due(self, now=None):
+        """Return seconds until the next source is due (0 if one is already due)"""
+        if not self.next_due:
+            return None
+        now = self.clock() if now is None else now
+        return max(0.0, min(self.next_due.values()) - now)
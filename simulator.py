@@ -0,0 +1,327 @@
+"""Local record/replay stand-in for pbclock's upstream hosts
+
+Serves captured responses for nextspaceflight, surfcaptain, weather.com,
+tidesandcurrents, api.weather.gov and the geocoders at
+http://127.0.0.1:<port>/<host><path>?<query>. Point pbclock at it with
+
+    python simulator.py --port 8089 --latency-ms 300 --error-rate 0.05
+    PBCLOCK_UPSTREAM=http://127.0.0.1:8089 python main.py
+
+A fixture directory holds manifest.json (one entry per captured URL) and
+the response bodies. --record fetches anything not yet captured from the
+real host once, saves it to the directory and serves it from then on.
+
+The manifest also records the date the responses were captured. Dates in
+replayed bodies are moved forward by whole weeks to the current week, so
+forecasts, tide predictions and launches stay upcoming (and weekdays stay
+right) however old the recording is.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'upstream')
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+# 2024-11-07 (ISO and NOAA) and 'Thu, Nov 07, 2024' (nextspaceflight)
+ISO_DATE_RE = re.compile(rb'(?<!\d)\d{4}-\d{2}-\d{2}(?!\d)')
+LONG_DATE_RE = re.compile(rb'\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun), [A-Z][a-z]{2} \d{1,2}, \d{4}\b')
+
+
+def shift_dates(body, days):
+    """Move every date in body forward by days"""
+    def iso(match):
+        when = datetime.strptime(match.group().decode(), '%Y-%m-%d') + timedelta(days=days)
+        return when.strftime('%Y-%m-%d').encode()
+
+    def long(match):
+        when = datetime.strptime(match.group().decode(), '%a, %b %d, %Y') + timedelta(days=days)
+        return when.strftime('%a, %b %d, %Y').encode()
+
+    return LONG_DATE_RE.sub(long, ISO_DATE_RE.sub(iso, body))
+
+
+@dataclass
+class Faults:
+    """Latency and failures injected into every response
+
+    latency_ms is the mean delay. For 'uniform' the delay is spread
+    +/- jitter_ms around it, for 'lognormal' jitter_ms is the standard
+    deviation. Each request independently hangs for hang_seconds (a client
+    timeout) with probability timeout_rate, gets error_status with
+    probability error_rate, or has its body cut in half with probability
+    truncate_rate.
+    """
+    latency: str = 'fixed'
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    timeout_rate: float = 0.0
+    hang_seconds: float = 20.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    truncate_rate: float = 0.0
+
+    def delay(self, rng):
+        """Return one latency sample in seconds"""
+        mean = self.latency_ms / 1000
+        jitter = self.jitter_ms / 1000
+        if mean <= 0:
+            return 0.0
+        if self.latency == 'uniform':
+            return max(0.0, rng.uniform(mean - jitter, mean + jitter))
+        if self.latency == 'exponential':
+            return rng.expovariate(1 / mean)
+        if self.latency == 'lognormal':
+            # Parameters of the underlying normal giving this mean and standard deviation
+            sigma2 = math.log(1 + (jitter / mean) ** 2)
+            return rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        return mean
+
+
+class Recording:
+    """Captured responses in a fixture directory
+
+    manifest.json lists entries with host, path, query, status,
+    content_type and file (a body path relative to the directory), and
+    the date they were captured.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = []
+        self.captured = None
+        self.lock = threading.Lock()
+        self.load()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, 'manifest.json')
+
+    def load(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        self.entries = manifest.get('entries', [])
+        self.captured = date.fromisoformat(manifest['captured']) if 'captured' in manifest else None
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = {'captured': self.captured.isoformat()} if self.captured else {}
+        manifest['entries'] = self.entries
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+            f.write('\n')
+
+    def date_shift(self, today=None):
+        """Days to move replayed dates forward: whole weeks from the capture date to today"""
+        if self.captured is None:
+            return 0
+        today = today or date.today()
+        return max(0, (today - self.captured).days // 7 * 7)
+
+    def find(self, host, path, query, exact=False):
+        """Return the entry for a request, or None
+
+        An exact match wins; otherwise (unless exact is set) the entry for
+        the same host and path sharing the most query parameters, so e.g. a
+        different begin_date still replays while water_level and predictions
+        stay apart.
+        """
+        params = set(urllib.parse.parse_qsl(query))
+        best, best_score = None, -1
+        with self.lock:
+            for entry in self.entries:
+                if entry['host'] != host or entry['path'].replace('//', '/') != path.replace('//', '/'):
+                    continue
+                if entry['query'] == query:
+                    return entry
+                if exact:
+                    continue
+                entry_params = set(urllib.parse.parse_qsl(entry['query']))
+                score = len(entry_params & params)
+                if score > best_score:
+                    best, best_score = entry, score
+        return best
+
+    def body(self, entry):
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            return f.read()
+
+    def add(self, host, path, query, status, content_type, body):
+        """Save a captured response and return its entry"""
+        extension = 'json' if 'json' in content_type else 'html' if 'html' in content_type else 'txt'
+        with self.lock:
+            name = f"{len(self.entries):03d}-{host}.{extension}"
+            os.makedirs(os.path.join(self.directory, 'bodies'), exist_ok=True)
+            with open(os.path.join(self.directory, 'bodies', name), 'wb') as f:
+                f.write(body)
+            entry = {'host': host, 'path': path, 'query': query, 'status': status,
+                     'content_type': content_type, 'file': f"bodies/{name}"}
+            self.entries.append(entry)
+            if self.captured is None:
+                self.captured = date.today()
+            self.save()
+        return entry
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.debug(f"simulator: {format % args}")
+
+    def do_GET(self):
+        server = self.server
+        if self.path == '/__stats__':
+            self.send_body(200, 'application/json', json.dumps(server.stats_snapshot()).encode())
+            return
+
+        parts = urllib.parse.urlsplit(self.path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        path = '/' + path
+        server.count(host, 'requests')
+
+        faults = server.faults
+        with server.lock:
+            delay = faults.delay(server.rng)
+            roll = server.rng.random()
+        time.sleep(delay)
+
+        if roll < faults.timeout_rate:
+            server.count(host, 'timeouts')
+            time.sleep(faults.hang_seconds)
+            self.close_connection = True
+            return
+        roll -= faults.timeout_rate
+        if roll < faults.error_rate:
+            server.count(host, 'errors')
+            self.send_body(faults.error_status, 'text/plain', b'Simulated upstream error')
+            return
+        roll -= faults.error_rate
+
+        if server.record:
+            entry = server.recording.find(host, path, parts.query, exact=True) or server.capture(host, path, parts.query)
+        else:
+            entry = server.recording.find(host, path, parts.query)
+        if entry is None:
+            server.count(host, 'missing')
+            self.send_body(404, 'text/plain', f"No recording for {host}{path}".encode())
+            return
+
+        body = server.recording.body(entry)
+        shift = server.recording.date_shift()
+        if shift and server.shift_dates:
+            body = shift_dates(body, shift)
+        if roll < faults.truncate_rate:
+            server.count(host, 'truncated')
+            self.send_body(entry['status'], entry['content_type'], body, truncate=True)
+            return
+        self.send_body(entry['status'], entry['content_type'], body)
+
+    def send_body(self, status, content_type, body, truncate=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if truncate:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+        else:
+            self.wfile.write(body)
+
+
+class UpstreamSimulator(ThreadingHTTPServer):
+    """HTTP server replaying a Recording with injected Faults"""
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), directory=DEFAULT_FIXTURES, faults=None,
+                 record=False, record_base=None, seed=None, shift_dates=True):
+        super().__init__(address, SimulatorHandler)
+        self.recording = Recording(directory)
+        self.faults = faults or Faults()
+        self.record = record
+        self.shift_dates = shift_dates
+        # Where captures come from: the real https://<host> unless a base URL is given
+        self.record_base = record_base
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, host, key):
+        with self.lock:
+            counters = self.stats.setdefault(host, {})
+            counters[key] = counters.get(key, 0) + 1
+
+    def stats_snapshot(self):
+        with self.lock:
+            return {host: dict(counters) for host, counters in self.stats.items()}
+
+    def capture(self, host, path, query):
+        """Fetch a response from the real host and record it"""
+        import requests
+        base = f"{self.record_base.rstrip('/')}/{host}" if self.record_base else f"https://{host}"
+        url = f"{base}{path}?{query}" if query else f"{base}{path}"
+        try:
+            response = requests.get(url, timeout=30, headers={'User-Agent': 'pbclock/1.0 (weather app)',
+                                                              'Accept': 'application/geo+json, application/json, */*'})
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not record {url}: {e}")
+            return None
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        logging.info(f"Recorded {url} ({response.status_code}, {len(response.content)} bytes)")
+        self.count(host, 'recorded')
+        return self.recording.add(host, path, query, response.status_code, content_type, response.content)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay (or record) pbclock upstream responses locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='fixture directory with manifest.json')
+    parser.add_argument('--record', action='store_true',
+                        help='fetch and save responses that are not in the fixture directory yet')
+    parser.add_argument('--latency', choices=LATENCY_DISTRIBUTIONS, default='fixed', help='latency distribution')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mean added latency')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='uniform spread or lognormal deviation')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of requests that hang')
+    parser.add_argument('--hang-seconds', type=float, default=20.0, help='how long a hanging request hangs')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--truncate-rate', type=float, default=0.0, help='fraction of bodies cut off halfway')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--no-shift-dates', action='store_true',
+                        help='replay dates as recorded instead of moving them to the current week')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    faults = Faults(latency=args.latency, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                    timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+                    error_rate=args.error_rate, error_status=args.error_status, truncate_rate=args.truncate_rate)
+    server = UpstreamSimulator((args.host, args.port), args.fixtures, faults, record=args.record, seed=args.seed,
+                               shift_dates=not args.no_shift_dates)
+    print(f"Serving {len(server.recording.entries)} recorded responses from {args.fixtures}")
+    print(f"export PBCLOCK_UPSTREAM={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
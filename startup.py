@@ -0,0 +1,55 @@
+import sys
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+import lazy
+
+# Taken when main.py imports this module, before any heavy imports
+STARTED = time.perf_counter()
+
+
+class StartupProfiler:
+    """Record named milestones since startup and check time-to-first-paint"""
+
+    def __init__(self, started=None):
+        self.started = STARTED if started is None else started
+        self.marks = {}
+
+    def mark(self, label):
+        self.marks[label] = time.perf_counter() - self.started
+        return self.marks[label]
+
+    def deferred_modules(self, names):
+        """Return the names among `names` that are still lazy (not yet executed)"""
+        return [name for name in names if name in sys.modules and not lazy.is_loaded(sys.modules[name])]
+
+    def report(self, lazy_names=()):
+        """Return a human readable summary of the milestones"""
+        lines = [f"{label}: {seconds * 1000:.0f} ms" for label, seconds in self.marks.items()]
+        deferred = self.deferred_modules(lazy_names)
+        if deferred:
+            lines.append(f"deferred imports: {', '.join(deferred)}")
+        return '\n'.join(lines)
+
+    def within_budget(self, budget, label='first_paint'):
+        """Return True if milestone `label` was reached within budget seconds"""
+        return label in self.marks and self.marks[label] <= budget
+
+
+class FirstPaintFilter(QObject):
+    """Call callback once, right after the watched widget has painted for the first time"""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        self.fired = False
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not self.fired:
+            self.fired = True
+            obj.removeEventFilter(self)
+            # The paint event is delivered after this filter; run the callback once it's done
+            QTimer.singleShot(0, self.callback)
+        return False
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_SCHEMA = 1
+
+
+def cache_dir():
+    """Return the directory pbclock keeps its local state in, creating it if needed"""
+    path = os.environ.get('PBCLOCK_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'pbclock')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def snapshot_path():
+    """Return the default location of the data_store snapshot"""
+    return os.path.join(cache_dir(), 'snapshot.json')
+
+
+def _encode(obj):
+    if isinstance(obj, datetime):
+        return {'__datetime__': obj.isoformat()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if '__datetime__' in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def dumps(obj):
+    """Serialize obj to compact JSON, encoding datetimes so loads() restores them"""
+    return json.dumps(obj, default=_encode, separators=(',', ':'))
+
+
+def loads(text):
+    """Inverse of dumps()"""
+    return json.loads(text, object_hook=_decode)
+
+
+def atomic_write(path, text):
+    """Write text to path so readers only ever see the old or the new file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def build_snapshot(data_store, fetched_at):
+    """Return the snapshot dictionary for the fetched sources of data_store
+
+    Args:
+        data_store: MainWindow.data_store
+        fetched_at: Dictionary of source name -> datetime of its last successful fetch.
+            Only these sources are included.
+    """
+    return {
+        'schema': SNAPSHOT_SCHEMA,
+        'saved_at': datetime.now(),
+        'sources': {
+            name: {'fetched_at': when, 'value': data_store.get(name)}
+            for name, when in fetched_at.items()
+        }
+    }
+
+
+def parse_snapshot(snapshot):
+    """Split a snapshot dictionary into (values, fetched_at)
+
+    Raises:
+        ValueError: If it isn't a snapshot of the current schema
+    """
+    if not isinstance(snapshot, dict) or snapshot.get('schema') != SNAPSHOT_SCHEMA:
+        raise ValueError(f"unsupported schema {snapshot.get('schema') if isinstance(snapshot, dict) else None}")
+    values = {}
+    fetched_at = {}
+    for name, entry in snapshot.get('sources', {}).items():
+        values[name] = entry.get('value')
+        fetched_at[name] = entry.get('fetched_at')
+    return values, fetched_at
+
+
+def save_snapshot(path, data_store, fetched_at):
+    """Persist the fetched sources of data_store (see build_snapshot)"""
+    write_snapshot(path, build_snapshot(data_store, fetched_at))
+
+
+def write_snapshot(path, snapshot):
+    """Persist a build_snapshot() dictionary, logging rather than raising on failure"""
+    try:
+        atomic_write(path, dumps(snapshot))
+    except (OSError, TypeError, ValueError) as e:
+        logging.warning(f"Error saving snapshot to {path}: {e}")
+
+
+def load_snapshot(path):
+    """Load a snapshot written by save_snapshot
+
+    Returns:
+        Tuple of (values, fetched_at) dictionaries keyed by source name. Both
+        are empty if the file is missing, unreadable or from another schema.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = loads(f.read())
+    except FileNotFoundError:
+        return {}, {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable snapshot {path}: {e}")
+        return {}, {}
+
+    try:
+        values, fetched_at = parse_snapshot(snapshot)
+    except ValueError as e:
+        logging.warning(f"Ignoring snapshot {path}: {e}")
+        return {}, {}
+    logging.info(f"Loaded snapshot with {len(values)} sources from {path}")
+    return values, fetched_at
@@ -0,0 +1,244 @@
+import logging
+import re
+import time
+import tracemalloc
+from html.parser import HTMLParser
+
+from lazy import lazy_import
+
+bs4 = lazy_import('bs4')
+
+TITLE_ID = 'fcst-current-title'
+DATA_DESC_CLASS = 'current-data-desc'
+WATER_TEMP_RE = re.compile(r'WATER TEMP', re.I)
+TEMP_RE = re.compile(r'(\d+)°')
+
+# Elements html.parser never sees an end tag for
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+FEED_CHUNK = 16384
+
+# Page fragments that change between loads but that parse_surf never reads,
+# ignored (along with transport.VOLATILE_PATTERNS) when fingerprinting the page
+VOLATILE_PATTERNS = (
+    rb'Updated [^<]*',
+    rb'data-ad-[\w-]+="[^"]*"',
+)
+
+
+def surf_result(title_text, water_temp):
+    """Build the fetch_surf dictionary from the forecast title text and water temperature"""
+    logging.info(f"Surf forecast text: {title_text}")
+    match = re.search(r'([\d\-\+]+)', title_text)
+    surf_text = f"{match.group(1)}FT" if match else 'N/A'
+    logging.info(f"Formatted surf forecast: {surf_text}")
+    match = re.search(r'(\d+)(?:\+\d*)?FT$', surf_text)
+    return {
+        'text': surf_text,
+        'height': int(match.group(1)) if match else 0,
+        'water_temp': water_temp
+    }
+
+
+def _water_temp_from_wetsuit(desc_texts):
+    """Fallback: the water temp block is the one mentioning a wetsuit (air temp has 'mph')"""
+    for text in desc_texts:
+        if 'mph' in text.lower():
+            continue
+        if 'wetsuit' in text.lower():
+            temp_match = TEMP_RE.search(text)
+            if temp_match:
+                water_temp = f"{temp_match.group(1)}°"
+                logging.info(f"Water temperature (method 2): {water_temp}")
+                return water_temp
+    return 'N/A'
+
+
+def parse_surf_soup(content):
+    """Reference extraction: build the whole BeautifulSoup tree and search it"""
+    soup = bs4.BeautifulSoup(content, 'html.parser')
+
+    surf_forecast = soup.select_one(f'#{TITLE_ID}')
+    title_text = surf_forecast.text if surf_forecast else 'N/A'
+
+    # The page has multiple temperature readings (air temp and water temp)
+    # We need the one in the WATER TEMP section, not the WEATHER FORECAST one
+    water_temp = 'N/A'
+    for label in soup.find_all(string=WATER_TEMP_RE):
+        parent = label.find_parent()
+        if parent:
+            water_temp_elem = parent.find(class_=DATA_DESC_CLASS)
+            if not water_temp_elem:
+                grandparent = parent.find_parent()
+                if grandparent:
+                    water_temp_elem = grandparent.find(class_=DATA_DESC_CLASS)
+            if water_temp_elem:
+                temp_match = TEMP_RE.search(water_temp_elem.get_text(strip=True))
+                if temp_match:
+                    water_temp = f"{temp_match.group(1)}°"
+                    logging.info(f"Water temperature (method 1): {water_temp}")
+                    break
+
+    if water_temp == 'N/A':
+        water_temp = _water_temp_from_wetsuit(
+            elem.get_text(strip=True) for elem in soup.find_all(class_=DATA_DESC_CLASS))
+
+    return surf_result(title_text, water_temp)
+
+
+class SurfPageParser(HTMLParser):
+    """Streaming extractor for the two regions fetch_surf reads
+
+    Keeps only a stack of open elements plus the text of the forecast title
+    and of each current-data-desc element, instead of a tree of the whole
+    page. Each open element gets a serial number so a WATER TEMP label's
+    parent and grandparent can be matched against the desc elements inside
+    them, the same search parse_surf_soup does. Stops consuming input once
+    the title and a water temperature have both been found.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # (tag, serial)
+        self.serial = 0
+        self.pending = []
+        self.title_depth = None
+        self.title_parts = []
+        self.title_text = None
+        self.desc_depth = None
+        self.desc_parts = []
+        self.descs = []  # (ancestor serials, stripped text)
+        self.labels = []  # (parent serial, grandparent serial)
+        self.water_temp = None
+        self.done = False
+
+    def _flush_text(self):
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+        if self.stack and self.stack[-1][0] in ('script', 'style'):
+            return
+        if self.title_depth is not None:
+            self.title_parts.append(text)
+        if self.desc_depth is not None and text.strip():
+            self.desc_parts.append(text.strip())
+        if WATER_TEMP_RE.search(text):
+            parent = self.stack[-1][1] if self.stack else None
+            grandparent = self.stack[-2][1] if len(self.stack) > 1 else None
+            self.labels.append((parent, grandparent))
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_ELEMENTS:
+            return
+        self.serial += 1
+        self.stack.append((tag, self.serial))
+        attrs = dict(attrs)
+        if attrs.get('id') == TITLE_ID and self.title_text is None:
+            self.title_depth = len(self.stack)
+        if self.desc_depth is None and DATA_DESC_CLASS in (attrs.get('class') or '').split():
+            self.desc_depth = len(self.stack)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                self._close_to(i)
+                break
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def _close_to(self, depth):
+        """Pop elements until the stack has `depth` entries"""
+        if self.title_depth is not None and depth < self.title_depth:
+            self.title_text = ''.join(self.title_parts)
+            self.title_depth = None
+        if self.desc_depth is not None and depth < self.desc_depth:
+            ancestors = {serial for _, serial in self.stack}
+            self.descs.append((ancestors, ''.join(self.desc_parts)))
+            self.desc_parts = []
+            self.desc_depth = None
+        open_serials = {serial for _, serial in self.stack[:depth]}
+        del self.stack[depth:]
+        if self.water_temp is None and self.labels:
+            self.water_temp = self._water_temp_from_labels(open_serials)
+        self.done = self.title_text is not None and self.water_temp is not None
+
+    def _water_temp_from_labels(self, open_serials):
+        """Method 1, once every label's grandparent has closed; None if not decided yet"""
+        for parent, grandparent in self.labels:
+            if grandparent in open_serials or (grandparent is None and parent in open_serials):
+                return None
+            for scope in (parent, grandparent):
+                texts = [text for ancestors, text in self.descs if scope in ancestors]
+                if texts:
+                    temp_match = TEMP_RE.search(texts[0])
+                    if temp_match:
+                        water_temp = f"{temp_match.group(1)}°"
+                        logging.info(f"Water temperature (method 1): {water_temp}")
+                        return water_temp
+                    break
+        return None
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        if self.stack:
+            self._close_to(0)
+        elif self.water_temp is None and self.labels:
+            self.water_temp = self._water_temp_from_labels(set())
+
+
+def parse_surf(content):
+    """Extract the surf forecast and water temperature by streaming the page"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    parser = SurfPageParser()
+    for start in range(0, len(content), FEED_CHUNK):
+        parser.feed(content[start:start + FEED_CHUNK])
+        if parser.done:
+            break
+    else:
+        parser.close()
+    water_temp = parser.water_temp
+    if water_temp is None:
+        water_temp = _water_temp_from_wetsuit(text for _, text in parser.descs)
+    return surf_result(parser.title_text if parser.title_text is not None else 'N/A', water_temp)
+
+
+def benchmark(content, rounds=20):
+    """Compare parse time and peak traced memory of parse_surf_soup and parse_surf
+
+    Returns:
+        Dictionary of extractor name -> {'ms': time per parse, 'peak_kb': peak allocation}
+    """
+    results = {}
+    for name, func in (('beautifulsoup', parse_surf_soup), ('streaming', parse_surf)):
+        func(content)  # Warm up imports and regex caches
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(content)
+        elapsed = (time.perf_counter() - start) / rounds
+        tracemalloc.start()
+        func(content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {'ms': elapsed * 1000, 'peak_kb': peak / 1024}
+    return results
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'surf.html')
+    with open(path, 'rb') as f:
+        content = f.read()
+    print(parse_surf(content))
+    for name, result in benchmark(content).items():
+        print(f"{name:14s} {result['ms']:8.2f} ms/parse {result['peak_kb']:10.1f} KB peak")
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, date, timedelta
+
+from astral import LocationInfo
+from astral.sun import sun
+
+# Import the module to test
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from astro import AstroTable, EVENTS
+
+
+class TestAstroTable(unittest.TestCase):
+    """Test suite for the precomputed astronomical table"""
+
+    def setUp(self):
+        self.table = AstroTable(days=10, min_horizon=3)
+        self.table.build(date(2024, 12, 18))
+        self.tz = self.table.location.tzinfo
+        self.city = LocationInfo("San Diego", "California", "America/Los_Angeles", 32.7157, -117.1611)
+
+    def test_matches_astral(self):
+        """Test that table entries match a direct astral calculation"""
+        s = sun(self.city.observer, date=date(2024, 12, 20), tzinfo=self.city.timezone)
+        day = self.table.day(date(2024, 12, 20))
+        self.assertEqual(set(day), set(EVENTS))
+        self.assertEqual(day['sunrise'], s['sunrise'])
+        self.assertEqual(day['dusk'], s['dusk'])
+        self.assertLess(day['nautical_dawn'], day['dawn'])
+        self.assertGreater(day['nautical_dusk'], day['dusk'])
+
+    def test_next_event(self):
+        """Test that the next sunrise/sunset after now is returned"""
+        day = self.table.day(date(2024, 12, 20))
+        noon = datetime(2024, 12, 20, 12, 0, tzinfo=self.tz)
+        self.assertEqual(self.table.next_event(noon), (day['sunset'], 'sunset'))
+
+        night = datetime(2024, 12, 20, 22, 0, tzinfo=self.tz)
+        tomorrow = self.table.day(date(2024, 12, 21))
+        self.assertEqual(self.table.next_event(night), (tomorrow['sunrise'], 'sunrise'))
+
+    def test_next_event_other_kinds(self):
+        """Test that other events can be looked up"""
+        day = self.table.day(date(2024, 12, 20))
+        noon = datetime(2024, 12, 20, 12, 0, tzinfo=self.tz)
+        self.assertEqual(self.table.next_event(noon, ('dusk',)), (day['dusk'], 'dusk'))
+
+    def test_nearest(self):
+        """Test that the closest sunrise/sunset is found on either side"""
+        day = self.table.day(date(2024, 12, 20))
+        self.assertEqual(self.table.nearest(day['sunset'] + timedelta(minutes=20)), (day['sunset'], 'sunset'))
+        self.assertEqual(self.table.nearest(day['sunrise'] - timedelta(minutes=20)), (day['sunrise'], 'sunrise'))
+
+    def test_ensure_rebuilds_when_horizon_short(self):
+        """Test that ensure rebuilds once the table runs low"""
+        self.table.ensure(datetime(2024, 12, 20, 12, 0, tzinfo=self.tz))
+        self.assertEqual(self.table.start, date(2024, 12, 18))
+
+        self.table.ensure(datetime(2024, 12, 26, 12, 0, tzinfo=self.tz))
+        self.assertEqual(self.table.start, date(2024, 12, 26))
+
+    def test_persisted(self):
+        """Test that a saved table is loaded instead of rebuilt"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'astro.json')
+            self.table.path = path
+            self.table.save()
+
+            loaded = AstroTable(days=10, min_horizon=3, path=path)
+            loaded.ensure(datetime(2024, 12, 20, 12, 0, tzinfo=self.tz))
+            self.assertEqual(loaded.start, date(2024, 12, 18))
+            self.assertEqual(loaded.day(date(2024, 12, 20)), self.table.day(date(2024, 12, 20)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+import bench
+
+
+class TestBench(unittest.TestCase):
+    """Test suite for the benchmark runner"""
+
+    def test_run_reports_every_benchmark(self):
+        """Test that every fetcher and render function is timed against the fixtures"""
+        report = bench.run(rounds=1)
+        for name in ('fetch_launches', 'fetch_surf', 'fetch_wind', 'fetch_tide', 'fetch_tidetimes',
+                     'fetch_sunriseset', 'fetch_nws', 'render_launch_cell', 'render_tide_cell'):
+            self.assertIn(name, report['results'])
+            self.assertGreater(report['results'][name]['median_us'], 0)
+
+    def test_fetchers_return_fixture_data(self):
+        """Test that with now pinned to the capture time every fetcher finds upcoming data"""
+        window = bench.create_window()
+        with bench.fixtures_installed():
+            benchmarks = dict(bench.build_benchmarks(window))
+            results = {name: func() for name, func in benchmarks.items()}
+        self.assertTrue(results['fetch_launches'])
+        self.assertEqual(results['fetch_surf']['text'], '3-5FT')
+        self.assertIsNotNone(results['fetch_wind'])
+        self.assertIsInstance(results['fetch_tide']['value'], float)
+        self.assertEqual(results['fetch_tidetimes']['time'].date().isoformat(), '2024-11-07')
+        self.assertIsNotNone(results['fetch_nws']['high'])
+        self.assertIsNotNone(results['fetch_nws']['low'])
+        self.assertNotIn('No upcoming', results['render_tide_cell'][0])
+        self.assertNotEqual(results['render_launch_cell'][0], 'None')
+
+    def test_compare_flags_regressions(self):
+        """Test that only slowdowns beyond the threshold count as regressions"""
+        baseline = {'results': {'a': {'median_us': 100.0}, 'b': {'median_us': 100.0}}}
+        report = {'results': {'a': {'median_us': 120.0}, 'b': {'median_us': 130.0}, 'c': {'median_us': 5.0}}}
+        lines, regressions = bench.compare(report, baseline, threshold=0.25)
+        self.assertEqual(regressions, ['b'])
+        self.assertEqual(len(lines), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
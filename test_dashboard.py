@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import Mock, patch
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import QPoint, Qt, QEvent
+from PyQt5.QtGui import QMouseEvent
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashboard import DashboardWidget, FrameStats
+
+
+class TestDashboardWidget(unittest.TestCase):
+    """Test suite for the custom-painted dashboard"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up QApplication once for all tests"""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.stats = FrameStats()
+        self.dashboard = DashboardWidget(None, 480, 320, frame_stats=self.stats)
+
+    def test_slot_geometry(self):
+        """Test that the 3x2 slots tile the widget"""
+        self.assertEqual(self.dashboard.size().width(), 480)
+        self.assertEqual(self.dashboard.size().height(), 320)
+        rect = self.dashboard.slot_rect((1, 2))
+        self.assertEqual((rect.x(), rect.y(), rect.width(), rect.height()), (320, 160, 160, 160))
+
+    def test_only_changed_cell_repainted(self):
+        """Test that set_cell repaints only the changed cell's rectangle"""
+        self.dashboard.set_cell((1, 2), 'Clock', '12:00:00')
+        with patch.object(self.dashboard, 'update') as mock_update:
+            self.assertFalse(self.dashboard.set_cell((1, 2), 'Clock', '12:00:00'))
+            mock_update.assert_not_called()
+
+            self.assertTrue(self.dashboard.set_cell((1, 2), 'Clock', '12:00:01'))
+            mock_update.assert_called_once_with(self.dashboard.slot_rect((1, 2)))
+
+    def test_pixmap_cached(self):
+        """Test that unchanged cells keep their rendered pixmap"""
+        self.dashboard.set_cell((0, 0), 'Launches', 'None')
+        pixmap = self.dashboard.pixmaps[(0, 0)]
+        self.dashboard.set_cell((0, 0), 'Launches', 'None')
+        self.assertIs(self.dashboard.pixmaps[(0, 0)], pixmap)
+
+        self.dashboard.set_cell((0, 0), 'Launches', 'None', QColor(0, 255, 0))
+        self.assertIsNot(self.dashboard.pixmaps[(0, 0)], pixmap)
+
+    def test_cell_colors(self):
+        """Test that the cell background is painted in its color"""
+        self.dashboard.set_cell((0, 2), 'Surf', '5FT', QColor(255, 0, 0))
+        image = self.dashboard.grab().toImage()
+        self.assertEqual(QColor(image.pixel(400, 20)).name(), '#ff0000')
+        # The gap between cells keeps the window background
+        self.assertEqual(QColor(image.pixel(321, 1)).name(), '#d3d3d3')
+
+    def test_paint_recorded(self):
+        """Test that paints are recorded in the frame stats"""
+        self.dashboard.set_cell((0, 0), 'Launches', 'None')
+        self.dashboard.grab()
+        self.assertGreaterEqual(self.stats.summary()['frames'], 1)
+
+    def test_click_dispatch(self):
+        """Test that a click is routed to the callback of the cell under it"""
+        callback = Mock()
+        self.dashboard.set_cell((1, 2), 'Clock', '12:00:00', click_callback=callback)
+        event = QMouseEvent(QEvent.MouseButtonPress, QPoint(400, 250), Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        self.dashboard.mousePressEvent(event)
+        callback.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import http.client
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import dataservice
+
+
+class TestDataService(unittest.TestCase):
+    """Test suite for sharing data_store between clocks"""
+
+    def setUp(self):
+        self.server = dataservice.DataService(('127.0.0.1', 0)).start()
+        self.fetched = datetime(2024, 9, 4, 6, 0)
+        self.server.publish({'wind': {'speed': 12}, 'errors': []}, {'wind': self.fetched})
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_conditional_get(self):
+        """Test that a current ETag gets 304 and only fetched sources are served"""
+        with urlopen(f"{self.server.base_url}/data") as response:
+            etag = response.headers['ETag']
+            body = dataservice.storage.loads(response.read().decode())
+        self.assertEqual(body['version'], 1)
+        self.assertEqual(list(body['sources']), ['wind'])
+
+        request = Request(f"{self.server.base_url}/data", headers={'If-None-Match': etag})
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(request)
+        self.assertEqual(raised.exception.code, 304)
+
+    def test_unchanged_publish_keeps_version(self):
+        """Test that republishing the same data doesn't wake clients"""
+        self.assertFalse(self.server.publish({'wind': {'speed': 12}}, {'wind': self.fetched}))
+        self.assertEqual(self.server.version, 1)
+
+    def test_client_long_poll(self):
+        """Test that a waiting client returns as soon as new data is published"""
+        client = dataservice.DataServiceClient(self.server.base_url)
+        values, fetched_at = client.poll(wait=5)
+        self.assertEqual(values, {'wind': {'speed': 12}})
+        self.assertEqual(fetched_at, {'wind': self.fetched})
+
+        later = datetime(2024, 9, 4, 6, 5)
+        timer = threading.Timer(0.2, self.server.publish, ({'wind': {'speed': 15}}, {'wind': later}))
+        timer.start()
+        start = time.monotonic()
+        values, fetched_at = client.poll(wait=5)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(values, {'wind': {'speed': 15}})
+        self.assertEqual(fetched_at, {'wind': later})
+
+        self.assertIsNone(client.poll(wait=0.2))
+
+    def test_unix_socket_restart(self):
+        """Test that a client reconnects to a restarted Unix socket server and gets its data"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'fetchd.sock')
+            server = dataservice.UnixDataService(path).start()
+            server.publish({'wind': {'speed': 12}}, {'wind': self.fetched})
+            client = dataservice.DataServiceClient(f"unix:{path}")
+            self.assertEqual(client.poll(wait=1)[0], {'wind': {'speed': 12}})
+            server.stop()
+            with self.assertRaises((OSError, http.client.HTTPException)):
+                client.poll(wait=1)
+
+            server = dataservice.UnixDataService(path).start()
+            try:
+                server.publish({'wind': {'speed': 12}}, {'wind': self.fetched})
+                # Same data, but a new server instance, so the client's ETag is stale
+                self.assertEqual(client.poll(wait=1)[0], {'wind': {'speed': 12}})
+            finally:
+                server.stop()
+
+    def test_benchmark(self):
+        """Test that the benchmark delivers every update to every client"""
+        result = dataservice.benchmark(3, duration=0.4, interval=0.2)
+        self.assertEqual(result['delivered'], result['expected'])
+        self.assertEqual(result['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
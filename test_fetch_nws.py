@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import sys
 import os
 import pytz
+import requests
 
 # Import the module to test
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -13,7 +14,12 @@ import fetch_nws
 class TestFetchNWS(unittest.TestCase):
     """Test suite for fetch_nws module"""
 
-    @patch('fetch_nws.requests.get')
+    def setUp(self):
+        """Start every test with empty lookup and HTTP caches"""
+        fetch_nws.configure_cache(None)
+        fetch_nws.transport.clear_cache()
+
+    @patch('fetch_nws.transport.get')
     def test_get_lat_lon_from_zip_known_zip(self, mock_get):
         """Test get_lat_lon_from_zip with known ZIP code"""
         lat, lon = fetch_nws.get_lat_lon_from_zip('92109')
@@ -22,7 +28,7 @@ class TestFetchNWS(unittest.TestCase):
         # Should not make HTTP call for known ZIP
         mock_get.assert_not_called()
 
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_get_lat_lon_from_zip_census_api(self, mock_get):
         """Test get_lat_lon_from_zip using Census geocoding API"""
         # Mock Census API response
@@ -45,7 +51,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertEqual(lon, -74.0060)
         mock_get.assert_called_once()
 
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_get_lat_lon_from_zip_nominatim_fallback(self, mock_get):
         """Test get_lat_lon_from_zip using Nominatim fallback"""
         # First call (Census) fails, second call (Nominatim) succeeds
@@ -67,7 +73,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertEqual(mock_get.call_count, 2)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_success(self, mock_get, mock_geocode):
         """Test fetch_nws with successful API calls"""
         # Mock geocoding
@@ -160,7 +166,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertEqual(result['precip_48h'], 60)  # Max in next 48h
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_with_numeric_cloud_cover(self, mock_get, mock_geocode):
         """Test fetch_nws with numeric cloud cover values"""
         # Mock geocoding
@@ -237,7 +243,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_point_api_failure(self, mock_get, mock_geocode):
         """Test fetch_nws when NWS point API fails"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -251,7 +257,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_forecast_api_failure(self, mock_get, mock_geocode):
         """Test fetch_nws when NWS forecast API fails"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -283,7 +289,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_missing_forecast_url(self, mock_get, mock_geocode):
         """Test fetch_nws when point API doesn't return forecast URL"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -300,7 +306,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_no_periods(self, mock_get, mock_geocode):
         """Test fetch_nws when forecast has no periods"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -335,7 +341,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_default_precip_values(self, mock_get, mock_geocode):
         """Test fetch_nws when precipitation values are None (should default to 0)"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -400,7 +406,7 @@ class TestFetchNWS(unittest.TestCase):
         self.assertEqual(result['cloud_cover'], 0)
 
     @patch('fetch_nws.get_lat_lon_from_zip')
-    @patch('fetch_nws.requests.get')
+    @patch('fetch_nws.transport.get')
     def test_fetch_nws_48h_precipitation(self, mock_get, mock_geocode):
         """Test fetch_nws correctly finds max precipitation in 48 hours"""
         mock_geocode.return_value = (32.7934, -117.2544)
@@ -504,6 +510,133 @@ class TestFetchNWS(unittest.TestCase):
         self.assertEqual(result['precip_48h'], 80)
 
 
+class TestNWSLookupCache(unittest.TestCase):
+    """Test suite for the geocode and points lookup cache"""
+
+    def setUp(self):
+        fetch_nws.configure_cache(None)
+        fetch_nws.transport.clear_cache()
+
+    def point_response(self, forecast_url='https://api.weather.gov/gridpoints/SGX/33,70/forecast'):
+        response = Mock(status_code=200, headers={'Cache-Control': 'max-age=3600'})
+        response.json.return_value = {
+            'properties': {
+                'forecast': forecast_url,
+                'forecastGridData': 'https://api.weather.gov/gridpoints/SGX/33,70'
+            }
+        }
+        return response
+
+    def forecast_response(self):
+        response = Mock()
+        response.json.return_value = {'properties': {'periods': []}}
+        return response
+
+    @patch('fetch_nws.transport.get')
+    def test_points_lookup_cached(self, mock_get):
+        """Test that repeated forecasts only request the forecast URL"""
+        mock_get.side_effect = [self.point_response(), self.forecast_response(), self.forecast_response()]
+
+        fetch_nws.fetch_forecast(32.7934, -117.2544)
+        fetch_nws.fetch_forecast(32.7934, -117.2544)
+
+        urls = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(urls, [
+            'https://api.weather.gov/points/32.7934,-117.2544',
+            'https://api.weather.gov/gridpoints/SGX/33,70/forecast',
+            'https://api.weather.gov/gridpoints/SGX/33,70/forecast',
+        ])
+
+    @patch('fetch_nws.transport.get')
+    def test_forecast_404_invalidates_points(self, mock_get):
+        """Test that a 404 forecast refreshes the points lookup and retries"""
+        gone = Mock()
+        gone.raise_for_status.side_effect = requests.exceptions.HTTPError(response=Mock(status_code=404))
+        mock_get.side_effect = [
+            self.point_response(),
+            gone,
+            self.point_response('https://api.weather.gov/gridpoints/SGX/34,70/forecast'),
+            self.forecast_response(),
+        ]
+
+        result = fetch_nws.fetch_forecast(32.7934, -117.2544)
+
+        self.assertEqual(result, {'properties': {'periods': []}})
+        self.assertEqual(mock_get.call_args_list[-1].args[0], 'https://api.weather.gov/gridpoints/SGX/34,70/forecast')
+        self.assertEqual(fetch_nws.get_point_urls(32.7934, -117.2544)['forecast'],
+                         'https://api.weather.gov/gridpoints/SGX/34,70/forecast')
+
+    @patch('fetch_nws.transport.get')
+    def test_forecast_404_refetches_cacheable_points(self, mock_get):
+        """Test that the points lookup redone after a 404 isn't answered from the HTTP cache"""
+        gone = Mock()
+        gone.raise_for_status.side_effect = requests.exceptions.HTTPError(response=Mock(status_code=404))
+        mock_get.side_effect = [
+            self.point_response(),
+            self.forecast_response(),
+            gone,
+            self.point_response('https://api.weather.gov/gridpoints/SGX/34,70/forecast'),
+            self.forecast_response(),
+        ]
+
+        fetch_nws.fetch_forecast(32.7934, -117.2544)
+        self.assertEqual(fetch_nws.fetch_forecast(32.7934, -117.2544), {'properties': {'periods': []}})
+
+        urls = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(urls[-2:], [
+            'https://api.weather.gov/points/32.7934,-117.2544',
+            'https://api.weather.gov/gridpoints/SGX/34,70/forecast',
+        ])
+
+    @patch('fetch_nws.transport.get')
+    def test_forecast_moved_invalidates_points_once(self, mock_get):
+        """Test that a 301 redoes the points lookup once, not on every cached forecast"""
+        moved = self.forecast_response()
+        moved.status_code = 200
+        moved.headers = {'Cache-Control': 'max-age=3600'}
+        moved.history = [Mock(status_code=301)]
+        mock_get.side_effect = [self.point_response(), moved, self.point_response()]
+
+        for _ in range(3):
+            self.assertEqual(fetch_nws.fetch_forecast(32.7934, -117.2544), {'properties': {'periods': []}})
+
+        urls = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(urls, [
+            'https://api.weather.gov/points/32.7934,-117.2544',
+            'https://api.weather.gov/gridpoints/SGX/33,70/forecast',
+            'https://api.weather.gov/points/32.7934,-117.2544',
+        ])
+
+    @patch('fetch_nws.transport.get')
+    def test_geocode_cached(self, mock_get):
+        """Test that a geocoded ZIP is not looked up again"""
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            'result': {'addressMatches': [{'coordinates': {'y': 40.7128, 'x': -74.0060}}]}
+        }
+        mock_get.return_value = mock_response
+
+        self.assertEqual(fetch_nws.get_lat_lon_from_zip('10001'), (40.7128, -74.0060))
+        self.assertEqual(fetch_nws.get_lat_lon_from_zip('10001'), (40.7128, -74.0060))
+        mock_get.assert_called_once()
+
+    def test_cache_persisted(self):
+        """Test that lookups survive a restart when a path is configured"""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'nws_lookups.json')
+            fetch_nws.configure_cache(path)
+            fetch_nws._lookup_cache.set('zip:10001', [40.7128, -74.0060], fetch_nws.GEOCODE_TTL)
+
+            fetch_nws.configure_cache(path)
+            self.assertEqual(fetch_nws._lookup_cache.get('zip:10001'), [40.7128, -74.0060])
+
+    def test_cache_entry_expires(self):
+        """Test that entries past their TTL are dropped"""
+        fetch_nws._lookup_cache.set('zip:10001', [40.7128, -74.0060], -1)
+        self.assertIsNone(fetch_nws._lookup_cache.get('zip:10001'))
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+# Import the module to test
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import dataservice
+import fetch_nws
+import requests
+import storage
+import transport
+from fetchd import FetcherDaemon
+
+
+class TestFetcherDaemon(unittest.TestCase):
+    """Test suite for the headless fetcher daemon"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmpdir.name, 'snapshot.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @patch.object(FetcherDaemon, 'fetch_wind')
+    def test_refresh_publishes_due_sources(self, mock_wind):
+        """Test that a refresh fetches, persists and publishes"""
+        mock_wind.return_value = {'speed': 10, 'gust': 15, 'direction': 'SW'}
+        server = Mock()
+        daemon = FetcherDaemon(server)
+        daemon.snapshot_path = self.snapshot
+        with patch.object(daemon.scheduler, 'due', return_value=['wind']):
+            daemon.refresh()
+
+        server.publish.assert_called_once_with(daemon.data_store, daemon.fetched_at)
+        self.assertEqual(daemon.data_store['wind']['direction'], 'SW')
+        values, fetched_at = storage.load_snapshot(self.snapshot)
+        self.assertEqual(values['wind']['speed'], 10)
+        self.assertIn('wind', fetched_at)
+
+    @patch.object(FetcherDaemon, 'fetch_wind')
+    def test_failed_fetch_keeps_fetch_time(self, mock_wind):
+        """Test that an error doesn't count as a successful fetch"""
+        mock_wind.side_effect = Exception("Network error")
+        daemon = FetcherDaemon(Mock())
+        with patch.object(daemon.scheduler, 'due', return_value=['wind']):
+            daemon.refresh()
+        self.assertNotIn('wind', daemon.fetched_at)
+
+    def test_late_source_waits_for_retry(self):
+        """Test that a late source isn't refetched while its abandoned fetch may still run"""
+        daemon = FetcherDaemon(Mock())
+        for name in daemon.scheduler.due():
+            daemon.scheduler.mark_fetched(name)
+        for _ in range(2):
+            daemon.apply_results({'late': ['surf'], 'errors': []})
+            self.assertEqual(daemon.scheduler.due(), [])
+            self.assertGreater(daemon.scheduler.seconds_until_due(), 60)
+        daemon.apply_results({'late': ['surf'], 'errors': []})
+        self.assertEqual(daemon.scheduler.breakers['surf'].state, 'open')
+
+    @patch('transport.get')
+    def test_unreachable_nws_opens_breaker(self, mock_get):
+        """Test that fetch_nws failures count towards the nws circuit breaker"""
+        mock_get.side_effect = requests.exceptions.ConnectionError("api.weather.gov unreachable")
+        transport.clear_cache()
+        fetch_nws.configure_cache()
+        daemon = FetcherDaemon(Mock())
+        for _ in range(3):
+            with patch.object(daemon.scheduler, 'due', return_value=['nws']):
+                daemon.refresh()
+        self.assertEqual(daemon.scheduler.breakers['nws'].state, 'open')
+        self.assertNotIn('nws', daemon.scheduler.due())
+        self.assertNotIn('nws', daemon.data_store)
+
+    def test_restart_serves_snapshot(self):
+        """Test that a restarted daemon serves its last snapshot over the Unix socket"""
+        fetched = datetime.now() - timedelta(minutes=2)
+        storage.save_snapshot(self.snapshot, {'wind': {'speed': 12}}, {'wind': fetched})
+        server = dataservice.UnixDataService(os.path.join(self.tmpdir.name, 'fetchd.sock')).start()
+        try:
+            daemon = FetcherDaemon(server, snapshot_path=self.snapshot)
+            self.assertNotIn('wind', daemon.scheduler.due())
+
+            values, fetched_at = dataservice.DataServiceClient(server.base_url).poll(wait=1)
+            self.assertEqual(values, {'wind': {'speed': 12}})
+            self.assertEqual(fetched_at, {'wind': fetched})
+        finally:
+            server.stop()
+        self.assertFalse(os.path.exists(server.server_address))
+
+
+if __name__ == '__main__':
+    unittest.main()
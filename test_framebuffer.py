@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QColor, QImage
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dashboard import DashboardWidget
+from framebuffer import FramebufferDashboard
+
+
+class TestFramebufferDashboard(unittest.TestCase):
+    """Test suite for the framebuffer renderer"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up QApplication once for all tests"""
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'fb.raw')
+        self.fb = FramebufferDashboard(None, 480, 320, self.path)
+
+    def tearDown(self):
+        self.fb.close()
+        self.tmpdir.cleanup()
+
+    def set_cells(self, dashboard):
+        dashboard.set_cell((0, 0), 'Launches', 'None')
+        dashboard.set_cell((0, 2), 'Surf', '5FT', QColor(255, 0, 0))
+        dashboard.set_cell((1, 1), 'Tide', '2.5Ft rising', QColor(0, 255, 0))
+
+    def test_frame_matches_windowed(self):
+        """Test that the framebuffer frame is byte-identical to the painted widget"""
+        windowed = DashboardWidget(None, 480, 320)
+        self.set_cells(windowed)
+        self.set_cells(self.fb)
+        self.fb.flush()
+
+        expected = windowed.grab().toImage().convertToFormat(QImage.Format_RGB32)
+        expected = expected.constBits().asstring(expected.sizeInBytes())
+        self.assertEqual(self.fb.frame(), expected)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_changes_coalesce_into_one_frame(self):
+        """Test that cells changed together are written as one frame of only their rows"""
+        self.fb.flush()
+        self.assertEqual(self.fb.frames, 1)
+        self.fb.set_cell((1, 0), 'Wind', '10g15 SW')
+        self.fb.set_cell((1, 2), 'Clock', '12:00:00')
+        self.assertFalse(self.fb.dirty.isEmpty())
+        self.fb.flush()
+        self.assertEqual(self.fb.frames, 2)
+        self.assertTrue(self.fb.dirty.isEmpty())
+        self.fb.flush()
+        self.assertEqual(self.fb.frames, 2)
+
+    def test_rgb565(self):
+        """Test 16 bpp output for small TFT framebuffers"""
+        path = os.path.join(self.tmpdir.name, 'fb16.raw')
+        fb = FramebufferDashboard(None, 480, 320, path, bits_per_pixel=16)
+        fb.set_cell((0, 0), 'Launches', 'None', QColor(255, 0, 0))
+        fb.flush()
+        fb.close()
+        with open(path, 'rb') as f:
+            pixels = f.read()
+        self.assertEqual(len(pixels), 480 * 320 * 2)
+        # Inside the first cell: pure red is 0xF800, little-endian
+        offset = (20 * 480 + 20) * 2
+        self.assertEqual(pixels[offset:offset + 2], b'\x00\xf8')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from launch_time import parse_net
+
+
+class TestParseNet(unittest.TestCase):
+    """Test suite for the launch NET parser"""
+
+    def setUp(self):
+        parse_net.cache_clear()
+
+    def test_iso(self):
+        """Test that ISO-8601 strings with Z or an offset are parsed directly"""
+        self.assertEqual(parse_net('2024-12-20T10:00:00Z'),
+                         datetime(2024, 12, 20, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_net('2025-01-03T18:30:00-08:00').utcoffset(), timedelta(hours=-8))
+
+    def test_display_format(self):
+        """Test the feed's "Wed, Sep 4, 2024, 05:59 AM PDT" format"""
+        parsed = parse_net('Wed, Sep 4, 2024, 05:59 AM PDT')
+        self.assertEqual(parsed, datetime(2024, 9, 4, 12, 59, tzinfo=timezone.utc))
+        self.assertEqual(parsed.tzname(), 'PDT')
+
+    @patch('launch_time.dateparser.parse')
+    def test_unknown_shape_falls_back_and_is_cached(self, mock_parse):
+        """Test that unknown strings go to dateparser once, then come from the cache"""
+        mock_parse.return_value = datetime(2024, 9, 4, tzinfo=timezone.utc)
+        self.assertEqual(parse_net('NET September 2024'), mock_parse.return_value)
+        self.assertEqual(parse_net('NET September 2024'), mock_parse.return_value)
+        mock_parse.assert_called_once_with('NET September 2024')
+
+    @patch('launch_time.dateparser.parse')
+    def test_unknown_zone_falls_back(self, mock_parse):
+        """Test that an unrecognized zone abbreviation isn't guessed"""
+        parse_net('Wed, Sep 4, 2024, 05:59 AM XYZ')
+        mock_parse.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
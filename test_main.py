@@ -9,6 +9,7 @@ from PyQt5.QtGui import QColor
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metrics
 from main import MainWindow
 
 
@@ -32,29 +33,31 @@ class TestMainWindow(unittest.TestCase):
     def test_data_store_initialization(self):
         """Test that DataStore is properly initialized"""
         self.assertIsNotNone(self.window.data_store)
-        self.assertEqual(self.window.data_store['launches'], [])
+        self.assertIsNone(self.window.data_store['launches'])
         self.assertIsNone(self.window.data_store['surf'])
         self.assertIsNone(self.window.data_store['wind'])
         self.assertIsNone(self.window.data_store['tide'])
         self.assertIsNone(self.window.data_store['tide_times'])
         self.assertIsNone(self.window.data_store['sunriseset'])
 
-    @patch('main.requests.get')
-    @patch('main.dateparser.parse')
+    @patch('main.transport.get')
+    @patch('launch_time.dateparser.parse')
     def test_fetch_launches(self, mock_parse, mock_get):
         """Test fetch_launches function"""
-        # Mock response data
+        # Launch times in the feed's two known formats, so dateparser is never needed
+        tz = pytz.timezone('America/Los_Angeles')
+        future_time = (datetime.now(tz) + timedelta(days=2, hours=5)).replace(second=0, microsecond=0)
         mock_response = Mock()
         mock_response.json.return_value = [
             {
                 'name': 'Test Launch 1',
                 'location': 'Vandenberg Space Force Base',
-                'net': '2024-12-20T10:00:00Z'
+                'net': future_time.isoformat()
             },
             {
                 'name': 'Test Launch 2',
                 'location': 'Chica Launch Site',
-                'net': '2024-12-21T15:00:00Z'
+                'net': future_time.strftime('%a, %b %d, %Y, %I:%M %p ') + future_time.tzname()
             },
             {
                 'name': 'Test Launch 3',
@@ -64,51 +67,28 @@ class TestMainWindow(unittest.TestCase):
         ]
         mock_get.return_value = mock_response
 
-        # Mock dateparser to return timezone-aware datetime
-        tz = pytz.timezone('America/Los_Angeles')
-        future_time = datetime.now(tz) + timedelta(days=2, hours=5)
-        mock_parse.return_value = future_time
-
         # Call the function
         result = self.window.fetch_launches()
 
         # Assertions
         self.assertEqual(len(result), 2)  # Only Vandenberg and Chica
         self.assertEqual(result[0]['name'], 'Test Launch 1')
-        self.assertIn('net', result[0])
-        self.assertIn('time_diff', result[0])
-        self.assertIn('time_diff_days', result[0])
-        self.assertIn('time_diff_hours', result[0])
-
-    @patch('main.requests.get')
-    @patch('main.BeautifulSoup')
-    def test_fetch_surf(self, mock_bs, mock_get):
+        for launch in result:
+            self.assertEqual(launch['net'], future_time)
+        text, _ = self.window.render_launch_cell({'launches': result})
+        # Seconds were dropped from the NET, so just under 2 days 5 hours remain
+        self.assertTrue(text.endswith('\n2D 4H'))
+        mock_parse.assert_not_called()
+
+    @patch('main.transport.get')
+    def test_fetch_surf(self, mock_get):
         """Test fetch_surf function"""
-        # Mock response
+        # Mock response with the recorded surfcaptain page
         mock_response = Mock()
-        mock_response.content = b'<html></html>'
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'surf.html'), 'rb') as f:
+            mock_response.content = f.read()
         mock_get.return_value = mock_response
 
-        # Mock BeautifulSoup
-        mock_soup = Mock()
-        # Mock surf forecast element
-        mock_surf_element = Mock()
-        mock_surf_element.text = 'Pacific Beach 3-5FT'
-        # Mock water temperature element
-        mock_temp_element = Mock()
-        mock_temp_element.get_text.return_value = 'Water temperature: 64°'
-
-        # Configure select_one to return different elements based on selector
-        def select_one_side_effect(selector):
-            if selector == '#fcst-current-title':
-                return mock_surf_element
-            elif selector == '.current-data-desc':
-                return mock_temp_element
-            return None
-
-        mock_soup.select_one.side_effect = select_one_side_effect
-        mock_bs.return_value = mock_soup
-
         # Call the function
         result = self.window.fetch_surf()
 
@@ -121,32 +101,15 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(result['height'], 5)
         self.assertEqual(result['water_temp'], '64°')
 
-    @patch('main.requests.get')
-    @patch('main.BeautifulSoup')
-    def test_fetch_surf_no_water_temp(self, mock_bs, mock_get):
+    @patch('main.transport.get')
+    def test_fetch_surf_no_water_temp(self, mock_get):
         """Test fetch_surf function when water temperature is not available"""
-        # Mock response
+        # Mock response with a forecast title but no water temp section
         mock_response = Mock()
-        mock_response.content = b'<html></html>'
+        mock_response.content = (b'<html><body><h1 id="fcst-current-title">Pacific Beach 3-5FT</h1>'
+                                 b'<div class="current-data-desc">72\xc2\xb0 W 5 mph</div></body></html>')
         mock_get.return_value = mock_response
 
-        # Mock BeautifulSoup
-        mock_soup = Mock()
-        # Mock surf forecast element
-        mock_surf_element = Mock()
-        mock_surf_element.text = 'Pacific Beach 3-5FT'
-
-        # Configure select_one to return surf element but None for water temp
-        def select_one_side_effect(selector):
-            if selector == '#fcst-current-title':
-                return mock_surf_element
-            elif selector == '.current-data-desc':
-                return None
-            return None
-
-        mock_soup.select_one.side_effect = select_one_side_effect
-        mock_bs.return_value = mock_soup
-
         # Call the function
         result = self.window.fetch_surf()
 
@@ -158,7 +121,7 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(result['height'], 5)
         self.assertEqual(result['water_temp'], 'N/A')
 
-    @patch('main.requests.get')
+    @patch('main.transport.get')
     def test_fetch_wind(self, mock_get):
         """Test fetch_wind function"""
         # Mock response
@@ -183,7 +146,7 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(result['gust'], 20)
         self.assertEqual(result['direction'], 'S')
 
-    @patch('main.requests.get')
+    @patch('main.transport.get')
     def test_fetch_wind_no_data(self, mock_get):
         """Test fetch_wind when no observations available"""
         mock_response = Mock()
@@ -193,7 +156,7 @@ class TestMainWindow(unittest.TestCase):
         result = self.window.fetch_wind()
         self.assertIsNone(result)
 
-    @patch('main.requests.get')
+    @patch('main.transport.get')
     def test_fetch_tide(self, mock_get):
         """Test fetch_tide function"""
         # Mock response
@@ -214,17 +177,20 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(result['value'], 3.0)
         self.assertEqual(result['trend'], 'rising')
 
-    @patch('main.requests.get')
+    @patch('main.transport.get')
     def test_fetch_tidetimes(self, mock_get):
         """Test fetch_tidetimes function"""
-        # Mock response with tide data
-        current_time = datetime.now()
-        future_time = current_time + timedelta(hours=2)
-        time_str = future_time.strftime('%I:%M %p')
+        # Mock response with a few days of hi/lo predictions
+        tz = pytz.timezone('America/Los_Angeles')
+        current_time = datetime.now(tz)
+        predictions = []
+        for i, hours in enumerate([-3, 2, 8, 14, 60, 80]):
+            t = current_time + timedelta(hours=hours)
+            predictions.append({'t': t.strftime('%Y-%m-%d %H:%M'), 'v': '3.5', 'type': 'H' if i % 2 else 'L'})
 
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.text = f"{time_str}|3.5|High Tide"
+        mock_response.json.return_value = {'predictions': predictions}
         mock_get.return_value = mock_response
 
         # Call the function
@@ -236,20 +202,35 @@ class TestMainWindow(unittest.TestCase):
         self.assertIn('time_str', result)
         self.assertIn('type', result)
         self.assertEqual(result['type'].strip(), 'High Tide')
+        self.assertEqual(result['time_str'], (current_time + timedelta(hours=2)).strftime('%H:%M'))
 
-    @patch('main.sun')
-    def test_fetch_sunriseset(self, mock_sun):
-        """Test fetch_sunriseset function"""
+        # The next lookup is answered locally
+        self.window.fetch_tidetimes()
+        mock_get.assert_called_once()
+
+    @patch('main.transport.get')
+    def test_fetch_tidetimes_refill_error(self, mock_get):
+        """Test that a failed refill still serves the predictions left in the store"""
         tz = pytz.timezone('America/Los_Angeles')
         current_time = datetime.now(tz)
-        sunrise_time = current_time.replace(hour=6, minute=30, second=0, microsecond=0)
-        sunset_time = current_time.replace(hour=18, minute=0, second=0, microsecond=0)
+        self.window.tide_store.load([
+            {'t': (current_time + timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M'), 'v': '3.5', 'type': 'H'}
+            for hours in (3, 20, 30)])
+        mock_get.side_effect = OSError("NOAA unreachable")
 
-        # Mock sun function
-        mock_sun.return_value = {
-            'sunrise': sunrise_time,
-            'sunset': sunset_time
-        }
+        result = self.window.fetch_tidetimes()
+        mock_get.assert_called_once()
+        self.assertEqual(result['time_str'], (current_time + timedelta(hours=3)).strftime('%H:%M'))
+
+        # Nothing left to serve: the error is raised
+        self.window.tide_store.load([])
+        with self.assertRaises(OSError):
+            self.window.fetch_tidetimes()
+
+    def test_fetch_sunriseset(self):
+        """Test fetch_sunriseset function"""
+        tz = pytz.timezone('America/Los_Angeles')
+        current_time = datetime.now(tz)
 
         # Call the function
         result = self.window.fetch_sunriseset()
@@ -260,6 +241,10 @@ class TestMainWindow(unittest.TestCase):
         self.assertIn('time', result)
         self.assertIn('sunrise', result)
         self.assertIn('sunset', result)
+        self.assertIn(result['event'], ('sunrise', 'sunset'))
+        self.assertGreater(result['time'], current_time)
+        self.assertLess(result['time'] - current_time, timedelta(days=1))
+        self.assertEqual(result['sunrise'].date(), current_time.date())
 
     def test_render_launch_cell_no_launches(self):
         """Test render_launch_cell with no launches"""
@@ -268,6 +253,12 @@ class TestMainWindow(unittest.TestCase):
         self.assertEqual(text, "None")
         self.assertIsNone(color)
 
+    def test_render_launch_cell_not_fetched(self):
+        """Test render_launch_cell before launches are fetched"""
+        text, color = self.window.render_launch_cell({'launches': None})
+        self.assertEqual(text, "N/A")
+        self.assertIsNone(color)
+
     def test_render_launch_cell_with_launch(self):
         """Test render_launch_cell with launch data"""
         tz = pytz.timezone('America/Los_Angeles')
@@ -276,10 +267,7 @@ class TestMainWindow(unittest.TestCase):
         data_store = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': launch_time,
-                'time_diff': '0D 10H',
-                'time_diff_days': 0,
-                'time_diff_hours': 10
+                'net': launch_time
             }],
             'sunriseset': None
         }
@@ -298,10 +286,7 @@ class TestMainWindow(unittest.TestCase):
         data_store = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': launch_time,
-                'time_diff': '0D 2H',
-                'time_diff_days': 0,
-                'time_diff_hours': 2
+                'net': launch_time
             }],
             'sunriseset': {
                 'sunrise': sunrise_time,
@@ -325,10 +310,7 @@ class TestMainWindow(unittest.TestCase):
         data_store = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': launch_time,
-                'time_diff': '0D 2H',
-                'time_diff_days': 0,
-                'time_diff_hours': 2
+                'net': launch_time
             }],
             'sunriseset': {
                 'sunrise': current_time + timedelta(hours=12),
@@ -352,10 +334,7 @@ class TestMainWindow(unittest.TestCase):
         data_store = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': launch_time,
-                'time_diff': '0D 2H',
-                'time_diff_days': 0,
-                'time_diff_hours': 2
+                'net': launch_time
             }],
             'sunriseset': {
                 'sunrise': sunrise_time,
@@ -379,10 +358,7 @@ class TestMainWindow(unittest.TestCase):
         data_store = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': launch_time,
-                'time_diff': '0D 1H',
-                'time_diff_days': 0,
-                'time_diff_hours': 1
+                'net': launch_time
             }],
             'sunriseset': {
                 'sunrise': sunrise_time,
@@ -396,6 +372,153 @@ class TestMainWindow(unittest.TestCase):
         # Should be orange because within 1 hour of sunrise (30 min difference)
         self.assertEqual(color, self.window._color_orange)
 
+    def test_render_launch_cell_uses_astro_table(self):
+        """Test render_launch_cell checks the margin against the astro table"""
+        tz = pytz.timezone('America/Los_Angeles')
+        current_time = datetime.now(tz)
+        self.window.astro.ensure(current_time)
+        # Put the launch 30 minutes after the next real sunrise or sunset
+        event_time, _ = self.window.astro.next_event(current_time)
+        launch_time = event_time + timedelta(minutes=30)
+
+        data_store = {
+            'launches': [{
+                'name': 'Test Launch',
+                'net': launch_time
+            }],
+            # Deliberately wrong times; the table takes precedence
+            'sunriseset': {
+                'sunrise': current_time + timedelta(days=5),
+                'sunset': current_time + timedelta(days=5),
+                'event': 'sunrise',
+                'time': current_time + timedelta(days=5)
+            }
+        }
+
+        # Render an hour before the event, so the launch is within 12 hours
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return (event_time - timedelta(hours=1)).astimezone(tz)
+
+        with patch('main.datetime', Clock):
+            text, color = self.window.render_launch_cell(data_store)
+        self.assertEqual(color, self.window._color_orange)
+
+    def test_launch_countdown_follows_clock(self):
+        """Test that the launch countdown counts down between hourly fetches"""
+        tz = pytz.timezone('America/Los_Angeles')
+        start = datetime.now(tz).replace(second=0, microsecond=0)
+        clock = {'now': start}
+
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock['now'].astimezone(tz) if tz else clock['now'].replace(tzinfo=None)
+
+        self.window.set_data('launches', [{'name': 'Test Launch', 'net': start + timedelta(days=1, hours=3, minutes=30)}])
+        with patch('main.datetime', Clock):
+            self.window.update_all_cells()
+            self.assertEqual(self.window.cells[(0, 0)].text(), "Launches\nTest Launch\n1D 3H")
+            clock['now'] = start + timedelta(hours=2)
+            self.window.update_all_cells()
+            self.assertEqual(self.window.cells[(0, 0)].text(), "Launches\nTest Launch\n1D 1H")
+            # NET passed and not refetched yet: nothing upcoming
+            clock['now'] = start + timedelta(days=2)
+            self.window.update_all_cells()
+            self.assertEqual(self.window.cells[(0, 0)].text(), "Launches\nNone")
+
+    def test_update_cell_reuses_widget(self):
+        """Test that repeated cell updates keep one widget per position"""
+        from PyQt5.QtWidgets import QLabel
+        grid_layout = self.window.layout()
+        labels_before = len(self.window.findChildren(QLabel))
+
+        for i in range(50):
+            self.window.update_cell(grid_layout, (1, 2), 'Clock', f"12:00:{i:02d}")
+        self.window.update_cell(grid_layout, (0, 2), 'Surf', '3FT', self.window._color_red)
+
+        self.assertEqual(len(self.window.findChildren(QLabel)), labels_before)
+        label = grid_layout.itemAtPosition(1, 2).widget()
+        self.assertIs(label, self.window.cells[(1, 2)])
+        self.assertEqual(label.text(), 'Clock\n12:00:49')
+        surf = self.window.cells[(0, 2)]
+        self.assertTrue(surf.autoFillBackground())
+        self.assertEqual(surf.palette().color(surf.backgroundRole()).name(), self.window._color_red.name())
+
+    def test_update_cell_skips_unchanged(self):
+        """Test that an unchanged cell is not touched"""
+        grid_layout = self.window.layout()
+        self.window.update_cell(grid_layout, (0, 2), 'Surf', '3FT', self.window._color_green)
+        label = self.window.cells[(0, 2)]
+        with patch.object(label, 'setText') as mock_set_text, patch.object(label, 'setPalette') as mock_set_palette:
+            self.window.update_cell(grid_layout, (0, 2), 'Surf', '3FT', QColor(0, 255, 0))
+            mock_set_text.assert_not_called()
+            mock_set_palette.assert_not_called()
+
+            self.window.update_cell(grid_layout, (0, 2), 'Surf', '4FT', None)
+            mock_set_text.assert_called_once_with('Surf\n4FT')
+            mock_set_palette.assert_called_once()
+
+    @patch.object(MainWindow, 'get_ip_address', return_value='10.0.0.2')
+    @patch.object(MainWindow, 'get_wireless_ssid', return_value='beach')
+    @patch('main.metrics.REGISTRY.summary', return_value=['wind: 3 ok, 0 failed, 120ms, 2KB, 1m ago'])
+    def test_overlay_metrics_page(self, mock_summary, mock_ssid, mock_ip):
+        """Test that the overlay's second page shows the fetch metrics summary"""
+        self.window.show_overlay()
+        self.assertEqual(self.window.overlay_title.text(), "Additional Details")
+        self.assertTrue(self.window.overlay_metrics.isHidden())
+
+        self.window.show_overlay_page(1)
+        self.assertEqual(self.window.overlay_title.text(), "Fetch Metrics")
+        self.assertFalse(self.window.overlay_metrics.isHidden())
+        self.assertEqual(self.window.overlay_metrics.text(), 'wind: 3 ok, 0 failed, 120ms, 2KB, 1m ago')
+
+    def test_painted_renderer(self):
+        """Test that the painted renderer receives cell updates instead of labels"""
+        window = MainWindow(renderer='painted')
+        window.update_cell(window.layout(), (0, 2), 'Surf', '3FT', window._color_red)
+        self.assertEqual(window.cells, {})
+        self.assertEqual(window.dashboard.cells[(0, 2)], ('Surf', '3FT', window._color_red.name()))
+
+    def test_tickless_clock(self):
+        """Test that tickless mode shows HH:MM and wakes at the next minute or age change"""
+        window = MainWindow(clock_mode='tickless')
+        self.assertTrue(window.time_timer.isSingleShot())
+        self.assertRegex(window.fetch_current_time(), r'^\d\d:\d\d$')
+
+        now = datetime(2024, 1, 1, 12, 0, 15, 500000)
+        self.assertAlmostEqual(window.seconds_until_clock_change(now), 44.5)
+
+        # "Upd -NM" rolls over 20s after the fetch's minute mark, before the clock does
+        window.last_update_time = now - timedelta(seconds=40)
+        self.assertAlmostEqual(window.seconds_until_clock_change(now), 20)
+
+    @patch.object(MainWindow, 'get_ip_address', return_value='10.0.0.2')
+    @patch.object(MainWindow, 'get_wireless_ssid', return_value='beach')
+    def test_hide_overlay_redraws_clock(self, mock_ssid, mock_ip):
+        """Test that closing the overlay redraws the clock it froze"""
+        window = MainWindow(clock_mode='tickless')
+        start = datetime(2024, 1, 1, 12, 0, 50)
+        clock = {'now': start}
+
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock['now']
+
+        with patch('main.datetime', Clock):
+            window.update_time_cell()
+            window.show_overlay()
+            clock['now'] = start + timedelta(seconds=30)
+            window.on_clock_timer()
+            self.assertEqual(window.cells[(1, 2)].text(), "Clock\n12:00\nN/A")
+
+            window.hide_overlay()
+            self.assertEqual(window.cells[(1, 2)].text(), "Clock\n12:01\nN/A")
+            self.assertTrue(window.time_timer.isActive())
+            self.assertLessEqual(window.time_timer.remainingTime(), 41 * 1000)
+
     def test_render_surf_cell_high(self):
         """Test render_surf_cell with high surf"""
         data_store = {
@@ -517,7 +640,8 @@ class TestMainWindow(unittest.TestCase):
     @patch.object(MainWindow, 'fetch_tide')
     @patch.object(MainWindow, 'fetch_tidetimes')
     @patch.object(MainWindow, 'fetch_sunriseset')
-    def test_update_all_data(self, mock_sunriseset, mock_tidetimes, mock_tide,
+    @patch('main.fetch_nws.fetch_nws')
+    def test_update_all_data(self, mock_nws, mock_sunriseset, mock_tidetimes, mock_tide,
                              mock_wind, mock_surf, mock_launches):
         """Test update_all_data method"""
         # Set up mocks
@@ -550,13 +674,10 @@ class TestMainWindow(unittest.TestCase):
         """Test update_all_cells method"""
         # Set up data store
         tz = pytz.timezone('America/Los_Angeles')
-        self.window.data_store = {
+        data = {
             'launches': [{
                 'name': 'Test Launch',
-                'net': datetime.now(tz) + timedelta(hours=5),
-                'time_diff': '0D 5H',
-                'time_diff_days': 0,
-                'time_diff_hours': 5
+                'net': datetime.now(tz) + timedelta(hours=5)
             }],
             'surf': {'text': '3FT', 'height': 3, 'water_temp': '64°'},
             'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'},
@@ -569,6 +690,8 @@ class TestMainWindow(unittest.TestCase):
                 'sunset': datetime.now(tz)
             }
         }
+        for key, value in data.items():
+            self.window.set_data(key, value)
 
         # Call the function
         self.window.update_all_cells()
@@ -576,6 +699,53 @@ class TestMainWindow(unittest.TestCase):
         # Assertions - should call update_cell for each cell
         self.assertGreaterEqual(mock_update_cell.call_count, 5)
 
+    @patch('main.metrics.REGISTRY', new_callable=lambda: metrics.Metrics())
+    @patch.object(MainWindow, 'update_cell')
+    def test_update_all_cells_skips_unchanged_inputs(self, mock_update_cell, registry):
+        """Test that only cells whose inputs changed are re-rendered"""
+        # Nothing fetched yet: every cell keeps "Loading"
+        self.window.update_all_cells()
+        mock_update_cell.assert_not_called()
+
+        self.window.apply_data({'launches': [], 'surf': {'text': '3FT', 'height': 3, 'water_temp': '64°'},
+                                'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'},
+                                'tide': {'value': 2.5, 'trend': 'rising'},
+                                'sunriseset': {'event': 'sunrise', 'time': datetime.now(),
+                                               'sunrise': datetime.now(), 'sunset': datetime.now()}})
+        self.window.update_all_cells()
+        self.assertEqual(mock_update_cell.call_count, 5)
+        self.assertEqual(self.window.render_counts, {'executed': 5, 'skipped': 0})
+
+        # Nothing changed: nothing is rendered
+        mock_update_cell.reset_mock()
+        self.window.update_all_cells()
+        mock_update_cell.assert_not_called()
+        self.assertEqual(self.window.render_counts['skipped'], 5)
+        text = registry.render()
+        self.assertIn('pbclock_renders_total{cell="render_surf_cell",result="executed"} 1', text)
+        self.assertIn('pbclock_renders_total{cell="render_surf_cell",result="skipped"} 1', text)
+
+        # nws is read only by the wind cell
+        mock_update_cell.reset_mock()
+        self.window.apply_data({'nws': {'precip_48h': 50}})
+        self.window.update_all_cells()
+        self.assertEqual(mock_update_cell.call_count, 1)
+        self.assertEqual(mock_update_cell.call_args.args[1], (1, 1))
+
+        # Storing an identical value doesn't bump the version
+        mock_update_cell.reset_mock()
+        self.window.apply_data({'nws': {'precip_48h': 50}})
+        self.window.update_all_cells()
+        mock_update_cell.assert_not_called()
+
+        # sunriseset feeds both the launch and sunrise/set cells
+        self.window.apply_data({'sunriseset': None, 'launches': []})
+        self.window.set_data('sunriseset', {'event': 'sunrise', 'time': datetime.now(),
+                                            'sunrise': datetime.now(), 'sunset': datetime.now()})
+        self.window.update_all_cells()
+        positions = sorted(call.args[1] for call in mock_update_cell.call_args_list)
+        self.assertEqual(positions, [(0, 0), (0, 1)])
+
     @patch.object(MainWindow, 'update_all_data')
     @patch.object(MainWindow, 'update_all_cells')
     def test_update_data(self, mock_update_cells, mock_update_data):
@@ -584,15 +754,298 @@ class TestMainWindow(unittest.TestCase):
         mock_update_data.assert_called_once()
         mock_update_cells.assert_called_once()
 
+    @patch.object(MainWindow, 'update_all_cells')
+    @patch.object(MainWindow, 'collect_all_data')
+    def test_request_update_fetches_in_background(self, mock_collect, mock_update_cells):
+        """Test request_update fetches on a worker thread and applies the result"""
+        mock_collect.return_value = {'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'}}
+
+        self.window.request_update()
+        self.window.thread_pool.waitForDone(5000)
+        self.app.processEvents()
+
+        mock_collect.assert_called_once()
+        mock_update_cells.assert_called_once()
+        self.assertEqual(self.window.data_store['wind']['direction'], 'SW')
+        self.assertIsNotNone(self.window.data_store['last_update'])
+        self.assertIsNone(self.window.fetch_worker)
+
+    @patch.object(MainWindow, 'update_all_cells')
+    @patch.object(MainWindow, 'collect_all_data')
+    def test_request_update_fetches_only_due_sources(self, mock_collect, mock_update_cells):
+        """Test request_update only fetches sources whose interval has elapsed"""
+        mock_collect.return_value = {'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'}}
+        for name in self.window.scheduler.next_due:
+            if name != 'wind':
+                self.window.scheduler.mark_fetched(name)
+
+        self.window.request_update()
+        self.window.thread_pool.waitForDone(5000)
+        self.app.processEvents()
+
+        mock_collect.assert_called_once_with(['wind'])
+        self.assertEqual(self.window.scheduler.due(), [])
+        self.assertTrue(self.window.timer.isActive())
+
+    @patch.object(MainWindow, 'update_all_cells')
+    @patch.object(MainWindow, 'collect_all_data')
+    def test_request_update_failure(self, mock_collect, mock_update_cells):
+        """Test that a refresh cycle that raises counts as failed fetches, not as an update"""
+        mock_collect.side_effect = RuntimeError("refresh cycle crashed")
+        for name in self.window.scheduler.next_due:
+            if name != 'wind':
+                self.window.scheduler.mark_fetched(name)
+
+        self.window.request_update()
+        self.window.thread_pool.waitForDone(5000)
+        self.app.processEvents()
+
+        self.assertIsNone(self.window.fetch_worker)
+        self.assertIsNone(self.window.last_update_time)
+        self.assertIsNone(self.window.data_store['last_update'])
+        mock_update_cells.assert_not_called()
+        self.assertEqual(self.window.scheduler.breakers['wind'].failures, 1)
+        # Retried on wind's interval, not in a second
+        self.assertGreater(self.window.timer.remainingTime(), 60 * 1000)
+
+    @patch.object(MainWindow, 'update_all_cells')
+    def test_failed_cycle_keeps_last_update(self, mock_update_cells):
+        """Test that "Upd" only moves when a network-backed source was fetched"""
+        fetched = datetime.now() - timedelta(minutes=20)
+        self.window.fetched_at['wind'] = fetched
+        self.window.update_last_update()
+
+        # Every upstream failed; only the locally computed sources succeeded
+        self.window.on_fetch_finished({'tide_times': {'time_str': '10:00', 'type': 'High Tide'},
+                                       'sunriseset': {'event': 'sunset'}, 'late': ['surf'],
+                                       'errors': ['wind', 'tide', 'launches', 'nws'], 'cycle_time': 30})
+        self.assertEqual(self.window.last_update_time, fetched)
+        self.assertEqual(self.window.data_store['last_update'], fetched)
+
+        self.window.on_fetch_finished({'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'},
+                                       'late': [], 'errors': [], 'cycle_time': 1})
+        self.assertEqual(self.window.last_update_time, self.window.fetched_at['wind'])
+        self.assertGreater(self.window.last_update_time, fetched)
+
+    @patch.object(MainWindow, 'collect_all_data')
+    def test_request_update_skips_while_in_flight(self, mock_collect):
+        """Test request_update does not start a second fetch while one is running"""
+        self.window.fetch_worker = Mock()
+        self.window.request_update()
+        mock_collect.assert_not_called()
+
+    def test_snapshot_warm_start(self):
+        """Test that a new window restores the last snapshot before any fetch"""
+        import tempfile
+        import storage
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot.json')
+            fetched = datetime.now() - timedelta(minutes=2)
+            storage.save_snapshot(path, {'wind': {'speed': 12, 'gust': 18, 'direction': 'W'}}, {'wind': fetched})
+
+            window = MainWindow(snapshot_path=path)
+
+            self.assertEqual(window.data_store['wind']['speed'], 12)
+            self.assertEqual(window.last_update_time, fetched)
+            # Restored well within its interval, so wind isn't due yet
+            self.assertNotIn('wind', window.scheduler.due())
+            self.assertIn('surf', window.scheduler.due())
+
+    @patch.object(MainWindow, 'fetch_wind')
+    def test_apply_data_saves_snapshot(self, mock_wind):
+        """Test that a successful fetch is persisted"""
+        import tempfile
+        import storage
+        mock_wind.return_value = {'speed': 10, 'gust': 15, 'direction': 'SW'}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot.json')
+            self.window.snapshot_path = path
+            self.window.apply_data(self.window.collect_all_data(['wind']))
+            self.window.thread_pool.waitForDone(5000)
+
+            values, fetched_at = storage.load_snapshot(path)
+            self.assertEqual(values['wind']['direction'], 'SW')
+            self.assertIn('wind', fetched_at)
+
+    def test_snapshot_written_off_gui_thread(self):
+        """Test that the snapshot is written on the worker thread, and only when it changed"""
+        import threading
+        writes = []
+
+        def write_snapshot(path, snapshot):
+            writes.append(threading.current_thread())
+
+        self.window.snapshot_path = 'snapshot.json'
+        with patch('main.storage.write_snapshot', side_effect=write_snapshot):
+            self.window.apply_data({'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'}})
+            self.window.thread_pool.waitForDone(5000)
+            self.assertEqual(len(writes), 1)
+            self.assertIsNot(writes[0], threading.main_thread())
+
+            # A new local source is written; recomputing the same value isn't
+            self.window.apply_data({'sunriseset': None})
+            self.window.apply_data({'sunriseset': None})
+            self.window.thread_pool.waitForDone(5000)
+            self.assertEqual(len(writes), 2)
+
+    def test_data_service_publishes_fetches(self):
+        """Test that a serving clock publishes each applied fetch"""
+        service = Mock()
+        self.window.data_service = service
+        self.window.apply_data({'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'}, 'errors': []})
+        service.publish.assert_called_once_with(self.window.data_store, self.window.fetched_at)
+
+    def test_remote_data_not_persisted(self):
+        """Test that a client clock leaves persisting the data to the server"""
+        self.window.snapshot_path = 'snapshot.json'
+        with patch('main.storage.write_snapshot') as mock_write:
+            self.window.apply_remote_data({'wind': {'speed': 7, 'gust': 9, 'direction': 'N'}},
+                                          {'wind': datetime.now()})
+            self.window.thread_pool.waitForDone(5000)
+        mock_write.assert_not_called()
+        self.assertEqual(self.window.data_store['wind']['speed'], 7)
+
+    def test_remote_data(self):
+        """Test that a client clock applies the server's data and fetch times, then polls again"""
+        fetched = datetime.now() - timedelta(minutes=3)
+        self.window.data_client = Mock()
+        with patch.object(self.window, 'collect_all_data') as mock_collect:
+            self.window.on_remote_data(({'wind': {'speed': 7, 'gust': 9, 'direction': 'N'}, 'unknown': 1},
+                                        {'wind': fetched, 'unknown': fetched}))
+            mock_collect.assert_not_called()
+        self.assertEqual(self.window.data_store['wind']['speed'], 7)
+        self.assertNotIn('unknown', self.window.data_store)
+        self.assertEqual(self.window.last_update_time, fetched)
+        self.assertEqual(self.window.timer.interval(), 0)
+
+        # Server unreachable: keep the data and back off
+        self.window.on_remote_failed(OSError("Connection refused"))
+        self.assertEqual(self.window.data_store['wind']['speed'], 7)
+        self.assertEqual(self.window.timer.interval(), self.window.remote_retry * 1000)
+
+    @patch('main.transport.get')
+    @patch('main.fetch_nws.fetch_nws')
     @patch.object(MainWindow, 'fetch_launches')
-    def test_update_all_data_error_handling(self, mock_launches):
+    def test_update_all_data_error_handling(self, mock_launches, mock_nws, mock_get):
         """Test that update_all_data handles errors gracefully"""
         # Make fetch_launches raise an exception
         mock_launches.side_effect = Exception("Network error")
 
-        # Should not raise, but store empty list
+        # Should not raise; launches stay unfetched
         self.window.update_all_data()
-        self.assertEqual(self.window.data_store['launches'], [])
+        self.assertIsNone(self.window.data_store['launches'])
+
+    @patch.object(MainWindow, 'fetch_wind')
+    def test_failed_fetch_keeps_last_good_value(self, mock_wind):
+        """Test that a failing source keeps its value and counts towards its circuit breaker"""
+        self.window.data_store['wind'] = {'speed': 10, 'gust': 15, 'direction': 'SW'}
+        mock_wind.side_effect = Exception("Network error")
+        self.window.apply_data(self.window.collect_all_data(['wind']))
+        self.assertEqual(self.window.data_store['wind']['speed'], 10)
+        self.assertNotIn('wind', self.window.fetched_at)
+        self.assertEqual(self.window.scheduler.breakers['wind'].failures, 1)
+        self.assertNotIn('wind', self.window.scheduler.due())
+
+    @patch('transport.get')
+    def test_failed_nws_keeps_last_good_value(self, mock_get):
+        """Test that an unreachable NWS API keeps the previous forecast and its age"""
+        import requests
+        import transport
+        import fetch_nws
+        transport.clear_cache()
+        fetch_nws.configure_cache()
+        mock_get.side_effect = requests.exceptions.ConnectionError("api.weather.gov unreachable")
+        forecast = {'high': 72, 'low': 60, 'cloud_cover': 10, 'precip_today': 0,
+                    'precip_tomorrow': 0, 'precip_48h': 20}
+        fetched = datetime.now() - timedelta(hours=2)
+        self.window.set_data('nws', forecast)
+        self.window.fetched_at['nws'] = fetched
+
+        self.window.apply_data(self.window.collect_all_data(['nws']))
+
+        self.assertEqual(self.window.data_store['nws'], forecast)
+        self.assertEqual(self.window.fetched_at['nws'], fetched)
+        self.assertEqual(self.window.age_badge(['nws'], datetime.now()), '2h')
+
+    def test_stale_cell_shows_age_badge(self):
+        """Test that a value past its refresh interval is still shown, with its age"""
+        self.window.set_data('surf', {'text': '3-5FT', 'height': 5, 'water_temp': '64°'})
+        self.window.fetched_at['surf'] = datetime.now() - timedelta(minutes=30)
+        self.window.update_all_cells()
+        self.assertEqual(self.window.cells[(0, 2)].text(), "Surf\n3-5FT\n64°")
+
+        self.window.fetched_at['surf'] = datetime.now() - timedelta(hours=2, minutes=5)
+        self.window.update_all_cells()
+        self.assertEqual(self.window.cells[(0, 2)].text(), "Surf (2h)\n3-5FT\n64°")
+
+        # Unchanged badge and data: not re-rendered
+        with patch.object(self.window, 'render_surf_cell') as mock_render:
+            self.window.update_all_cells()
+            mock_render.assert_not_called()
+
+    def test_expired_value_dropped(self):
+        """Test that a value past its source's max_age is no longer shown"""
+        self.window.set_data('wind', {'speed': 10, 'gust': 15, 'direction': 'SW'})
+        self.window.fetched_at['wind'] = datetime.now() - timedelta(hours=2)
+        self.window.update_all_cells()
+        self.assertIsNone(self.window.data_store['wind'])
+        self.assertNotIn('wind', self.window.fetched_at)
+        self.assertEqual(self.window.cells[(1, 1)].text(), "Wind\nN/A")
+
+    def test_cold_start_keeps_loading(self):
+        """Test that clock ticks before the first fetch don't replace "Loading" with N/A"""
+        self.window.on_clock_timer()
+        self.assertEqual(self.window.cells[(0, 2)].text(), "\nLoading")
+        self.window.apply_data({'surf': {'text': '3FT', 'height': 3, 'water_temp': '64°'}})
+        self.window.on_clock_timer()
+        self.assertEqual(self.window.cells[(0, 2)].text(), "Surf\n3FT\n64°")
+        self.assertEqual(self.window.cells[(1, 1)].text(), "\nLoading")
+
+    def test_expired_launches_not_none(self):
+        """Test that expired launches show N/A rather than "None" (no upcoming launches)"""
+        tz = pytz.timezone('America/Los_Angeles')
+        self.window.set_data('launches', [{'name': 'Test Launch', 'net': datetime.now(tz) + timedelta(days=2)}])
+        self.window.fetched_at['launches'] = datetime.now() - timedelta(hours=7)
+        self.window.update_all_cells()
+        self.assertIsNone(self.window.data_store['launches'])
+        self.assertEqual(self.window.cells[(0, 0)].text(), "Launches\nN/A")
+
+    def test_expired_snapshot_not_restored(self):
+        """Test that a snapshot value older than its max_age isn't shown at startup"""
+        import tempfile
+        import storage
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'snapshot.json')
+            storage.save_snapshot(path, {'wind': {'speed': 12, 'gust': 18, 'direction': 'W'},
+                                         'surf': {'text': '2FT', 'height': 2, 'water_temp': '60°'}},
+                                  {'wind': datetime.now() - timedelta(days=1),
+                                   'surf': datetime.now() - timedelta(hours=3)})
+            window = MainWindow(snapshot_path=path)
+            self.assertIsNone(window.data_store['wind'])
+            self.assertEqual(window.data_store['surf']['text'], '2FT')
+            self.assertEqual(window.cells[(0, 2)].text(), "Surf (3h)\n2FT\n60°")
+
+    @patch.object(MainWindow, 'build_sources')
+    def test_update_all_data_keeps_late_sources(self, mock_build_sources):
+        """Test that sources missing the refresh deadline keep their previous value"""
+        import threading
+        from refresh import Source
+        release = threading.Event()
+        self.window.data_store['surf'] = {'text': '3FT', 'height': 3, 'water_temp': '64°'}
+        mock_build_sources.return_value = [
+            Source('wind', lambda: {'speed': 10, 'gust': 15, 'direction': 'SW'}),
+            Source('surf', lambda: release.wait(5), timeout=0.2),
+        ]
+
+        try:
+            self.window.update_all_data()
+        finally:
+            release.set()
+
+        self.assertEqual(self.window.data_store['wind']['speed'], 10)
+        self.assertEqual(self.window.data_store['surf']['text'], '3FT')
+        self.assertEqual(self.window.data_store['late'], ['surf'])
+        self.assertIsNotNone(self.window.data_store['cycle_time'])
 
 
 if __name__ == '__main__':
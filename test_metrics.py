@@ -0,0 +1,108 @@
+import unittest
+from urllib.request import urlopen
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from refresh import Source, refresh_sources
+
+
+class TestMetrics(unittest.TestCase):
+    """Test suite for fetch/render metrics and the Prometheus endpoint"""
+
+    def setUp(self):
+        self.registry = metrics.Metrics(clock=lambda: 1700000000.0)
+
+    def test_histogram_is_cumulative(self):
+        """Test that bucket counts are cumulative and end with +Inf"""
+        self.registry.observe_fetch('wind', 0.02, 'ok')
+        self.registry.observe_fetch('wind', 0.3, 'ok')
+        self.registry.observe_fetch('wind', 60, 'error')
+        text = self.registry.render()
+        self.assertIn('pbclock_fetch_duration_seconds_bucket{source="wind",le="0.025"} 1', text)
+        self.assertIn('pbclock_fetch_duration_seconds_bucket{source="wind",le="0.5"} 2', text)
+        self.assertIn('pbclock_fetch_duration_seconds_bucket{source="wind",le="+Inf"} 3', text)
+        self.assertIn('pbclock_fetch_duration_seconds_count{source="wind"} 3', text)
+        self.assertIn('pbclock_fetches_total{source="wind",outcome="error"} 1', text)
+        self.assertIn('pbclock_fetch_last_success_timestamp_seconds{source="wind"} 1700000000.0', text)
+
+    def test_bytes_renders_and_collectors(self):
+        """Test byte counters, render histograms and scrape-time collectors"""
+        self.registry.add_bytes('surf', 2048)
+        self.registry.observe_render('render_surf_cell', 0.00002)
+        self.registry.add_collector(lambda: [('pbclock_test', 'gauge', 'Test', [({'a': 'x"y'}, 2)])])
+        text = self.registry.render()
+        self.assertIn('pbclock_response_bytes_total{source="surf"} 2048', text)
+        self.assertIn('pbclock_render_duration_seconds_count{cell="render_surf_cell"} 1', text)
+        self.assertIn('pbclock_test{a="x\\"y"} 2', text)
+
+    def test_summary(self):
+        """Test the overlay summary line"""
+        self.registry.observe_fetch('wind', 0.1, 'ok')
+        self.registry.observe_fetch('wind', 0, 'late')
+        self.registry.add_bytes('wind', 1024)
+        self.assertEqual(self.registry.summary(), ['wind: 1 ok, 1 failed, 100ms, 1KB, 0m ago'])
+
+    def test_breaker_state(self):
+        """Test that breaker state is exported as one gauge per state and shown in the summary"""
+        self.registry.observe_fetch('surf', 20, 'error')
+        self.registry.set_breaker('surf', 'open', 3, opened=True)
+        text = self.registry.render()
+        self.assertIn('pbclock_breaker_state{source="surf",state="open"} 1', text)
+        self.assertIn('pbclock_breaker_state{source="surf",state="closed"} 0', text)
+        self.assertIn('pbclock_breaker_consecutive_failures{source="surf"} 3', text)
+        self.assertIn('pbclock_breaker_opens_total{source="surf"} 1', text)
+        self.assertTrue(self.registry.summary()[0].endswith('never, breaker open'))
+
+    def test_refresh_records_fetches(self):
+        """Test that the refresh engine records every source's outcome"""
+        metrics.REGISTRY.reset()
+
+        def fail():
+            raise Exception("Network error")
+
+        refresh_sources([Source('good', lambda: 1), Source('bad', fail)], deadline=5)
+        self.assertEqual(metrics.REGISTRY.fetch_outcomes, {'good': {'ok': 1}, 'bad': {'error': 1}})
+
+    def test_late_fetch_not_counted_ok(self):
+        """Test that a late source that finishes afterwards adds its latency but no success"""
+        import threading
+        import time
+        metrics.REGISTRY.reset()
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow():
+            release.wait(5)
+            finished.set()
+            return 'too late'
+
+        refresh_sources([Source('slow', slow, timeout=0.1)], deadline=5)
+        release.set()
+        finished.wait(5)
+        # The done callback runs just after the fetch returns
+        for _ in range(50):
+            if 'slow' in metrics.REGISTRY.fetch_latency:
+                break
+            time.sleep(0.01)
+        self.assertEqual(metrics.REGISTRY.fetch_outcomes, {'slow': {'late': 1}})
+        self.assertNotIn('slow', metrics.REGISTRY.last_success)
+        self.assertEqual(metrics.REGISTRY.fetch_latency['slow'].count, 1)
+
+    def test_endpoint(self):
+        """Test that /metrics serves the text format"""
+        self.registry.observe_fetch('tide', 0.05, 'ok')
+        server = metrics.start_server(0, registry=self.registry)
+        try:
+            with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+                self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+                self.assertIn('pbclock_fetches_total{source="tide",outcome="ok"} 1', response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+import unittest
+import time
+import threading
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from refresh import CircuitBreaker, Source, RefreshScheduler, refresh_sources
+
+
+class TestRefreshSources(unittest.TestCase):
+    """Test suite for the concurrent refresh engine"""
+
+    def test_sources_run_concurrently(self):
+        """Test that the cycle takes about as long as the slowest source"""
+        def slow(value):
+            def fetch():
+                time.sleep(0.3)
+                return value
+            return fetch
+
+        sources = [Source(f"s{i}", slow(i)) for i in range(5)]
+        result = refresh_sources(sources, deadline=5)
+
+        self.assertEqual(result.data, {f"s{i}": i for i in range(5)})
+        self.assertEqual(result.late, [])
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_error_is_left_out(self):
+        """Test that a failing source is listed in errors and not returned, keeping its last good value"""
+        def fail():
+            raise Exception("Network error")
+
+        result = refresh_sources([Source('launches', fail)], deadline=5)
+        self.assertNotIn('launches', result.data)
+        self.assertEqual(result.errors, ['launches'])
+
+    def test_none_is_an_error(self):
+        """Test that a fetcher returning None (it logged an upstream failure) counts as an error"""
+        result = refresh_sources([Source('nws', lambda: None)], deadline=5)
+        self.assertNotIn('nws', result.data)
+        self.assertEqual(result.errors, ['nws'])
+
+    def test_late_source_is_left_out(self):
+        """Test that a source missing its timeout is marked late and not returned"""
+        release = threading.Event()
+
+        def hang():
+            release.wait(5)
+            return 'too late'
+
+        sources = [
+            Source('fast', lambda: 'ok'),
+            Source('slow', hang, timeout=0.2),
+        ]
+        try:
+            result = refresh_sources(sources, deadline=5)
+        finally:
+            release.set()
+
+        self.assertEqual(result.data, {'fast': 'ok'})
+        self.assertEqual(result.late, ['slow'])
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_global_deadline(self):
+        """Test that the cycle deadline caps sources with longer timeouts"""
+        release = threading.Event()
+        sources = [Source('slow', lambda: release.wait(5), timeout=60)]
+        try:
+            result = refresh_sources(sources, deadline=0.2)
+        finally:
+            release.set()
+
+        self.assertEqual(result.late, ['slow'])
+        self.assertLess(result.elapsed, 1.0)
+
+    def test_no_sources(self):
+        """Test that an empty source list returns an empty result"""
+        result = refresh_sources([])
+        self.assertEqual(result.data, {})
+        self.assertEqual(result.late, [])
+
+
+class TestRefreshScheduler(unittest.TestCase):
+    """Test suite for the per-source refresh scheduler"""
+
+    def setUp(self):
+        self.now = 1000.0
+        sources = [
+            Source('wind', None, interval=300),
+            Source('launches', None, interval=3600, jitter=300),
+        ]
+        self.scheduler = RefreshScheduler(sources, clock=lambda: self.now, rng=lambda a, b: b)
+
+    def test_all_sources_due_at_start(self):
+        """Test that every source is due before its first fetch"""
+        self.assertEqual(sorted(self.scheduler.due()), ['launches', 'wind'])
+        self.assertEqual(self.scheduler.seconds_until_due(), 0)
+
+    def test_only_due_sources_returned(self):
+        """Test that sources come due on their own intervals"""
+        self.scheduler.mark_fetched('wind')
+        self.scheduler.mark_fetched('launches')
+        self.assertEqual(self.scheduler.due(), [])
+        self.assertEqual(self.scheduler.seconds_until_due(), 300)
+
+        self.now += 300
+        self.assertEqual(self.scheduler.due(), ['wind'])
+
+        self.now += 3600
+        self.assertEqual(sorted(self.scheduler.due()), ['launches', 'wind'])
+
+    def test_jitter_applied(self):
+        """Test that jitter shifts the next due time"""
+        self.scheduler.mark_fetched('launches')
+        self.assertEqual(self.scheduler.next_due['launches'], self.now + 3900)
+
+    def test_freshness(self):
+        """Test that values go stale once their refresh is overdue and expire after max_age"""
+        scheduler = RefreshScheduler([Source('wind', None, interval=300, jitter=30, max_age=3600),
+                                      Source('launches', None, interval=3600)])
+        self.assertEqual(scheduler.freshness('wind', 300), 'fresh')
+        self.assertEqual(scheduler.freshness('wind', 391), 'stale')
+        self.assertEqual(scheduler.freshness('wind', 3601), 'expired')
+        # No max_age: stale but never expired
+        self.assertEqual(scheduler.freshness('launches', 10 * 86400), 'stale')
+
+    def test_unknown_name_ignored(self):
+        """Test that marking a non-source key as fetched is a no-op"""
+        self.scheduler.mark_fetched('last_update')
+        self.assertNotIn('last_update', self.scheduler.next_due)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test suite for per-source circuit breakers"""
+
+    def setUp(self):
+        self.now = 1000.0
+        metrics.REGISTRY.reset()
+        sources = [Source('wind', None, interval=300, failure_threshold=3, max_backoff=2000)]
+        self.scheduler = RefreshScheduler(sources, clock=lambda: self.now, rng=lambda a, b: b)
+        self.breaker = self.scheduler.breakers['wind']
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.scheduler.mark_failed('wind')
+
+    def test_failures_below_threshold_retry_on_interval(self):
+        """Test that a closed breaker retries a failed source after its interval"""
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.scheduler.next_due['wind'], self.now + 300)
+
+    def test_opens_and_backs_off_exponentially(self):
+        """Test that consecutive failures open the breaker and each failed probe doubles the backoff"""
+        self.fail(3)
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.scheduler.next_due['wind'], self.now + 600)
+        # Not fetched at all while open
+        self.now += 599
+        self.assertEqual(self.scheduler.due(), [])
+
+        self.now += 1
+        self.assertEqual(self.scheduler.due(), ['wind'])
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.fail()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertEqual(self.scheduler.next_due['wind'], self.now + 1200)
+
+        self.now += 1200
+        self.scheduler.due()
+        self.fail()
+        # Capped at max_backoff
+        self.assertEqual(self.scheduler.next_due['wind'], self.now + 2000)
+        self.assertEqual(metrics.REGISTRY.breaker_opens['wind'], 3)
+
+    def test_probe_success_closes(self):
+        """Test that a successful half-open probe closes the breaker and resets the backoff"""
+        self.fail(3)
+        self.now += 600
+        self.scheduler.due()
+        self.scheduler.mark_fetched('wind')
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.opens, 0)
+        self.assertEqual(metrics.REGISTRY.breakers['wind'], ('closed', 0))
+        self.fail(3)
+        self.assertEqual(self.scheduler.next_due['wind'], self.now + 600)
+
+    def test_jitter(self):
+        """Test that the backoff is scaled by a random 0.5-1.0"""
+        breaker = CircuitBreaker(threshold=1, base=100, rng=lambda a, b: a)
+        self.assertEqual(breaker.record_failure(0), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch
+import os
+import random
+import tempfile
+import threading
+from datetime import date, datetime
+
+import pytz
+import requests
+
+# Import the module to test
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fetch_nws
+import transport
+from simulator import Faults, UpstreamSimulator, shift_dates
+from tides import TidePredictionStore
+
+LAUNCHES_URL = 'https://nextspaceflight.com/launches/nsf_launches/10/'
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestUpstreamSimulator(unittest.TestCase):
+    """Test suite for the local upstream simulator"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = start(UpstreamSimulator())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        transport.clear_cache()
+        fetch_nws.configure_cache(None)
+
+    def upstream(self, server):
+        return patch.dict(os.environ, {transport.UPSTREAM_ENV: server.base_url})
+
+    def test_url_rewrite(self):
+        """Test that PBCLOCK_UPSTREAM sends requests to <base>/<host><path>?<query>"""
+        with patch.dict(os.environ, {transport.UPSTREAM_ENV: 'http://127.0.0.1:8089/'}):
+            self.assertEqual(transport.upstream_url('https://api.weather.gov/points/1,2?x=1'),
+                             'http://127.0.0.1:8089/api.weather.gov/points/1,2?x=1')
+        with patch.dict(os.environ, {transport.UPSTREAM_ENV: ''}):
+            self.assertEqual(transport.upstream_url(LAUNCHES_URL), LAUNCHES_URL)
+
+    def test_replays_fetchers(self):
+        """Test that the fetchers run end to end against the recorded responses"""
+        with self.upstream(self.server):
+            launches = transport.get(LAUNCHES_URL).json()
+            self.assertEqual(len(launches), 10)
+            # An unknown ZIP goes through the Census geocoder, then points and forecast
+            self.assertEqual(fetch_nws.get_lat_lon_from_zip('92110'), (32.7979, -117.2381))
+            self.assertIn('periods', fetch_nws.fetch_forecast(32.7934, -117.2544)['properties'])
+        stats = self.server.stats_snapshot()
+        self.assertEqual(stats['api.weather.gov']['requests'], 2)
+        self.assertNotIn('missing', stats['nextspaceflight.com'])
+
+    def test_replayed_dates_are_current(self):
+        """Test that recorded predictions are moved to the current week so a tide is always upcoming"""
+        now = datetime.now(pytz.timezone('America/Los_Angeles'))
+        store = TidePredictionStore()
+        with self.upstream(self.server):
+            store.refill(now)
+        self.assertIsNotNone(store.next_event(now))
+
+    def test_shift_dates(self):
+        """Test that both date formats move forward and keep their weekday"""
+        body = b'{"t": "2024-11-07 03:12", "net": "Tue, Nov 12, 2024, 01:29 AM PST", "n": "12024-11-070"}'
+        self.assertEqual(shift_dates(body, 28),
+                         b'{"t": "2024-12-05 03:12", "net": "Tue, Dec 10, 2024, 01:29 AM PST", "n": "12024-11-070"}')
+        self.assertEqual(self.server.recording.date_shift(date(2024, 11, 20)), 7)
+
+    def test_error_injection(self):
+        """Test that error_rate answers with the configured status"""
+        server = start(UpstreamSimulator(faults=Faults(error_rate=1.0, error_status=500)))
+        try:
+            with self.upstream(server):
+                self.assertEqual(transport.get(LAUNCHES_URL).status_code, 500)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_truncated_body(self):
+        """Test that a truncated body surfaces as a request error"""
+        server = start(UpstreamSimulator(faults=Faults(truncate_rate=1.0)))
+        try:
+            with self.upstream(server):
+                with self.assertRaises(requests.exceptions.RequestException):
+                    transport.get(LAUNCHES_URL)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_record_mode(self):
+        """Test that record mode captures a response once and replays it after"""
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = start(UpstreamSimulator(directory=directory, record=True, record_base=self.server.base_url))
+            try:
+                with self.upstream(recorder):
+                    first = transport.get(LAUNCHES_URL).json()
+                    second = transport.get(LAUNCHES_URL).json()
+            finally:
+                recorder.shutdown()
+                recorder.server_close()
+            self.assertEqual(first, second)
+            self.assertEqual(recorder.stats_snapshot()['nextspaceflight.com']['recorded'], 1)
+            self.assertEqual(len(recorder.recording.entries), 1)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'manifest.json')))
+
+    def test_latency_distributions(self):
+        """Test that each latency distribution has roughly the configured mean"""
+        rng = random.Random(1)
+        for latency in ('fixed', 'uniform', 'exponential', 'lognormal'):
+            faults = Faults(latency=latency, latency_ms=100, jitter_ms=40)
+            mean = sum(faults.delay(rng) for _ in range(2000)) / 2000
+            self.assertAlmostEqual(mean, 0.1, delta=0.01, msg=latency)
+
+
+if __name__ == '__main__':
+    unittest.main()
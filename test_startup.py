@@ -0,0 +1,73 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+
+# Import the module to test
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from lazy import lazy_import, is_loaded, resolve
+from startup import StartupProfiler
+
+
+class TestLazyImport(unittest.TestCase):
+    """Test suite for deferred module loading"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, 'pbclock_lazy_probe.py'), 'w') as f:
+            f.write("LOADS = []\nLOADS.append(1)\nVALUE = 42\n")
+        sys.path.insert(0, self.tmpdir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.tmpdir.name)
+        sys.modules.pop('pbclock_lazy_probe', None)
+        self.tmpdir.cleanup()
+
+    def test_module_runs_on_first_attribute(self):
+        """Test that the module body runs only when an attribute is used"""
+        module = lazy_import('pbclock_lazy_probe')
+        self.assertFalse(is_loaded(module))
+        self.assertEqual(module.VALUE, 42)
+        self.assertTrue(is_loaded(module))
+        self.assertEqual(module.LOADS, [1])
+
+    def test_resolve_and_reuse(self):
+        """Test that resolve() loads the module and later lookups reuse it"""
+        module = lazy_import('pbclock_lazy_probe')
+        resolve(module)
+        self.assertTrue(is_loaded(module))
+        self.assertIs(lazy_import('pbclock_lazy_probe'), module)
+
+    def test_missing_module(self):
+        """Test that a missing module fails at lazy_import time"""
+        with self.assertRaises(ModuleNotFoundError):
+            lazy_import('pbclock_no_such_module')
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """Test suite for the startup profiler and time-to-first-paint budget"""
+
+    def test_budget(self):
+        """Test that the budget check compares the first_paint milestone"""
+        profiler = StartupProfiler(started=0)
+        self.assertFalse(profiler.within_budget(10))
+        profiler.marks['first_paint'] = 1.5
+        self.assertTrue(profiler.within_budget(2))
+        self.assertFalse(profiler.within_budget(1))
+
+    def test_first_paint_within_budget(self):
+        """Test that main.py paints its first frame within budget and before the heavy imports"""
+        root = os.path.dirname(os.path.abspath(__file__))
+        with tempfile.TemporaryDirectory() as cache:
+            env = dict(os.environ, QT_QPA_PLATFORM='offscreen', PBCLOCK_CACHE_DIR=cache)
+            result = subprocess.run(
+                [sys.executable, os.path.join(root, 'main.py'), '--profile-startup', '--startup-budget', '20'],
+                env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        self.assertIn('first_paint:', result.stdout)
+        self.assertIn('dateparser', result.stdout.split('deferred imports:')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
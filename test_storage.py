@@ -0,0 +1,69 @@
+import unittest
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+import pytz
+
+# Import the module to test
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import storage
+
+
+class TestStorage(unittest.TestCase):
+    """Test suite for the data_store snapshot"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'snapshot.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        """Test that values and timestamps survive a save/load cycle"""
+        tz = pytz.timezone('America/Los_Angeles')
+        net = tz.localize(datetime(2024, 12, 20, 10, 0))
+        fetched = datetime(2024, 12, 19, 8, 30)
+        data_store = {
+            'launches': [{'name': 'Test Launch', 'net': net, 'time_diff': '0D 2H'}],
+            'wind': {'speed': 10, 'gust': 15, 'direction': 'SW'},
+            'surf': None,
+        }
+
+        storage.save_snapshot(self.path, data_store, {'launches': fetched, 'wind': fetched})
+        values, fetched_at = storage.load_snapshot(self.path)
+
+        self.assertEqual(set(values), {'launches', 'wind'})
+        self.assertEqual(values['launches'][0]['net'], net)
+        self.assertEqual(values['wind'], data_store['wind'])
+        self.assertEqual(fetched_at['wind'], fetched)
+
+    def test_missing_file(self):
+        """Test that a missing snapshot loads as empty"""
+        self.assertEqual(storage.load_snapshot(self.path), ({}, {}))
+
+    def test_corrupt_file(self):
+        """Test that a truncated snapshot is ignored"""
+        with open(self.path, 'w') as f:
+            f.write('{"schema": 1, "sour')
+        self.assertEqual(storage.load_snapshot(self.path), ({}, {}))
+
+    def test_schema_mismatch(self):
+        """Test that snapshots from another schema version are ignored"""
+        with open(self.path, 'w') as f:
+            json.dump({'schema': storage.SNAPSHOT_SCHEMA + 1, 'sources': {'wind': {'value': 1}}}, f)
+        self.assertEqual(storage.load_snapshot(self.path), ({}, {}))
+
+    def test_atomic_write_leaves_no_temp_files(self):
+        """Test that atomic_write replaces the file and cleans up"""
+        storage.atomic_write(self.path, 'old')
+        storage.atomic_write(self.path, 'new')
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['snapshot.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
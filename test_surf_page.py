@@ -0,0 +1,58 @@
+import unittest
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from surf_page import parse_surf, parse_surf_soup, benchmark
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'surf.html')
+
+
+class TestSurfPage(unittest.TestCase):
+    """Test suite for the streaming surf page extractor"""
+
+    def assertSameAsSoup(self, content):
+        self.assertEqual(parse_surf(content), parse_surf_soup(content))
+
+    def test_fixture(self):
+        """Test that the recorded page gives the same result as the BeautifulSoup path"""
+        with open(FIXTURE, 'rb') as f:
+            content = f.read()
+        self.assertEqual(parse_surf(content), {'text': '3-5FT', 'height': 5, 'water_temp': '64°'})
+        self.assertSameAsSoup(content)
+
+    def test_desc_inside_label_parent(self):
+        """Test a water temp value nested inside the label's own element"""
+        self.assertSameAsSoup('<h1 id="fcst-current-title">2+FT</h1>'
+                              '<div>Water Temp <span class="current-data-desc">61°</span></div>')
+
+    def test_wetsuit_fallback(self):
+        """Test the wetsuit fallback when there is no WATER TEMP label"""
+        content = ('<h1 id="fcst-current-title">Pacific Beach 1-2FT</h1>'
+                   '<div class="current-data-desc">70° 10 mph Wetsuit</div>'
+                   '<div class="current-data-desc">59°<br>Wetsuit 4/3</div>')
+        self.assertEqual(parse_surf(content)['water_temp'], '59°')
+        self.assertSameAsSoup(content)
+
+    def test_missing_title(self):
+        """Test a page without the forecast title"""
+        content = '<html><body><p>Forecast unavailable</p></body></html>'
+        self.assertEqual(parse_surf(content), {'text': 'N/A', 'height': 0, 'water_temp': 'N/A'})
+        self.assertSameAsSoup(content)
+
+    def test_water_temp_without_title(self):
+        """Test that the WATER TEMP label is still used on a page without the forecast title"""
+        content = '<div><b>WATER TEMP</b> <i><span class="current-data-desc">66°</span></i></div>'
+        self.assertEqual(parse_surf(content)['water_temp'], '66°')
+        self.assertSameAsSoup(content)
+
+    def test_benchmark_reports_both(self):
+        """Test that the benchmark reports time and peak memory for both extractors"""
+        results = benchmark('<h1 id="fcst-current-title">3FT</h1>', rounds=1)
+        self.assertEqual(set(results), {'beautifulsoup', 'streaming'})
+        self.assertIn('peak_kb', results['streaming'])
+
+
+if __name__ == '__main__':
+    unittest.main()
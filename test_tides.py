@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime, timedelta
+import pytz
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from tides import TidePredictionStore
+
+
+class TestTidePredictionStore(unittest.TestCase):
+    """Test suite for the tide prediction store"""
+
+    def setUp(self):
+        self.store = TidePredictionStore()
+        self.tz = self.store.tz
+        self.store.load([
+            {'t': '2024-12-20 03:12', 'v': '5.1', 'type': 'H'},
+            {'t': '2024-12-20 09:40', 'v': '-0.4', 'type': 'L'},
+            {'t': '2024-12-20 16:05', 'v': '3.2', 'type': 'H'},
+            {'t': '2024-12-20 21:30', 'v': '1.8', 'type': 'L'},
+            {'t': '2024-12-21 04:01', 'v': '5.3', 'type': 'H'},
+        ])
+
+    def at(self, text):
+        return self.tz.localize(datetime.strptime(text, '%Y-%m-%d %H:%M'))
+
+    def test_next_event(self):
+        """Test that the next event after now is returned"""
+        when, event_type, height = self.store.next_event(self.at('2024-12-20 10:00'))
+        self.assertEqual(when, self.at('2024-12-20 16:05'))
+        self.assertEqual(event_type, 'High Tide')
+        self.assertEqual(height, 3.2)
+
+    def test_next_event_rolls_over_midnight(self):
+        """Test that after the last tide of the day tomorrow's first is returned"""
+        when, event_type, _ = self.store.next_event(self.at('2024-12-20 22:00'))
+        self.assertEqual(when, self.at('2024-12-21 04:01'))
+        self.assertEqual(event_type, 'High Tide')
+
+    def test_event_at_exactly_now_is_past(self):
+        """Test that an event at the current minute is not 'next'"""
+        when, _, _ = self.store.next_event(self.at('2024-12-20 09:40'))
+        self.assertEqual(when, self.at('2024-12-20 16:05'))
+
+    def test_next_event_past_horizon(self):
+        """Test that None is returned when predictions have run out"""
+        self.assertIsNone(self.store.next_event(self.at('2024-12-22 00:00')))
+
+    def test_needs_refill(self):
+        """Test that a refill is needed only when the horizon gets short"""
+        self.assertTrue(TidePredictionStore().needs_refill(self.at('2024-12-20 10:00')))
+        store = self.store
+        store.min_horizon = timedelta(hours=12)
+        self.assertFalse(store.needs_refill(self.at('2024-12-20 10:00')))
+        self.assertTrue(store.needs_refill(self.at('2024-12-20 17:00')))
+
+    @patch('tides.transport.get')
+    def test_refill(self, mock_get):
+        """Test that refill requests several days of hi/lo predictions in one call"""
+        mock_response = Mock()
+        mock_response.json.return_value = {'predictions': [{'t': '2024-12-25 06:00', 'v': '4.0', 'type': 'H'}]}
+        mock_get.return_value = mock_response
+
+        self.store.refill(self.at('2024-12-24 12:00'))
+
+        url = mock_get.call_args.args[0]
+        self.assertIn('begin_date=20241224', url)
+        self.assertIn('range=240', url)
+        self.assertIn('interval=hilo', url)
+        self.assertEqual(self.store.times, [self.at('2024-12-25 06:00')])
+
+    @patch('tides.transport.get')
+    def test_refill_error(self, mock_get):
+        """Test that a NOAA error response raises and keeps old predictions"""
+        mock_response = Mock()
+        mock_response.json.return_value = {'error': {'message': 'No data'}}
+        mock_get.return_value = mock_response
+
+        with self.assertRaises(ValueError):
+            self.store.refill(self.at('2024-12-20 10:00'))
+        self.assertEqual(len(self.store.times), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import unittest
+from unittest.mock import Mock, patch
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import the module to test
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import transport
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        if self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path == '/etag':
+            self.send_header('ETag', '"v1"')
+        elif self.path == '/max-age':
+            self.send_header('Cache-Control', 'public, max-age=300')
+        elif self.path == '/no-store':
+            self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    """Test suite for the shared HTTP transport"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connection_is_reused(self):
+        """Test that consecutive requests to one host share a connection"""
+        before = transport.stats()
+        for _ in range(3):
+            response = transport.get(f"{self.base_url}/data")
+            self.assertEqual(response.json(), {'ok': True})
+        after = transport.stats()
+
+        self.assertEqual(after['requests'] - before['requests'], 3)
+        self.assertLessEqual(after['handshakes'] - before['handshakes'], 1)
+        self.assertGreaterEqual(after['reused'] - before['reused'], 2)
+
+    def test_default_timeout(self):
+        """Test that get() applies the default timeout"""
+        with patch.object(transport.get_session(), 'get') as mock_get:
+            transport.get('https://example.com/')
+            self.assertEqual(mock_get.call_args.kwargs['timeout'], transport.DEFAULT_TIMEOUT)
+
+    def test_explicit_timeout(self):
+        """Test that a caller-supplied timeout overrides the default"""
+        with patch.object(transport.get_session(), 'get') as mock_get:
+            transport.get('https://example.com/', timeout=3)
+            self.assertEqual(mock_get.call_args.kwargs['timeout'], 3)
+
+    def test_session_is_shared(self):
+        """Test that get_session returns the same session every time"""
+        self.assertIs(transport.get_session(), transport.get_session())
+
+    def test_retry_policy_is_bounded(self):
+        """Test that the retry policy has a finite total"""
+        retry = transport.build_retry()
+        self.assertEqual(retry.total, 2)
+        self.assertIn(503, retry.status_forcelist)
+
+
+class TestHTTPCache(unittest.TestCase):
+    """Test suite for the conditional-request cache"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        transport.clear_cache()
+        self.parse_calls = 0
+
+    def parse(self, response):
+        self.parse_calls += 1
+        return response.json()
+
+    def test_max_age_served_from_cache(self):
+        """Test that a fresh response is reused without a request"""
+        for _ in range(3):
+            result = transport.get_parsed(f"{self.base_url}/max-age", self.parse, source='test')
+            self.assertEqual(result, {'ok': True})
+        self.assertEqual(self.parse_calls, 1)
+        stats = transport.cache_stats()['test']
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+    def test_etag_revalidation_skips_parse(self):
+        """Test that a 304 returns the cached result without reparsing"""
+        for _ in range(3):
+            result = transport.get_parsed(f"{self.base_url}/etag", self.parse, source='test')
+            self.assertEqual(result, {'ok': True})
+        self.assertEqual(self.parse_calls, 1)
+        stats = transport.cache_stats()['test']
+        self.assertEqual(stats['revalidated'], 2)
+        self.assertAlmostEqual(stats['revalidation_rate'], 2 / 3)
+
+    def test_no_store_not_cached(self):
+        """Test that no-store responses are fetched and parsed every time"""
+        for _ in range(2):
+            transport.get_parsed(f"{self.base_url}/no-store", self.parse, source='test')
+        self.assertEqual(self.parse_calls, 2)
+        self.assertEqual(transport.cache_stats()['test']['misses'], 2)
+
+
+class TestContentFingerprint(unittest.TestCase):
+    """Test suite for the scraped page fingerprint short-circuit"""
+
+    def setUp(self):
+        transport.clear_cache()
+        self.parse_calls = 0
+
+    def parse(self, response):
+        self.parse_calls += 1
+        return response.content.count(b'<p>')
+
+    def page(self, body):
+        return Mock(status_code=200, headers={}, content=body)
+
+    @patch('transport.get')
+    def test_volatile_markup_ignored(self, mock_get):
+        """Test that a page differing only in scripts and ads isn't reparsed"""
+        mock_get.side_effect = [
+            self.page(b'<p>3-5FT</p><script>var t=1;</script><ins>ad 1</ins>'),
+            self.page(b'<p>3-5FT</p><script>var t=2;</script><ins>ad 2</ins>'),
+            self.page(b'<p>3-5FT</p><p>64\xc2\xb0</p><script>var t=3;</script>'),
+        ]
+        results = [transport.get_scraped('http://surf.test/', self.parse, source='surf') for _ in range(3)]
+        self.assertEqual(results, [1, 1, 2])
+        self.assertEqual(self.parse_calls, 2)
+        stats = transport.fingerprint_stats()['surf']
+        self.assertEqual((stats['unchanged'], stats['changed']), (1, 2))
+        self.assertAlmostEqual(stats['hit_rate'], 1 / 3)
+
+    def test_extra_volatile_patterns(self):
+        """Test that per-source patterns are removed before hashing"""
+        self.assertEqual(transport.fingerprint(b'<p>Updated 06:10 AM</p>', (rb'Updated [^<]*',)),
+                         transport.fingerprint(b'<p>Updated 09:40 AM</p>', (rb'Updated [^<]*',)))
+        self.assertNotEqual(transport.fingerprint(b'<p>Updated 06:10 AM</p>'),
+                            transport.fingerprint(b'<p>Updated 09:40 AM</p>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import pytz
+
+from lazy import lazy_import
+
+transport = lazy_import('transport')
+
+PREDICTIONS_URL = ("https://api.tidesandcurrents.noaa.gov/api/prod/datagetter?station={station}"
+                   "&begin_date={begin_date}&range={hours}&product=predictions&interval=hilo"
+                   "&datum=MLLW&units=english&time_zone=lst_ldt&format=json&application=pbclock")
+
+EVENT_TYPES = {'H': 'High Tide', 'L': 'Low Tide'}
+
+
+class TidePredictionStore:
+    """Hi/lo tide predictions for one station, answered locally
+
+    One bulk request fetches `days` days of predictions. They are kept as
+    timezone-aware datetimes in a sorted list, so the next event is a
+    binary search. The store only goes back to the network when fewer
+    than `min_horizon` of predictions remain.
+    """
+
+    def __init__(self, station='9410230', timezone='America/Los_Angeles', days=10, min_horizon=timedelta(days=2)):
+        self.station = station
+        self.tz = pytz.timezone(timezone)
+        self.days = days
+        self.min_horizon = min_horizon
+        self.times = []
+        self.events = []
+        self.lock = threading.Lock()
+
+    def needs_refill(self, now):
+        """Return True if predictions run out within min_horizon of now"""
+        with self.lock:
+            return not self.times or self.times[-1] - now < self.min_horizon
+
+    def load(self, predictions):
+        """Replace the stored predictions with NOAA 'predictions' entries
+
+        Args:
+            predictions: List of dicts with t ('YYYY-MM-DD HH:MM' local time),
+                v (height in feet) and type ('H' or 'L')
+        """
+        rows = []
+        for p in predictions:
+            when = self.tz.localize(datetime.strptime(p['t'], '%Y-%m-%d %H:%M'))
+            rows.append((when, EVENT_TYPES.get(p['type'], p['type']), float(p['v'])))
+        rows.sort(key=lambda row: row[0])
+        with self.lock:
+            self.times = [row[0] for row in rows]
+            self.events = [(row[1], row[2]) for row in rows]
+
+    def refill(self, now):
+        """Fetch predictions from the start of today for the next `days` days"""
+        url = PREDICTIONS_URL.format(station=self.station,
+                                     begin_date=now.astimezone(self.tz).strftime('%Y%m%d'),
+                                     hours=self.days * 24)
+        logging.info(f"Fetching {self.days} days of tide predictions for station {self.station}")
+        response = transport.get(url, source='tide_times')
+        response.raise_for_status()
+        data = response.json()
+        if 'predictions' not in data:
+            raise ValueError(f"No tide predictions returned: {data.get('error', data)}")
+        self.load(data['predictions'])
+        logging.info(f"Loaded {len(self.times)} tide predictions")
+
+    def next_event(self, now):
+        """Return (time, type, height) of the first event after now, or None"""
+        with self.lock:
+            i = bisect_right(self.times, now)
+            if i >= len(self.times):
+                return None
+            event_type, height = self.events[i]
+            return self.times[i], event_type, height
@@ -0,0 +1,406 @@
+"""Shared HTTP transport for all fetchers
+
+Every upstream request goes through get(), which uses one pooled
+requests.Session so connections to each host are kept alive between
+refresh cycles. Requests get default connect/read timeouts and a bounded
+retry policy, and connection reuse is counted for stats().
+
+get_parsed() adds an HTTP cache on top: it honors Cache-Control max-age,
+revalidates with If-None-Match/If-Modified-Since, and keeps the parsed
+result so a 304 skips reparsing.
+
+get_scraped() adds a content fingerprint for scraped HTML pages that
+carry no validators: when the body hashes the same as last time (after
+dropping volatile markup such as scripts and ads), the previous parse
+result is returned without reparsing.
+
+Setting PBCLOCK_UPSTREAM to the base URL of a local simulator (see
+simulator.py) sends every request there instead of the real hosts.
+"""
+import email.utils
+import functools
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+import metrics
+
+# (connect, read) timeout in seconds used when the caller doesn't pass one
+DEFAULT_TIMEOUT = (5, 15)
+USER_AGENT = 'pbclock/1.0 (weather app)'
+
+# Connections kept alive per host; the concurrent refresh hits most hosts once
+POOL_MAXSIZE = 4
+
+# Environment variable naming an upstream simulator to send all requests to
+UPSTREAM_ENV = 'PBCLOCK_UPSTREAM'
+
+_lock = threading.Lock()
+_session = None
+_stats = {
+    'requests': 0,
+    'exchanges': 0,
+    'handshakes': 0,
+}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+class _CountingPoolMixin:
+    """Count HTTP exchanges (including retries) and newly opened connections"""
+
+    def urlopen(self, *args, **kwargs):
+        _count('exchanges')
+        return super().urlopen(*args, **kwargs)
+
+    def _new_conn(self):
+        _count('handshakes')
+        return super()._new_conn()
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count every new connection"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+def build_retry():
+    """Retry policy: a couple of quick retries on connect errors and gateway errors"""
+    return Retry(
+        total=2,
+        connect=2,
+        read=1,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+
+
+def build_session():
+    """Create a requests.Session with pooled, retrying adapters"""
+    session = requests.Session()
+    adapter = CountingHTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE, max_retries=build_retry())
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def upstream_url(url):
+    """Rewrite url to <PBCLOCK_UPSTREAM>/<host><path>?<query> when a simulator is configured"""
+    base = os.environ.get(UPSTREAM_ENV)
+    if not base:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    rewritten = f"{base.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+def get(url, timeout=DEFAULT_TIMEOUT, source=None, **kwargs):
+    """GET a URL through the shared session
+
+    Takes the same keyword arguments as requests.get. timeout defaults to
+    DEFAULT_TIMEOUT so no request can hang forever. The body size is added
+    to the metrics under source (default: the URL's host).
+    """
+    with _lock:
+        _stats['requests'] += 1
+    response = get_session().get(upstream_url(url), timeout=timeout, **kwargs)
+    metrics.REGISTRY.add_bytes(source or urllib.parse.urlsplit(url).netloc, len(response.content))
+    return response
+
+
+class _CacheEntry:
+    def __init__(self, parsed, etag, last_modified, expires):
+        self.parsed = parsed
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+
+_cache = {}
+_cache_stats = {}
+
+
+def _header(response, name):
+    """Return a response header as a string, or None"""
+    value = response.headers.get(name) if hasattr(response, 'headers') else None
+    return value if isinstance(value, str) else None
+
+
+def _freshness_lifetime(response):
+    """Seconds the response may be served from cache without revalidation
+
+    Returns None if the response must not be stored at all.
+    """
+    cache_control = (_header(response, 'Cache-Control') or '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    lifetime = 0
+    match = re.search(r'(?:^|,)\s*max-age=(\d+)', cache_control)
+    if match:
+        lifetime = int(match.group(1))
+    else:
+        expires = _header(response, 'Expires')
+        date = _header(response, 'Date')
+        if expires:
+            try:
+                expires_dt = email.utils.parsedate_to_datetime(expires)
+                date_dt = email.utils.parsedate_to_datetime(date) if date else None
+                if date_dt is not None:
+                    lifetime = (expires_dt - date_dt).total_seconds()
+            except (TypeError, ValueError):
+                lifetime = 0
+    try:
+        lifetime -= int(_header(response, 'Age') or 0)
+    except ValueError:
+        pass
+    return max(0, lifetime)
+
+
+def _count_cache(source, key):
+    with _lock:
+        counters = _cache_stats.setdefault(source, {'hits': 0, 'revalidated': 0, 'misses': 0})
+        counters[key] += 1
+
+
+def get_parsed(url, parse, source=None, **kwargs):
+    """GET a URL through the HTTP cache and return parse(response)
+
+    A fresh cached entry is returned without any request. A stale entry
+    with validators is revalidated with a conditional request, and on
+    304 Not Modified the cached parse result is returned without
+    reparsing. Only 200 responses are stored.
+
+    Args:
+        url: URL to fetch
+        parse: Callable taking the response and returning the parsed value.
+            It must not depend on the current time, since its result is reused.
+        source: Name the hit/revalidation counters are kept under (default: url)
+        **kwargs: Passed to get()
+    """
+    source = source or url
+    with _lock:
+        entry = _cache.get(url)
+
+    if entry is not None and time.monotonic() < entry.expires:
+        _count_cache(source, 'hits')
+        return entry.parsed
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+    response = get(url, headers=headers, source=source, **kwargs)
+
+    if response.status_code == 304 and entry is not None:
+        _count_cache(source, 'revalidated')
+        lifetime = _freshness_lifetime(response)
+        if lifetime is not None:
+            entry.expires = time.monotonic() + lifetime
+        return entry.parsed
+
+    _count_cache(source, 'misses')
+    parsed = parse(response)
+
+    if response.status_code == 200:
+        lifetime = _freshness_lifetime(response)
+        etag = _header(response, 'ETag')
+        last_modified = _header(response, 'Last-Modified')
+        if lifetime is not None and (lifetime > 0 or etag or last_modified):
+            with _lock:
+                _cache[url] = _CacheEntry(parsed, etag, last_modified, time.monotonic() + lifetime)
+    return parsed
+
+
+# Markup that differs between loads of an otherwise unchanged page (matched case-sensitively)
+VOLATILE_PATTERNS = (
+    rb'<script\b.*?</script\s*>',
+    rb'<!--.*?-->',
+    rb'<ins\b.*?</ins\s*>',
+    rb'<iframe\b.*?</iframe\s*>',
+)
+
+_fingerprints = {}
+_fingerprint_stats = {}
+
+
+@functools.lru_cache(maxsize=64)
+def _volatile_regex(pattern):
+    return re.compile(pattern, re.S)
+
+
+def fingerprint(content, volatile=VOLATILE_PATTERNS):
+    """Hash a page body after removing every match of the volatile byte patterns"""
+    for pattern in volatile:
+        content = _volatile_regex(pattern).sub(b'', content)
+    return hashlib.sha256(content).hexdigest()
+
+
+def _count_fingerprint(source, key):
+    with _lock:
+        counters = _fingerprint_stats.setdefault(source, {'unchanged': 0, 'changed': 0})
+        counters[key] += 1
+
+
+def get_scraped(url, parse, source=None, volatile=VOLATILE_PATTERNS, **kwargs):
+    """get_parsed() for scraped pages, skipping the parse when the content is unchanged
+
+    Args:
+        url: URL to fetch
+        parse: Callable taking the response and returning the parsed value
+        source: Name the counters are kept under (default: url)
+        volatile: Byte regexes removed before hashing. They must only match
+            markup parse() doesn't read, or changes to it would be missed.
+        **kwargs: Passed to get_parsed()
+    """
+    source = source or url
+
+    def parse_if_changed(response):
+        digest = fingerprint(response.content, volatile)
+        with _lock:
+            previous = _fingerprints.get(url)
+        if previous is not None and previous[0] == digest:
+            _count_fingerprint(source, 'unchanged')
+            return previous[1]
+        _count_fingerprint(source, 'changed')
+        parsed = parse(response)
+        if response.status_code == 200:
+            with _lock:
+                _fingerprints[url] = (digest, parsed)
+        return parsed
+
+    return get_parsed(url, parse_if_changed, source=source, **kwargs)
+
+
+def clear_cache():
+    """Drop all cached responses, fingerprints and cache counters"""
+    with _lock:
+        _cache.clear()
+        _cache_stats.clear()
+        _fingerprints.clear()
+        _fingerprint_stats.clear()
+
+
+def cache_stats():
+    """Return HTTP cache counters per source
+
+    Returns:
+        Dictionary of source -> dictionary with:
+            - hits: Served from cache without a request
+            - revalidated: Conditional request answered with 304
+            - misses: Full response downloaded and parsed
+            - hit_rate: hits / lookups
+            - revalidation_rate: revalidated / requests made
+    """
+    with _lock:
+        snapshot = {source: dict(counters) for source, counters in _cache_stats.items()}
+    for counters in snapshot.values():
+        lookups = counters['hits'] + counters['revalidated'] + counters['misses']
+        requests_made = counters['revalidated'] + counters['misses']
+        counters['hit_rate'] = counters['hits'] / lookups if lookups else 0.0
+        counters['revalidation_rate'] = counters['revalidated'] / requests_made if requests_made else 0.0
+    return snapshot
+
+
+def fingerprint_stats():
+    """Return content fingerprint counters per source
+
+    Returns:
+        Dictionary of source -> dictionary with:
+            - unchanged: Downloaded body matched the last fingerprint, parse skipped
+            - changed: Body was new and parsed
+            - hit_rate: unchanged / bodies checked
+    """
+    with _lock:
+        snapshot = {source: dict(counters) for source, counters in _fingerprint_stats.items()}
+    for counters in snapshot.values():
+        checked = counters['unchanged'] + counters['changed']
+        counters['hit_rate'] = counters['unchanged'] / checked if checked else 0.0
+    return snapshot
+
+
+def stats():
+    """Return request counters
+
+    Returns:
+        Dictionary with:
+            - requests: Requests made through get()
+            - exchanges: HTTP request/response exchanges, including retries and redirects
+            - handshakes: New TCP (and TLS) connections opened
+            - reused: Exchanges served on an already-open connection
+    """
+    with _lock:
+        s = dict(_stats)
+    s['reused'] = max(0, s['exchanges'] - s['handshakes'])
+    return s
+
+
+def _collect_metrics():
+    """Cache and fingerprint counters for metrics.REGISTRY"""
+    cache = cache_stats()
+    fingerprints = fingerprint_stats()
+    return [
+        ('pbclock_http_cache_total', 'counter', 'HTTP cache lookups per source by result',
+         [({'source': source, 'result': result}, c[result]) for source, c in sorted(cache.items())
+          for result in ('hits', 'revalidated', 'misses')]),
+        ('pbclock_content_fingerprint_total', 'counter', 'Scraped pages per source by whether the content changed',
+         [({'source': source, 'result': result}, c[result]) for source, c in sorted(fingerprints.items())
+          for result in ('unchanged', 'changed')]),
+        ('pbclock_http_requests_total', 'counter', 'Requests made through transport.get', [({}, stats()['requests'])]),
+    ]
+
+
+metrics.REGISTRY.add_collector(_collect_metrics)
+
+
+def log_stats():
+    """Log the request counters"""
+    s = stats()
+    logging.info(f"HTTP transport: {s['requests']} requests, {s['handshakes']} handshakes, {s['reused']} reused")
+    for source, c in sorted(cache_stats().items()):
+        logging.info(f"HTTP cache {source}: {c['hits']} hits, {c['revalidated']} revalidated, {c['misses']} misses "
+                     f"(hit rate {c['hit_rate']:.0%}, revalidation rate {c['revalidation_rate']:.0%})")
+    for source, c in sorted(fingerprint_stats().items()):
+        logging.info(f"Content fingerprint {source}: {c['unchanged']} unchanged, {c['changed']} changed "
+                     f"(hit rate {c['hit_rate']:.0%})")